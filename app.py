@@ -1,7 +1,11 @@
 import streamlit as st
-from chatbot import TechnicalChatbot
+from chatbot import TechnicalChatbot, ROUTING_MODES
 from report_generator import ReportGenerator
-from PIL import Image
+from report_document import EXTENSIONS, MEDIA_TYPES
+from rag_engine import get_shared_engine
+from evidence_store import get_shared_evidence_store
+from image_analysis import get_shared_analyzer
+from telemetry import get_shared_telemetry, span
 import os
 
 st.set_page_config(
@@ -13,9 +17,16 @@ st.set_page_config(
 st.title("🔧 AI-Driven Technical Problem-Solving Chatbot")
 st.markdown("*Root Cause Analysis using 8D, 5-Why, and A3 Methodologies*")
 
+
+@st.cache_resource(show_spinner="Loading RCA knowledge base...")
+def load_rag_engine():
+    # Built once per server process and shared by every session
+    return get_shared_engine()
+
+
 # Initialize session state
 if 'chatbot' not in st.session_state:
-    st.session_state.chatbot = TechnicalChatbot(workflow="8D")
+    st.session_state.chatbot = TechnicalChatbot(workflow="8D", rag=load_rag_engine())
     
     # Display API status warning if using MockLLM
     if st.session_state.chatbot.using_mock:
@@ -31,7 +42,11 @@ if 'problem_context' not in st.session_state:
     st.session_state.problem_context = {}
 
 if 'uploaded_images' not in st.session_state:
-    st.session_state.uploaded_images = []
+    st.session_state.uploaded_images = {}  # upload file_id -> (file name, stored image path)
+
+evidence_store = get_shared_evidence_store()
+telemetry = get_shared_telemetry()
+MAX_THUMBNAILS_SHOWN = 6
 
 # Sidebar - RCA Workflow Selection and Settings
 with st.sidebar:
@@ -47,6 +62,19 @@ with st.sidebar:
     if workflow != st.session_state.chatbot.workflow:
         st.session_state.chatbot.set_workflow(workflow)
         st.success(f"Workflow changed to {workflow}")
+
+    # Which turns the local engine answers instead of the LLM
+    st.session_state.chatbot.routing = st.selectbox(
+        "Model Routing",
+        ROUTING_MODES,
+        index=ROUTING_MODES.index(st.session_state.chatbot.routing),
+        help="remote: every question and analysis from the LLM; auto: questions and routine analyses "
+             "from the local engine, hard analyses from the LLM; local: no LLM calls"
+    )
+    route_counts = st.session_state.chatbot.route_counts
+    if route_counts:
+        local_turns = route_counts["local question"] + route_counts["local analysis"]
+        st.caption(f"Answered locally: {local_turns} of {sum(route_counts.values())} model turns")
     
     st.divider()
     
@@ -73,20 +101,35 @@ with st.sidebar:
     )
     
     if uploaded_files:
+        new_paths = []
         for uploaded_file in uploaded_files:
-            if uploaded_file not in st.session_state.uploaded_images:
-                st.session_state.uploaded_images.append(uploaded_file)
-                # Save image temporarily
-                image = Image.open(uploaded_file)
-                image_path = f"evidence_{uploaded_file.name}"
-                st.session_state.chatbot.add_evidence_image(image_path)
+            # Only new uploads are read and hashed; known ones cost a dict lookup
+            if uploaded_file.file_id not in st.session_state.uploaded_images:
+                image_path = evidence_store.add(uploaded_file.getvalue(), uploaded_file.name)
+                st.session_state.uploaded_images[uploaded_file.file_id] = (uploaded_file.name, image_path)
+                new_paths.append(image_path)
         
-        st.success(f"{len(st.session_state.uploaded_images)} image(s) uploaded")
+        if new_paths:
+            # OCR and defect features for the new batch, in parallel and cached per image hash
+            with st.spinner("Analyzing evidence images..."):
+                features = get_shared_analyzer().analyze(new_paths)
+            for image_path, image_features in zip(new_paths, features):
+                st.session_state.chatbot.add_evidence_image(image_path, image_features)
         
-        # Display thumbnails
-        for img_file in st.session_state.uploaded_images:
-            img = Image.open(img_file)
-            st.image(img, caption=img_file.name, use_column_width=True)
+        st.success(f"{len(st.session_state.chatbot.evidence_images)} image(s) uploaded")
+        
+        # Cached thumbnails of the latest uploads only, so reruns don't grow with the attachment count
+        shown = 0
+        for name, image_path in reversed(st.session_state.uploaded_images.values()):
+            if shown == MAX_THUMBNAILS_SHOWN:
+                st.caption(f"+{len(st.session_state.uploaded_images) - shown} more attached")
+                break
+            thumb = evidence_store.thumbnail(image_path)
+            if thumb:
+                st.image(thumb, caption=name, use_column_width=True)
+            else:
+                st.caption(f"{name} (preview unavailable)")
+            shown += 1
     
     st.divider()
     
@@ -123,15 +166,48 @@ if prompt := st.chat_input("Type 'start' to begin the investigation"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    response = st.session_state.chatbot.chat(prompt)
+    # Render analysis and next question token by token as the LLM produces them
+    with st.chat_message("assistant"), span("ui.turn"):
+        response = st.write_stream(st.session_state.chatbot.chat_stream(prompt))
     st.session_state.messages.append({"role": "assistant", "content": response})
-    with st.chat_message("assistant"):
-        st.markdown(response)
 
     if "Investigation complete" in response:
         st.session_state.investigation_complete = True
         st.session_state.problem_context = st.session_state.chatbot.problem_context
 
+# Stage timings, drawn after the turn so they include it
+with st.sidebar:
+    with st.expander("⏱️ Stage Timings"):
+        # Process-wide and set once at startup (RCA_TELEMETRY), so no session can switch it for the others
+        st.toggle("Record stage timings", value=telemetry.enabled, disabled=True,
+                  help="Set RCA_TELEMETRY=1 before starting the app to record stage timings")
+        turn = telemetry.last_trace("ui.turn")
+        if turn:
+            root = turn[-1]
+            stages = [s for s in turn if s["parent"] == root["id"]]
+            st.markdown("**Last turn**")
+            rows = [{"stage": s["name"], "ms": round(s["duration"] * 1000, 1)} for s in stages]
+            # llm.first_token is part of llm.stream, so it is not subtracted again
+            accounted = sum(s["duration"] for s in stages if s["name"] != "llm.first_token")
+            rows.append({"stage": "rendering / other", "ms": round((root["duration"] - accounted) * 1000, 1)})
+            rows.append({"stage": "total", "ms": round(root["duration"] * 1000, 1)})
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        summary = telemetry.summary()
+        if summary:
+            st.markdown("**All turns** (ms)")
+            st.dataframe(
+                [{"stage": name, "count": h["count"], "mean": round(h["mean"] * 1000, 1),
+                  "p50": round(h["p50"] * 1000, 1), "p95": round(h["p95"] * 1000, 1),
+                  "max": round(h["max"] * 1000, 1)} for name, h in summary.items()],
+                hide_index=True, use_container_width=True,
+            )
+            st.download_button("Prometheus metrics", telemetry.prometheus(), file_name="rca_metrics.prom",
+                               mime="text/plain", use_container_width=True)
+            st.download_button("JSON lines", telemetry.jsonl(spans=True), file_name="rca_timings.jsonl",
+                               mime="application/x-ndjson", use_container_width=True)
+        elif telemetry.enabled:
+            st.caption("No turns recorded yet.")
+
 # Generate report section
 if st.session_state.investigation_complete:
     st.divider()
@@ -151,10 +227,21 @@ if st.session_state.investigation_complete:
                 history, 
                 problem_context,
                 workflow=st.session_state.chatbot.workflow,
-                evidence_images=evidence_images
+                evidence_images=evidence_images,
+                evidence_store=evidence_store,
+                similar_incidents=st.session_state.chatbot.similar_incidents()
             )
             text_report = report_gen.generate_text_report()
             st.text_area("RCA Report", text_report, height=400)
+            # Same document, other formats
+            for fmt, label in (("markdown", "Markdown"), ("html", "HTML"), ("json", "JSON")):
+                st.download_button(
+                    f"⬇️ Download {label}",
+                    report_gen.generate_report(fmt),
+                    file_name=f"rca_report_{st.session_state.chatbot.workflow}.{EXTENSIONS[fmt]}",
+                    mime=MEDIA_TYPES[fmt],
+                    use_container_width=True
+                )
     
     with col2:
         if st.button("📊 Generate PDF Report", use_container_width=True):
@@ -168,25 +255,27 @@ if st.session_state.investigation_complete:
                 history, 
                 problem_context,
                 workflow=st.session_state.chatbot.workflow,
-                evidence_images=evidence_images
+                evidence_images=evidence_images,
+                evidence_store=evidence_store,
+                similar_incidents=st.session_state.chatbot.similar_incidents()
             )
-            pdf_file = report_gen.generate_pdf_report()
+            # Rendered in memory so concurrent sessions never share a file
+            pdf_bytes = report_gen.generate_pdf_report()
             
-            with open(pdf_file, "rb") as f:
-                st.download_button(
-                    "⬇️ Download PDF Report",
-                    f,
-                    file_name=f"rca_report_{st.session_state.chatbot.workflow}.pdf",
-                    mime="application/pdf"
-                )
+            st.download_button(
+                "⬇️ Download PDF Report",
+                pdf_bytes,
+                file_name=f"rca_report_{st.session_state.chatbot.workflow}.pdf",
+                mime="application/pdf"
+            )
     
     with col3:
         if st.button("🔄 Start New Investigation", use_container_width=True):
             st.session_state.messages = []
             st.session_state.investigation_complete = False
             st.session_state.problem_context = {}
-            st.session_state.uploaded_images = []
-            st.session_state.chatbot = TechnicalChatbot(workflow=workflow)
+            st.session_state.uploaded_images = {}
+            st.session_state.chatbot = TechnicalChatbot(workflow=workflow, rag=load_rag_engine())
             st.rerun()
 
 # Footer
@@ -0,0 +1,287 @@
+"""Offline batch RCA over archived investigations.
+
+Reads one investigation per line from a JSONL file and replays it through
+TechnicalChatbot in a pool of worker processes, writing one report per
+investigation. Each line looks like
+
+    {"id": "INC-1042", "workflow": "8D",
+     "problem_context": {"problem_description": "...", "occurrence_time": "...", "impact_severity": "..."},
+     "answers": ["...", "..."]}
+
+The three problem-context values answer the opening questions; "answers"
+are the replies to the RCA questions that follow, used until they run out
+or the investigation completes. The RAG index is built or refreshed once
+up front and every worker memory-maps the same on-disk copy.
+
+Progress is appended to <output-dir>/checkpoint.jsonl as investigations
+finish; running the same command again skips everything already done.
+Completed investigations are archived in the incident store (--incident-dir,
+empty to skip), where later ones find them as similar past incidents.
+
+    python batch.py incidents.jsonl --output-dir reports --mock --workers 8
+    python batch.py incidents.jsonl --output-dir reports --format pdf markdown
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from chatbot import TechnicalChatbot, MockLLM, create_llm
+from llm_scheduler import BATCH
+from rag_engine import RAGEngine, get_shared_engine
+from report_generator import ReportGenerator
+from report_document import EXTENSIONS
+from incident_store import IncidentStore, DEFAULT_INCIDENT_DIR
+
+WORKFLOWS = ("8D", "5-Why", "A3")
+CONTEXT_FIELDS = ("problem_description", "occurrence_time", "impact_severity")
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+# Per worker process, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(data_dir, use_mock, mock_latency, incident_dir):
+    _worker["rag"] = get_shared_engine(data_dir)
+    _worker["mock_latency"] = mock_latency
+    # Workers append to the same store; its appends are serialized across processes
+    _worker["incidents"] = IncidentStore(incident_dir) if incident_dir else False
+    # Remote clients are shared by every investigation in the worker; mocks are per investigation,
+    # including the one create_llm falls back to without an API key
+    llm = None if use_mock else create_llm()[0]
+    _worker["llm"] = None if isinstance(llm, MockLLM) else llm
+
+
+def _safe_name(investigation_id):
+    raw = str(investigation_id)
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in raw).strip(".") or "investigation"
+    if name != raw:
+        # Ids that differ only in replaced characters must not share a report file
+        name += "-" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+    return name
+
+
+def run_investigation(record, output_dir, formats):
+    """Replay one investigation and write its reports; returns a checkpoint entry"""
+    start = time.perf_counter()
+    investigation_id = record["id"]
+    workflow = record.get("workflow", "8D")
+    if workflow not in WORKFLOWS:
+        raise ValueError(f"workflow must be one of {', '.join(WORKFLOWS)}, not {workflow!r}")
+
+    # A fresh MockLLM per investigation keeps the replies independent of scheduling
+    llm = _worker["llm"] or MockLLM(latency=_worker["mock_latency"])
+    chatbot = TechnicalChatbot(workflow=workflow, llm=llm, rag=_worker["rag"], incidents=_worker["incidents"])
+    # Yields to interactive turns sharing its scheduler (each worker process has its own)
+    chatbot.priority = BATCH
+    chatbot.chat("start")
+    context = record.get("problem_context", {})
+    replies = [str(context.get(field, "Not recorded")) for field in CONTEXT_FIELDS]
+    replies.extend(str(answer) for answer in record.get("answers", []))
+    turns, complete = 0, False
+    for reply in replies:
+        turns += 1
+        if chatbot.chat(reply).startswith("Investigation complete"):
+            complete = True
+            break
+
+    report = ReportGenerator(chatbot.get_metrics(), chatbot.conversation_history, chatbot.problem_context,
+                             workflow=workflow, similar_incidents=chatbot.similar_incidents())
+    base = os.path.join(output_dir, _safe_name(investigation_id))
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{EXTENSIONS[fmt]}"
+        tmp = path + ".tmp"
+        # Written under a temporary name so an interrupted run never leaves a truncated report
+        if fmt == "pdf":
+            report.generate_pdf_report(tmp)
+        else:
+            with open(tmp, "w", encoding="utf-8") as f:
+                report.write(f, fmt)
+        os.replace(tmp, path)
+        paths.append(path)
+
+    return {
+        "id": investigation_id,
+        "status": "ok",
+        "workflow": workflow,
+        "turns": turns,
+        "complete": complete,
+        "seconds": round(time.perf_counter() - start, 4),
+        "reports": paths,
+    }
+
+
+def read_investigations(path):
+    """Yield (record, error) per line of a JSONL file; ids default to "line-<n>".
+
+    Lines that are not a JSON object come back as ({"id": ...}, message).
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield {"id": f"line-{line_no}"}, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield {"id": f"line-{line_no}"}, "expected a JSON object"
+                continue
+            record.setdefault("id", f"line-{line_no}")
+            yield record, None
+
+
+def load_checkpoint(path, retry_failed=False):
+    """Ids already finished (only successful ones when retry_failed)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if entry.get("status") == "ok" or not retry_failed:
+                done.add(str(entry["id"]))
+    return done
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class BatchRunner:
+    """Feeds investigations to a process pool with a bounded number in flight.
+
+    Only the parent process appends to the checkpoint, one line per
+    finished investigation, flushed immediately.
+    """
+
+    def __init__(self, output_dir, formats=("text",), workers=None, max_in_flight=None, data_dir="data",
+                 use_mock=False, mock_latency=0.0, retry_failed=False, progress_every=10.0,
+                 incident_dir=DEFAULT_INCIDENT_DIR):
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.data_dir = data_dir
+        self.use_mock = use_mock
+        self.mock_latency = mock_latency
+        self.retry_failed = retry_failed
+        self.progress_every = progress_every
+        self.incident_dir = incident_dir
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.stats = {"ok": 0, "failed": 0, "skipped": 0, "turns": 0}
+        self._durations = []
+
+    def run(self, input_path):
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = load_checkpoint(self.checkpoint_path, self.retry_failed)
+        # Build or refresh the on-disk index once; workers then only open it
+        RAGEngine(self.data_dir).build_vectorstore()
+
+        start = time.perf_counter()
+        self._last_progress = start
+        pending = {}
+        with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+                ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                    initargs=(self.data_dir, self.use_mock, self.mock_latency,
+                                              self.incident_dir)) as pool:
+            try:
+                for record, error in read_investigations(input_path):
+                    if str(record["id"]) in done:
+                        self.stats["skipped"] += 1
+                        continue
+                    if error:
+                        self._record(checkpoint, {"id": record["id"], "status": "error", "error": error})
+                        continue
+                    while len(pending) >= self.max_in_flight:
+                        self._collect(pending, checkpoint, start)
+                    future = pool.submit(run_investigation, record, self.output_dir, self.formats)
+                    pending[future] = record["id"]
+                while pending:
+                    self._collect(pending, checkpoint, start)
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                print("\nInterrupted; finished investigations are checkpointed, rerun to resume", file=sys.stderr)
+                raise
+        return self.summary(time.perf_counter() - start)
+
+    def _collect(self, pending, checkpoint, start):
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            investigation_id = pending.pop(future)
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"id": investigation_id, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            self._record(checkpoint, entry)
+        now = time.perf_counter()
+        if self.progress_every and now - self._last_progress >= self.progress_every:
+            self._last_progress = now
+            done = self.stats["ok"] + self.stats["failed"]
+            print(f"{done} done ({self.stats['failed']} failed), {done / (now - start):.1f} investigations/s",
+                  file=sys.stderr)
+
+    def _record(self, checkpoint, entry):
+        checkpoint.write(json.dumps(entry) + "\n")
+        checkpoint.flush()
+        if entry["status"] == "ok":
+            self.stats["ok"] += 1
+            self.stats["turns"] += entry["turns"]
+            self._durations.append(entry["seconds"])
+        else:
+            self.stats["failed"] += 1
+            print(f"Warning: investigation {entry['id']} failed: {entry['error']}", file=sys.stderr)
+
+    def summary(self, elapsed):
+        finished = self.stats["ok"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "elapsed_s": round(elapsed, 3),
+            "investigations_per_s": round(finished / elapsed, 2) if elapsed else 0.0,
+            "turns_per_s": round(self.stats["turns"] / elapsed, 1) if elapsed else 0.0,
+            "p50_investigation_s": percentile(self._durations, 0.5),
+            "p95_investigation_s": percentile(self._durations, 0.95),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay JSONL investigations through the RCA chatbot")
+    parser.add_argument("input", help="JSONL file, one investigation per line")
+    parser.add_argument("--output-dir", default="reports", help="reports and checkpoint.jsonl go here")
+    parser.add_argument("--format", nargs="+", default=["text"], choices=sorted(EXTENSIONS),
+                        help="report formats to write per investigation")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="investigations queued or running at once (default: 2 per worker)")
+    parser.add_argument("--data-dir", default="data", help="knowledge base directory")
+    parser.add_argument("--mock", action="store_true", help="use MockLLM instead of the remote model")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="synthetic MockLLM latency, seconds")
+    parser.add_argument("--incident-dir", default=DEFAULT_INCIDENT_DIR,
+                        help="incident store to archive completed investigations in ('' to skip)")
+    parser.add_argument("--retry-failed", action="store_true", help="also rerun investigations that failed")
+    parser.add_argument("--restart", action="store_true", help="ignore and replace the existing checkpoint")
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(args.output_dir, args.format, workers=args.workers, max_in_flight=args.max_in_flight,
+                         data_dir=args.data_dir, use_mock=args.mock, mock_latency=args.mock_latency,
+                         retry_failed=args.retry_failed, incident_dir=args.incident_dir)
+    if args.restart and os.path.exists(runner.checkpoint_path):
+        os.remove(runner.checkpoint_path)
+    print(json.dumps(runner.run(args.input), indent=2))
+    return 1 if runner.stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Batch replay throughput per worker count.
+
+Writes a JSONL file of synthetic investigations (the bench_suite scripts,
+cycled), then runs batch.BatchRunner over it on MockLLM at each worker
+count and reports investigations/s, turns/s and per-investigation p50/p95.
+With --mock-latency every LLM call sleeps, as a remote model would, and
+the workers overlap the waiting.
+
+    python benchmarks/bench_batch.py [--investigations 200] [--workers 1 2 4] [--mock-latency 0.01]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch import BatchRunner
+from bench_suite import INVESTIGATIONS
+
+
+def write_investigations(path, count):
+    workflows = sorted(INVESTIGATIONS)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            workflow = workflows[i % len(workflows)]
+            script = INVESTIGATIONS[workflow]
+            record = {
+                "id": f"INC-{i:06d}",
+                "workflow": workflow,
+                "problem_context": dict(zip(("problem_description", "occurrence_time", "impact_severity"),
+                                            script[:3])),
+                "answers": script[3:],
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--investigations", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(1, cpus // 2), cpus}))
+    parser.add_argument("--format", nargs="+", default=["text"])
+    parser.add_argument("--mock-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="rca-batch-bench-")
+    try:
+        input_path = os.path.join(tmp, "investigations.jsonl")
+        write_investigations(input_path, args.investigations)
+        print(f"{args.investigations} investigations, formats {' '.join(args.format)}, "
+              f"mock latency {args.mock_latency * 1000:.0f} ms, {cpus} CPUs")
+        print(f"{'workers':>7} {'inv/s':>8} {'turns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'wall s':>8}")
+        for workers in args.workers:
+            output_dir = os.path.join(tmp, f"out-{workers}")
+            runner = BatchRunner(output_dir, args.format, workers=workers, use_mock=True,
+                                 mock_latency=args.mock_latency, progress_every=0,
+                                 incident_dir=os.path.join(tmp, f"incidents-{workers}"))
+            result = runner.run(input_path)
+            print(f"{workers:>7} {result['investigations_per_s']:>8.1f} {result['turns_per_s']:>9.1f} "
+                  f"{result['p50_investigation_s'] * 1000:>8.1f} {result['p95_investigation_s'] * 1000:>8.1f} "
+                  f"{result['elapsed_s']:>8.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
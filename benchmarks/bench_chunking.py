@@ -0,0 +1,112 @@
+"""Chunking strategies for the methodology corpus: retrieval quality and speed.
+
+Compares fixed 1000-character chunks (the previous CharacterTextSplitter
+setup, if langchain is installed) with the heading-aware section splitter
+on labeled questions. A retrieved chunk is relevant when it contains the
+question's answer phrase. Reported per k: hit rate, precision, MRR, and the
+prompt context each retrieval adds (estimated tokens).
+
+    python benchmarks/bench_chunking.py [--k 1 2 3] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from context_builder import estimate_tokens
+from markdown_splitter import MarkdownSectionSplitter
+from rag_engine import RAGEngine, TfidfVectorStore
+
+# (question, phrase(s) that only appear in the sections answering it)
+LABELED = [
+    ("5-Why example of a machine that stopped because bearings seized from poor lubrication",
+     "Lubrication schedule was not documented or followed"),
+    ("5-Why example for a software crash with a null pointer exception", "No checklist exists for requirements review"),
+    ("how do I describe the problem in 8D using is/is not", 'Use the "Is/Is Not" analysis technique'),
+    ("8D interim containment actions to protect customers", "Isolate affected products or processes"),
+    ("which tools verify root causes in 8D D4", "Verify root cause by reproducing the problem"),
+    ("8D D7 prevent recurrence update FMEA control plans", "Update management systems (FMEA, Control Plans, SOPs)"),
+    ("A3 goal target condition specific measurable", ("Specific, measurable, achievable", "Set measurable goals")),
+    ("A3 implementation plan who what when", "- When: Timeline/deadline"),
+    ("A3 go to gemba to clarify the problem", "Go to Gemba (actual place)"),
+    ("A3 coaching questions for the mentor", "Key Coaching Questions"),
+    ("mistake of stopping the 5-Why too early at a symptom", "Keep asking why the part broke"),
+    ("verify effectiveness of corrective actions, metrics to track", "Compare before and after"),
+    ("prevent recurrence with poka-yoke mistake-proofing", "Implement mistake-proofing (Poka-Yoke)"),
+    ("implementation checklist owners assigned resources allocated", "[ ] Owners assigned"),
+    ("how many people should be on an RCA team", "Optimal: 5-8 people"),
+    ("fishbone diagram categories with 5-Why", "Use fishbone to identify potential cause categories"),
+]
+
+
+def corpus():
+    engine = RAGEngine(index_dir=None)
+    return engine.load_documents()
+
+
+def build(docs, splitter):
+    if splitter == "sections":
+        engine = RAGEngine(index_dir=None)
+        return engine.split_documents(docs)
+    from langchain.text_splitter import CharacterTextSplitter
+    return CharacterTextSplitter(chunk_size=1000, chunk_overlap=0).split_documents(docs)
+
+
+def quality(store, k):
+    hits = precision = rr = tokens = 0.0
+    for question, phrase in LABELED:
+        results = store.similarity_search(question, k=k)
+        phrases = (phrase,) if isinstance(phrase, str) else phrase
+        relevant = [any(p in doc.page_content for p in phrases) for doc in results]
+        hits += any(relevant)
+        precision += sum(relevant) / k
+        rr += next((1 / (rank + 1) for rank, hit in enumerate(relevant) if hit), 0)
+        tokens += sum(estimate_tokens(doc.page_content) for doc in results)
+    n = len(LABELED)
+    return hits / n, precision / n, rr / n, tokens / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--repeat", type=int, default=50, help="corpus copies for the speed test")
+    args = parser.parse_args()
+
+    docs = corpus()
+    splitters = ["sections"]
+    try:
+        import langchain.text_splitter  # noqa: F401
+        splitters.insert(0, "fixed-1000")
+    except ImportError:
+        print("langchain not installed; skipping the fixed-size baseline")
+
+    for _, phrase in LABELED:
+        for p in (phrase,) if isinstance(phrase, str) else phrase:
+            assert any(p in doc.page_content for doc in docs), p
+
+    print(f"{'chunker':<11} {'chunks':>6} {'k':>2} {'hit@k':>6} {'prec@k':>7} {'MRR':>5} {'ctx tokens':>10}")
+    for splitter in splitters:
+        chunks = build(docs, splitter)
+        store = TfidfVectorStore(chunks)
+        for k in args.k:
+            hit, prec, mrr, tokens = quality(store, k)
+            print(f"{splitter:<11} {len(chunks):>6} {k:>2} {hit:>6.2f} {prec:>7.2f} {mrr:>5.2f} {tokens:>10.0f}")
+
+    text = "\n".join(doc.page_content for doc in docs) * args.repeat
+    print(f"\nchunking speed on {len(text) / 2**20:.1f} MB")
+    for splitter in splitters:
+        if splitter == "sections":
+            split = MarkdownSectionSplitter(max_chars=1500).split_text
+        else:
+            from langchain.text_splitter import CharacterTextSplitter
+            split = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0).split_text
+        start = time.perf_counter()
+        n = len(split(text))
+        elapsed = time.perf_counter() - start
+        print(f"{splitter:<11} {len(text) / 2**20 / elapsed:>7.1f} MB/s  ({n} chunks)")
+
+
+if __name__ == "__main__":
+    main()
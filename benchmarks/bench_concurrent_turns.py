@@ -0,0 +1,68 @@
+"""Per-turn latency of TechnicalChatbot.chat versus the concurrent achat.
+
+Drives real ChatOpenAI clients against the local fake LLM server, which
+adds a fixed latency to every completion.
+
+    python benchmarks/bench_concurrent_turns.py [--latency 0.3] [--turns 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from langchain_openai import ChatOpenAI
+from chatbot import TechnicalChatbot
+from fake_llm_server import start_server
+
+CONTEXT_ANSWERS = [
+    "Hydraulic press cycle time increased by 20%",
+    "Started on Monday after the weekend maintenance window",
+    "Line output down 15%, no safety impact",
+]
+
+
+def new_bot(base_url):
+    llm = ChatOpenAI(model="fake", temperature=0, api_key="not-needed", base_url=base_url, max_retries=0)
+    # No response cache: the scripted turns repeat, and every call should reach the server
+    bot = TechnicalChatbot(workflow="8D", llm=llm, cache=False, incidents=False, routing="remote")
+    bot.chat("start")
+    for answer in CONTEXT_ANSWERS:
+        bot.chat(answer)
+    return bot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds the fake server waits per call")
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+
+    bot = new_bot(base_url)
+    start = time.perf_counter()
+    for i in range(args.turns):
+        bot.chat(f"Observation {i}: pressure drops during the clamp phase")
+    sequential = (time.perf_counter() - start) / args.turns
+
+    bot = new_bot(base_url)
+
+    async def run():
+        for i in range(args.turns):
+            await bot.achat(f"Observation {i}: pressure drops during the clamp phase")
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    concurrent = (time.perf_counter() - start) / args.turns
+
+    server.shutdown()
+    print(f"injected latency per call: {args.latency * 1000:.0f} ms, 2 LLM calls per turn")
+    print(f"chat  (sequential): {sequential * 1000:8.1f} ms/turn")
+    print(f"achat (concurrent): {concurrent * 1000:8.1f} ms/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Evidence image analysis throughput (OCR + defect features) across worker processes.
+
+    python benchmarks/bench_image_analysis.py [--images 48] [--workers 1 2 4] [--size 1600x1200]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import cv2
+import numpy as np
+
+from image_analysis import ImageAnalyzer
+
+
+def synthetic_image(path, i, size):
+    """Error-screen text on a noisy panel with a few dark pits and a scratch"""
+    width, height = size
+    rng = np.random.default_rng(i)
+    image = rng.normal(200, 12, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    cv2.putText(image, f"ALARM E-{500 + i % 40} SPINDLE OVERTEMP", (40, 120), cv2.FONT_HERSHEY_SIMPLEX,
+                2.0, (20, 20, 20), 4)
+    for _ in range(3 + i % 9):
+        center = (int(rng.integers(50, width - 50)), int(rng.integers(250, height - 50)))
+        cv2.circle(image, center, int(rng.integers(6, 30)), (40, 40, 40), -1)
+    cv2.line(image, (0, height // 2), (width, height // 2 + 40 * (i % 5)), (60, 60, 60), 3)
+    cv2.imwrite(path, image)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--size", default="1600x1200")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    root = tempfile.mkdtemp(prefix="image_analysis_")
+    try:
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(root, f"evidence_{i}.png")
+            synthetic_image(path, i, size)
+            paths.append(path)
+
+        print(f"{args.images} images {args.size}, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>8} {'cold images/s':>14} {'cached images/s':>16}")
+        for workers in args.workers:
+            analyzer = ImageAnalyzer(cache_dir=os.path.join(root, f"features_{workers}"), max_workers=workers)
+            analyzer.analyze(paths[:workers])  # start the pool and warm imports in every worker
+            start = time.perf_counter()
+            analyzer.analyze(paths[workers:])
+            cold = (len(paths) - workers) / (time.perf_counter() - start)
+
+            fresh = ImageAnalyzer(cache_dir=analyzer.cache_dir, max_workers=workers)  # disk cache only
+            start = time.perf_counter()
+            fresh.analyze(paths)
+            cached = len(paths) / (time.perf_counter() - start)
+            analyzer.close()
+            ocr = "with OCR" if analyzer._memory and next(iter(analyzer._memory.values()))["ocr_available"] \
+                else "no OCR (tesseract missing)"
+            print(f"{workers:>8} {cold:>14.1f} {cached:>16.0f}   {ocr}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Similar-incident query latency and recall, exact scan vs IVF, up to 1M incidents.
+
+Synthetic incidents are drawn from a few thousand recurring "problem
+types" (shared vocabulary plus noise words) and hashed the same way the
+incident store embeds text. For each store size the IVF index is trained
+and built, then a set of unseen incidents is queried by exact scan and
+through the IVF index at several nprobe values. recall@k is the share of
+the exact top-k the IVF search also returns; same-type is the share of
+returned incidents of the query's problem type, the matches a user would
+actually want (many same-type incidents score almost alike, so recall
+against the exact ranking understates it). A final case times
+IncidentStore.search end to end (embedding, search and record reads).
+
+    python benchmarks/bench_incident_search.py [--sizes 10000 100000 1000000] [--nprobe 4 8 16 32]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from incident_store import (DIM, IVFIndex, IncidentStore, _feature, assign_lists, exact_search,
+                            train_centroids)
+
+VOCABULARY = 20000
+TYPES = 3000
+TYPE_WORDS = 30
+
+
+class IncidentGenerator:
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        features = [_feature(f"term{i}") for i in range(VOCABULARY)]
+        self.columns = np.array([c for c, _ in features], dtype=np.int64)
+        self.signs = np.array([s for _, s in features], dtype=np.float32)
+        self.types = self.rng.integers(0, VOCABULARY, size=(TYPES, TYPE_WORDS))
+
+    def vectors(self, n, type_words=20, noise_words=10, block=50000):
+        """(n unit vectors, problem type of each)"""
+        out = np.empty((n, DIM), dtype=np.float32)
+        types = self.rng.integers(0, TYPES, size=n)
+        for start in range(0, n, block):
+            m = min(block, n - start)
+            kinds = types[start:start + m]
+            picks = self.rng.integers(0, TYPE_WORDS, size=(m, type_words))
+            terms = np.concatenate([self.types[kinds[:, None], picks],
+                                    self.rng.integers(0, VOCABULARY, size=(m, noise_words))], axis=1)
+            rows = np.repeat(np.arange(m), terms.shape[1]) * DIM + self.columns[terms.ravel()]
+            dense = np.bincount(rows, weights=self.signs[terms.ravel()], minlength=m * DIM).reshape(m, DIM)
+            dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-9)
+            out[start:start + m] = dense
+        return out, types
+
+
+def timed(fn, queries):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return results, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def bench_size(generator, n, queries, query_types, args):
+    start = time.perf_counter()
+    vectors, types = generator.vectors(n)
+    generate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    nlist = max(1, min(int(math.sqrt(n)), n // 39))
+    centroids = train_centroids(vectors, nlist)
+    train_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, centroids, assign_lists(vectors, centroids))
+    build_s = time.perf_counter() - start
+    print(f"\n{n:,} incidents: {vectors.nbytes / 1e6:.0f} MB vectors, nlist {nlist}, "
+          f"generated {generate_s:.1f}s, k-means {train_s:.1f}s, lists {build_s:.1f}s")
+
+    def same_type(found):
+        return np.mean([np.mean(types[rows] == t) for rows, t in zip(found, query_types)])
+
+    exact, p50, p95 = timed(lambda q: exact_search(vectors, q, args.k)[0], queries)
+    print(f"  {'exact scan':<14} p50 {p50:>8.3f} ms  p95 {p95:>8.3f} ms  recall@{args.k} 1.000  "
+          f"same-type {same_type(exact):.3f}")
+    for nprobe in args.nprobe:
+        found, p50, p95 = timed(lambda q: index.search(q, args.k, nprobe)[0], queries)
+        recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / len(b) for a, b in zip(found, exact)])
+        print(f"  {'ivf nprobe ' + str(nprobe):<14} p50 {p50:>8.3f} ms  p95 {p95:>8.3f} ms  "
+              f"recall@{args.k} {recall:.3f}  same-type {same_type(found):.3f}")
+
+
+def bench_store(args):
+    """IncidentStore.search on real (text) incidents, exact and through its IVF index"""
+    problems = ["seal leaks on hydraulic press", "conveyor motor overload trips", "scratched housings at packing",
+                "solder joint cracks after thermal cycling", "label printer misfeeds", "paint blistering on panels"]
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as root:
+        store = IncidentStore(root, exact_threshold=args.store_size // 2, background_reindex=False)
+        records = []
+        for i in range(args.store_size):
+            problem = problems[i % len(problems)]
+            detail = " ".join(f"lot{x}" for x in rng.integers(0, 5000, size=5))
+            records.append({"workflow": "8D", "problem_context": {"problem_description": f"{problem} {detail}"},
+                            "history": [["What changed?", f"Supplier change on line {i % 40} {detail}"]]})
+        start = time.perf_counter()
+        store.add_many(records)
+        add_s = time.perf_counter() - start
+        store.reindex()
+        print(f"\nIncidentStore, {args.store_size:,} text incidents: add_many {add_s:.1f}s, {store.stats()}")
+        queries = [f"{problems[i % len(problems)]} on line {i}" for i in range(200)]
+        for label, exact in (("exact scan", True), ("ivf", False)):
+            _, p50, p95 = timed(lambda q: store.search(q, args.k, exact=exact), queries)
+            print(f"  search() {label:<10} p50 {p50:>8.3f} ms  p95 {p95:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3, help="matches per query (the chatbot shows 3)")
+    parser.add_argument("--store-size", type=int, default=50000, help="incidents in the end-to-end case (0 to skip)")
+    args = parser.parse_args()
+
+    generator = IncidentGenerator()
+    queries, query_types = generator.vectors(args.queries)
+    for n in args.sizes:
+        bench_size(generator, n, queries, query_types, args)
+    if args.store_size:
+        bench_store(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""LLM scheduler against a rate-limiting provider.
+
+Drives real ChatOpenAI clients (with their own retries off) against the
+local fake LLM server, which answers 429 above a concurrency limit, at
+random, and with random 503s. Measures
+
+- burst: many sessions calling at once, directly versus through the
+  scheduler (success rate, per-call latency, requests the server saw),
+- lanes: interactive turn latency while batch work saturates the
+  provider, with and without the interactive priority lane,
+- coalescing: sessions sending the same prompt at once,
+- async: the same burst from asyncio tasks.
+
+    python benchmarks/bench_llm_scheduler.py [--latency 0.05] [--limit 8] [--sessions 32]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from langchain_openai import ChatOpenAI
+from llm_scheduler import LLMScheduler, INTERACTIVE, BATCH
+from fake_llm_server import start_server
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def new_llm(base_url):
+    return ChatOpenAI(model="fake", temperature=0, api_key="not-needed", base_url=base_url, max_retries=0)
+
+
+def new_scheduler(limit, **kwargs):
+    # Short delays: the fake server's Retry-After is a fraction of a second
+    return LLMScheduler(max_concurrency=limit, base_delay=0.05, max_delay=1.0, **kwargs)
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def burst(llm, server, sessions, calls, call):
+    """sessions threads making calls each; returns (latencies, failures, server requests, elapsed)"""
+    latencies, failures = [], []
+    requests_before = server.requests
+
+    def session(i):
+        for j in range(calls):
+            start = time.perf_counter()
+            try:
+                call(f"Session {i} observation {j}: pressure drops during the clamp phase")
+            except Exception as e:
+                failures.append(type(e).__name__)
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    run_threads(sessions, session)
+    return latencies, failures, server.requests - requests_before, time.perf_counter() - start
+
+
+def report_burst(name, latencies, failures, requests, elapsed, total):
+    print(f"{name:<10} ok {len(latencies):4d}/{total}  p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  server requests {requests:5d}  {elapsed:6.2f} s")
+
+
+def bench_burst(base_url, server, args):
+    llm = new_llm(base_url)
+    total = args.sessions * args.calls
+    print(f"\nburst: {args.sessions} sessions x {args.calls} calls, provider limit {args.limit} in flight, "
+          f"{args.rate_limit_rate:.0%} random 429, {args.error_rate:.0%} random 503")
+    results = burst(llm, server, args.sessions, args.calls, llm.invoke)
+    report_burst("direct", *results, total)
+    scheduler = new_scheduler(args.limit)
+    results = burst(llm, server, args.sessions, args.calls, lambda prompt: scheduler.invoke(llm, prompt))
+    report_burst("scheduled", *results, total)
+    stats = scheduler.stats()
+    print(f"{'':<10} retries {stats.get('retries', 0)}, 429s {stats.get('rate_limited', 0)}, "
+          f"other errors {stats.get('errors', 0)}, gave up {stats.get('failed', 0)}")
+
+
+def bench_lanes(base_url, server, args):
+    llm = new_llm(base_url)
+    print(f"\nlanes: {args.sessions} batch workers saturating {args.limit} slots, 4 interactive sessions x 5 turns")
+    for name, interactive_priority in (("one lane", BATCH), ("two lanes", INTERACTIVE)):
+        scheduler = new_scheduler(args.limit)
+        done = threading.Event()
+        batch_calls = []
+        latencies = []
+
+        def batch_worker(i):
+            j = 0
+            while not done.is_set():
+                scheduler.invoke(llm, f"Batch {i} record {j}", priority=BATCH)
+                batch_calls.append(1)
+                j += 1
+
+        def interactive(i):
+            for j in range(5):
+                start = time.perf_counter()
+                scheduler.invoke(llm, f"Interactive {i} turn {j}", priority=interactive_priority)
+                latencies.append(time.perf_counter() - start)
+
+        workers = [threading.Thread(target=batch_worker, args=(i,)) for i in range(args.sessions)]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.2)
+        run_threads(4, interactive)
+        done.set()
+        for worker in workers:
+            worker.join()
+        print(f"{name:<10} interactive p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  batch calls meanwhile {len(batch_calls)}")
+
+
+def bench_coalescing(base_url, server, args):
+    llm = new_llm(base_url)
+    print(f"\ncoalescing: {args.sessions} sessions sending the same prompt at once")
+    for coalesce in (False, True):
+        scheduler = new_scheduler(args.limit, coalesce=coalesce)
+        barrier = threading.Barrier(args.sessions)
+        requests_before = server.requests
+
+        def session(i):
+            barrier.wait()
+            scheduler.invoke(llm, "Summarize the clamp pressure findings", key="same-prompt")
+
+        start = time.perf_counter()
+        run_threads(args.sessions, session)
+        elapsed = time.perf_counter() - start
+        print(f"{'on' if coalesce else 'off':<10} server requests {server.requests - requests_before:4d}  "
+              f"{elapsed * 1000:7.1f} ms  coalesced {scheduler.stats().get('coalesced', 0)}")
+
+
+def bench_async(base_url, server, args):
+    llm = new_llm(base_url)
+    total = args.sessions * args.calls
+    scheduler = new_scheduler(args.limit)
+
+    async def call(prompt):
+        start = time.perf_counter()
+        await scheduler.ainvoke(llm, prompt)
+        return time.perf_counter() - start
+
+    async def run():
+        prompts = [f"Async {i}: pressure drops during the clamp phase" for i in range(total)]
+        return await asyncio.gather(*(call(p) for p in prompts), return_exceptions=True)
+
+    requests_before = server.requests
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    latencies = [r for r in results if isinstance(r, float)]
+    print(f"\nasync: {total} concurrent ainvoke calls")
+    report_burst("scheduled", latencies, [r for r in results if not isinstance(r, float)],
+                 server.requests - requests_before, elapsed, total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fake server waits per call")
+    parser.add_argument("--limit", type=int, default=8, help="requests the fake provider accepts at once")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.05, help="fraction of random 429s")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="fraction of random 503s")
+    parser.add_argument("--retry-after", type=float, default=0.2, help="Retry-After sent with 429s, seconds")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=4, help="calls per session in the burst")
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency, max_concurrent=args.limit,
+                                    rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                                    retry_after=args.retry_after)
+    bench_burst(base_url, server, args)
+
+    # Lanes and coalescing only measure queueing: no injected errors
+    server.rate_limit_rate = server.error_rate = 0.0
+    bench_lanes(base_url, server, args)
+    bench_coalescing(base_url, server, args)
+
+    server.rate_limit_rate, server.error_rate = args.rate_limit_rate, args.error_rate
+    bench_async(base_url, server, args)
+    print(f"\nserver rejections: {dict(server.rejected)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
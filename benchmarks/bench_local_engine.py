@@ -0,0 +1,114 @@
+"""Local question/analysis engine latency, and what routing saves end to end.
+
+First times LocalRCAEngine.question/analysis per workflow over synthetic,
+mostly distinct answers (so its memoization rarely helps). Then runs whole
+investigations through TechnicalChatbot against the local fake LLM server
+in each routing mode and reports remote calls and latency per turn.
+
+    python benchmarks/bench_local_engine.py [--answers 2000] [--latency 0.3] [--investigations 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from langchain_openai import ChatOpenAI
+from chatbot import TechnicalChatbot, ROUTING_MODES
+from local_engine import LocalRCAEngine, retriever, steps
+from rag_engine import get_shared_engine
+from fake_llm_server import start_server
+
+COMPONENTS = ["clamp cylinder seal", "spindle bearing", "coolant filter", "servo drive", "conveyor belt",
+              "temperature sensor", "hydraulic pump", "PLC firmware", "nozzle", "gearbox"]
+SYMPTOMS = ["pressure drops by {n} bar", "vibration rises to {n} mm/s", "temperature runs {n}°C high",
+            "cycle time grows by {n}%", "scrap rate reached {n}%", "output fell {n} parts per hour"]
+CAUSES = ["because the {c} is worn", "due to a missed PM on the {c}", "after the {c} was replaced",
+          "caused by contamination in the {c}", "", "because the {c} settings were changed"]
+PROBLEMS = ["Hydraulic press cycle time increased by 20%", "Spindle motor on line 3 overheats and trips",
+            "Paint finish is uneven on the body panels", "Conveyor jams several times per shift"]
+
+
+def synthetic_answer(rng):
+    component = rng.choice(COMPONENTS)
+    symptom = rng.choice(SYMPTOMS).format(n=rng.randint(2, 60))
+    cause = rng.choice(CAUSES).format(c=rng.choice(COMPONENTS))
+    return f"On line {rng.randint(1, 9)} the {component} {symptom} {cause}".strip() + "."
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def bench_engine(args):
+    engine = LocalRCAEngine(retriever(get_shared_engine()))
+    rng = random.Random(0)
+    answers = [synthetic_answer(rng) for _ in range(args.answers)]
+    print(f"local engine, {args.answers} synthetic answers per workflow")
+    print(f"{'workflow':<8} {'kind':<9} {'p50 us':>8} {'p99 us':>8} {'max us':>8}")
+    worst = 0.0
+    for workflow in ("8D", "5-Why", "A3"):
+        count = len(steps(workflow))
+        question_times, analysis_times = [], []
+        for i, answer in enumerate(answers):
+            index = i % count
+            problem = {"problem_description": PROBLEMS[i % len(PROBLEMS)]}
+            history = [("Q", a) for a in answers[max(0, i - index):i]]
+            start = time.perf_counter()
+            engine.question(workflow, index, problem, history)
+            question_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            engine.analysis(workflow, index, answer, problem)
+            engine.escalation(workflow, index, answer)
+            analysis_times.append(time.perf_counter() - start)
+        for kind, times in (("question", question_times), ("analysis", analysis_times)):
+            worst = max(worst, max(times))
+            print(f"{workflow:<8} {kind:<9} {percentile(times, 0.5) * 1e6:8.1f} {percentile(times, 0.99) * 1e6:8.1f} "
+                  f"{max(times) * 1e6:8.1f}")
+    print(f"slowest call: {worst * 1000:.2f} ms (target < 5 ms)")
+
+
+def bench_routing(args):
+    server, base_url = start_server(latency=args.latency)
+    rng = random.Random(1)
+    print(f"\ninvestigations through TechnicalChatbot, fake LLM latency {args.latency * 1000:.0f} ms per call")
+    print(f"{'routing':<8} {'LLM calls/inv':>14} {'ms/turn':>9} {'p95 ms/turn':>12}")
+    for routing in ROUTING_MODES:
+        requests_before = server.requests
+        turn_times = []
+        for i in range(args.investigations):
+            # A fresh client and cache per run keeps the modes independent
+            llm = ChatOpenAI(model="fake", temperature=0, api_key="not-needed", base_url=base_url, max_retries=0)
+            bot = TechnicalChatbot(workflow=("8D", "5-Why", "A3")[i % 3], llm=llm, incidents=False, routing=routing)
+            bot.cache.clear()
+            bot.chat("start")
+            for answer in [PROBLEMS[i % len(PROBLEMS)], "Since Monday", "Line output down 15%"]:
+                bot.chat(answer)
+            while bot.question_count < bot.max_questions:
+                start = time.perf_counter()
+                bot.chat(synthetic_answer(rng))
+                turn_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            bot.chat(synthetic_answer(rng))
+            turn_times.append(time.perf_counter() - start)
+        calls = (server.requests - requests_before) / args.investigations
+        print(f"{routing:<8} {calls:14.1f} {sum(turn_times) / len(turn_times) * 1000:9.1f} "
+              f"{percentile(turn_times, 0.95) * 1000:12.1f}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds the fake server waits per call")
+    parser.add_argument("--investigations", type=int, default=3, help="investigations per routing mode")
+    args = parser.parse_args()
+    bench_engine(args)
+    bench_routing(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Throughput of the local RCA metric scoring over a synthetic answer corpus.
+
+Compares a per-pattern scan (one findall per lexicon entry, as a plain
+keyword scorer would do) with the single combined regex, then times the
+incremental per-turn update TechnicalChatbot runs and whole-history
+scoring (one count matrix product plus a cumulative sum) at several
+history lengths. The feature memo is cleared before each timed pass.
+
+    python benchmarks/bench_metric_scoring.py [--answers 50000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+import metric_scoring
+from metric_scoring import LEXICON, WEIGHTS, MetricScorer, score_history
+
+COMPONENTS = ["clamp cylinder seal", "spindle bearing", "coolant filter", "servo drive", "conveyor belt",
+              "temperature sensor", "hydraulic pump", "PLC firmware", "spray nozzle", "gearbox"]
+OPENERS = ["We measured", "The operators report", "Maintenance confirmed", "I am not sure, but", "Data shows",
+           "Customers complained that", "Quality found", "After the last rebuild"]
+FINDINGS = ["the {c} runs {n}°C hot", "pressure drops by {n} bar at the {c}", "scrap rose {n}% near the {c}",
+            "the {c} trips every {n} minutes", "vibration at the {c} reached {n} mm/s",
+            "the line stopped for {n} hours", "leaks appear after {n} days"]
+TAILS = ["because the {c} is worn.", "due to a missed PM on the {c}.", "maybe it is random.",
+         "We will replace the {c} within {n} weeks; spares are in stock.",
+         "A redesign needs capex approval and takes months.", "It was reproduced on the test rig.",
+         "No safety impact so far.", "Slip hazard near the {c}.", ""]
+
+
+def synthetic_answer(rng):
+    c = rng.choice(COMPONENTS)
+    parts = [rng.choice(OPENERS), rng.choice(FINDINGS).format(c=c, n=rng.randint(2, 90)),
+             rng.choice(TAILS).format(c=rng.choice(COMPONENTS), n=rng.randint(1, 12))]
+    return " ".join(p for p in parts if p)
+
+
+# One case-insensitive regex per lexicon entry: the straightforward way to score keywords
+PER_PATTERN = [(re.compile(r"\b(?:" + pattern + ")", re.IGNORECASE), np.array(weights))
+               for pattern, weights in LEXICON.values()]
+
+
+def per_pattern_raw(text):
+    raw = np.zeros(WEIGHTS.shape[1])
+    for pattern, weights in PER_PATTERN:
+        raw += len(pattern.findall(text)) * weights
+    return raw
+
+
+def timed(fn):
+    metric_scoring._feature_counts.cache_clear()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--answers", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    answers = [synthetic_answer(rng) for _ in range(args.answers)]
+    context = {"problem_description": "Seal leaks on hydraulic press 4 contaminate parts",
+               "impact_severity": "Scrap up 4%, 30 minutes downtime per shift, slip hazard"}
+    n = len(answers)
+    print(f"{n} synthetic answers, {len(set(answers))} distinct, {len(LEXICON)} lexicon features")
+
+    def per_pattern():
+        for text in answers:
+            per_pattern_raw(text)
+
+    def incremental():
+        scorer = MetricScorer()
+        scorer.set_context(context)
+        for text in answers:
+            scorer.add(text)
+            scorer.scores()
+
+    print(f"\n{'per turn':<28} {'answers/s':>12} {'us/answer':>10}")
+    for name, fn in (("per-pattern findall", per_pattern), ("incremental (chatbot turn)", incremental)):
+        elapsed = timed(fn)
+        print(f"{name:<28} {n / elapsed:12.0f} {elapsed / n * 1e6:10.2f}")
+
+    print(f"\n{'whole history':<28} {'answers/s':>12} {'us/history':>10}")
+    for length in (10, 100, 1000):
+        histories = [answers[i:i + length] for i in range(0, n - length + 1, length)]
+
+        def score_all():
+            for history in histories:
+                score_history(context, history)
+
+        elapsed = timed(score_all)
+        print(f"{f'{length} turns':<28} {len(histories) * length / elapsed:12.0f} "
+              f"{elapsed / len(histories) * 1e6:10.1f}")
+
+    final = score_history(context, answers[:10])[-1]
+    print(f"\nsample scores after 10 answers: {dict(zip(metric_scoring.METRICS, final.tolist()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Prompt assembly cost per turn over long sessions.
+
+Compares TechnicalChatbot's precompiled templates and incrementally
+maintained history window with the previous approach of building a
+PromptTemplate and re-rendering history/problem context on every call.
+Retrieval is stubbed out so only prompt assembly is measured.
+
+    python benchmarks/bench_prompt_assembly.py [--turns 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from langchain.prompts import PromptTemplate
+from chatbot import TechnicalChatbot, MockLLM
+
+
+class FixedRAG:
+    def __init__(self):
+        self.chunks = ["## Methodology chunk\n" + "Root cause analysis guidance text. " * 25] * 3
+
+    def retrieve(self, query, k=3, methodology=None):
+        return self.chunks[:k]
+
+
+def legacy_question_prompt(bot):
+    context_str = "\n".join(bot.rag.retrieve(f"{bot.workflow} methodology root cause analysis questions", k=3))
+    history_str = "\n".join([f"Q: {q}\nA: {a}" for q, a in bot.conversation_history[-3:]])
+    problem_str = str(bot.problem_context)
+    prompt = PromptTemplate(input_variables=["context", "history", "problem", "workflow", "metrics", "incidents"],
+                            template=TechnicalChatbot.QUESTION_PROMPT.template)
+    return prompt.format(context=context_str, history=history_str, problem=problem_str,
+                         workflow=bot.workflow, metrics=str(bot.metrics), incidents="None")
+
+
+def legacy_analysis_prompt(bot, response):
+    context_str = "\n".join(bot.rag.retrieve(f"{bot.workflow} root cause analysis techniques", k=3))
+    history_str = "\n".join([f"Q: {q}\nA: {a}" for q, a in bot.conversation_history[-3:]])
+    problem_str = str(bot.problem_context)
+    prompt = PromptTemplate(input_variables=["context", "response", "history", "problem", "evidence", "workflow",
+                                             "incidents"],
+                            template=TechnicalChatbot.ANALYSIS_PROMPT.template)
+    return prompt.format(context=context_str, response=response, history=history_str,
+                         problem=problem_str, evidence="None", workflow=bot.workflow, incidents="None")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--report-every", type=int, default=100)
+    args = parser.parse_args()
+
+    bot = TechnicalChatbot(workflow="8D", rag=FixedRAG(), llm=MockLLM(), incidents=False)
+    bot.max_questions = args.turns + 10
+    bot.chat("start")
+    for answer in ["Conveyor jams on line 3", "Since the 2nd shift on Tuesday", "Two hours downtime per day"]:
+        bot.chat(answer)
+
+    legacy_total = new_total = 0.0
+    print(f"{'turn':>6} {'legacy us/turn':>15} {'compiled us/turn':>17}")
+    for turn in range(1, args.turns + 1):
+        answer = f"Turn {turn}: the sensor reading drifted by {turn % 7} mm after the belt was re-tensioned"
+
+        start = time.perf_counter()
+        legacy_analysis_prompt(bot, answer)
+        legacy_question_prompt(bot)
+        legacy_total += time.perf_counter() - start
+
+        start = time.perf_counter()
+        bot._analysis_prompt(answer)
+        bot._question_prompt()
+        new_total += time.perf_counter() - start
+
+        bot.chat(answer)
+        if turn % args.report_every == 0:
+            print(f"{turn:>6} {legacy_total / turn * 1e6:>15.1f} {new_total / turn * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Metrics chart cost: cold start and per-report latency, vector vs raster.
+
+    python benchmarks/bench_report_chart.py [--reports 50]
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import report_generator
+from report_generator import ReportGenerator
+
+METRICS = {"Problem Severity": 72.0, "Root Cause Confidence": 55.5,
+           "Solution Feasibility": 61.0, "Investigation Progress": 100.0}
+HISTORY = [("System", "8D Investigation started")] + [
+    (f"Question {i} about the seal leak?", f"Answer {i}: leaks appear {i + 1} minutes after start-up.")
+    for i in range(10)
+]
+
+COLD_START = """
+import io, time
+start = time.perf_counter()
+from report_generator import ReportGenerator
+ReportGenerator({metrics!r}, {history!r}, {{}}, workflow="8D").generate_pdf_report(io.BytesIO(), chart={chart!r})
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(chart):
+    """Fresh interpreter: import plus first report, as on a new worker or first export"""
+    code = COLD_START.format(metrics=METRICS, history=HISTORY, chart=chart)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def per_report(chart, reports, cached):
+    generator = ReportGenerator(dict(METRICS), HISTORY, {}, workflow="8D")
+    generator.generate_pdf_report(io.BytesIO(), chart=chart)  # warm up fonts and backends
+    timings = []
+    for i in range(reports):
+        if not cached:
+            report_generator._chart_cache.clear()
+        start = time.perf_counter()
+        generator.generate_pdf_report(io.BytesIO(), chart=chart)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mode':<16} {'cold start ms':>14}")
+    for chart in ("raster", "vector"):
+        print(f"{chart:<16} {cold_start(chart) * 1000:>14.1f}")
+
+    print(f"\n{'mode':<16} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, chart, cached in (("raster uncached", "raster", False),
+                                 ("raster cached", "raster", True),
+                                 ("vector", "vector", True)):
+        p50, p95 = per_report(chart, args.reports, cached)
+        print(f"{label:<16} {p50 * 1000:>8.2f} {p95 * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Report export time and peak memory per format at growing history sizes.
+
+Compares the previous text report, built by repeated string
+concatenation, with the document-model renderers: each format rendered to
+a string and streamed to a writer that only counts characters (as a file
+or HTTP response would consume it).
+
+    python benchmarks/bench_report_formats.py [--turns 100 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from report_generator import ReportGenerator
+
+METRICS = {"Problem Severity": 72.0, "Root Cause Confidence": 55.5,
+           "Solution Feasibility": 61.0, "Investigation Progress": 100.0}
+PROBLEM = {"problem_description": "Intermittent seal leaks on hydraulic press 4",
+           "occurrence_time": "First seen on the night shift three weeks ago",
+           "impact_severity": "Scrap rate up 4%, 30 minutes of downtime per shift"}
+
+
+def synthetic_history(turns):
+    history = [("System", "8D Investigation started")]
+    for i in range(turns):
+        history.append((f"What evidence do you have about failure mode {i} and when does it appear?",
+                        f"Observation {i}: leaks appear {i % 12 + 1} minutes after start-up; seal hardness "
+                        f"on lot {1000 + i} measured {70 + i % 9} Shore A <against> a spec of 70 & below."))
+    return history
+
+
+def legacy_text_report(generator):
+    """The history part of the previous generate_text_report: one += per line"""
+    report = f"{'='*80}\nROOT CAUSE ANALYSIS REPORT - {generator.workflow} METHODOLOGY\n{'='*80}\n\n"
+    for metric, value in generator.metrics.items():
+        report += f"{metric}: {value:.1f}\n"
+    report += f"{'-'*80}\n"
+    report += "INVESTIGATION HISTORY\n"
+    report += f"{'-'*80}\n"
+    for i, (q, a) in enumerate(generator.history):
+        if q != "System" and not q.startswith(generator.workflow):
+            report += f"\nQ{i}: {q}\n"
+            report += f"A{i}: {a}\n"
+    return report
+
+
+class CountingWriter:
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, chunk):
+        self.chars += len(chunk)
+
+
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'turns':>7} {'export':<22} {'ms':>9} {'ms/1k turns':>12} {'peak MB':>9}")
+    for turns in args.turns:
+        history = synthetic_history(turns)
+        generator = ReportGenerator(METRICS, history, PROBLEM, workflow="8D")
+        generator.generate_text_report()  # build the document once, like every export after the first
+        cases = [("legacy text (+=)", lambda: legacy_text_report(generator))]
+        for fmt in ("text", "markdown", "json", "html"):
+            cases.append((f"{fmt} -> str", lambda fmt=fmt: generator.generate_report(fmt)))
+            cases.append((f"{fmt} -> stream", lambda fmt=fmt: generator.write(CountingWriter(), fmt)))
+        for name, fn in cases:
+            ms, peak = measure(fn)
+            print(f"{turns:>7} {name:<22} {ms:>9.2f} {ms / turns * 1000:>12.2f} {peak:>9.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
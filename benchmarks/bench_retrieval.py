@@ -0,0 +1,82 @@
+"""Query latency of the local TF-IDF retrieval index at increasing corpus sizes.
+
+Synthetic chunks are sampled from the vocabulary of the real methodology
+corpus in data/ so term statistics stay realistic.
+
+    python benchmarks/bench_retrieval.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from langchain_core.documents import Document
+from rag_engine import TfidfVectorStore, TOKEN_PATTERN
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+QUERIES = [
+    "8D methodology root cause analysis questions",
+    "5-Why root cause analysis techniques",
+    "A3 root cause analysis techniques",
+    "interim containment actions for customer complaints",
+    "preventive maintenance schedule filter replacement",
+    "fishbone diagram equipment materials methods",
+]
+
+
+def corpus_words():
+    words = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith('.txt'):
+            with open(os.path.join(DATA_DIR, name), encoding='utf-8') as f:
+                words.extend(TOKEN_PATTERN.findall(f.read().lower()))
+    return words
+
+
+def synthetic_docs(n, words, words_per_chunk=150, seed=0):
+    rng = random.Random(seed)
+    return [Document(page_content=" ".join(rng.choices(words, k=words_per_chunk))) for _ in range(n)]
+
+
+def bench(n, words, repeats):
+    docs = synthetic_docs(n, words)
+    start = time.perf_counter()
+    store = TfidfVectorStore(docs)
+    build_s = time.perf_counter() - start
+
+    timings = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            store.similarity_search(query, k=3)
+            timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return {
+        "chunks": n,
+        "build_s": round(build_s, 3),
+        "query_ms_mean": round(float(timings.mean()), 3),
+        "query_ms_p50": round(float(np.percentile(timings, 50)), 3),
+        "query_ms_p99": round(float(np.percentile(timings, 99)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    words = corpus_words()
+    print(f"{'chunks':>8} {'build s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for n in args.sizes:
+        r = bench(n, words, args.repeats)
+        print(f"{r['chunks']:>8} {r['build_s']:>9} {r['query_ms_mean']:>9} {r['query_ms_p50']:>9} {r['query_ms_p99']:>9}")
+
+
+if __name__ == '__main__':
+    main()
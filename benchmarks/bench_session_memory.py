@@ -0,0 +1,72 @@
+"""Per-session memory of idle investigations.
+
+Builds one realistic investigation (context questions plus a few RCA turns),
+then holds N idle copies as full TechnicalChatbot objects, as bare
+InvestigationState records, and as serialized snapshots, measuring the
+retained memory of each with tracemalloc.
+
+    python benchmarks/bench_session_memory.py [--sessions 10000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chatbot import TechnicalChatbot, MockLLM
+from rag_engine import get_shared_engine
+from session_state import InvestigationState, msgpack
+
+ANSWERS = [
+    "Intermittent seal leaks on hydraulic press 4",
+    "First seen on the night shift three weeks ago",
+    "Scrap rate up 4%, 30 minutes of downtime per shift",
+    "Leaks appear after long idle periods, mostly on cold mornings",
+    "A new seal supplier was qualified two months ago",
+    "Seal hardness measured 10% above specification on the new lot",
+]
+
+
+def measure(label, n, factory):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    held = [factory() for _ in range(n)]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{label:>28} {retained / n / 1024:>10.2f} {retained / 2**20:>10.1f} {elapsed / n * 1e6:>12.1f}")
+    del held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    args = parser.parse_args()
+
+    llm, rag = MockLLM(), get_shared_engine()
+    template = TechnicalChatbot(workflow="8D", llm=llm, rag=rag, incidents=False)
+    template.chat("start")
+    for answer in ANSWERS:
+        template.chat(answer)
+    snapshot_json = template.snapshot()
+
+    print(f"snapshot: {len(snapshot_json)} bytes json"
+          + (f", {len(template.snapshot('msgpack'))} bytes msgpack" if msgpack else ""))
+    print(f"{'representation':>28} {'KB/session':>10} {'total MB':>10} {'create us':>12}")
+    measure("TechnicalChatbot", args.sessions,
+            lambda: TechnicalChatbot.restore(snapshot_json, llm=llm, rag=rag, incidents=False))
+    measure("InvestigationState", args.sessions, lambda: InvestigationState.loads(snapshot_json))
+    measure("snapshot bytes (json)", args.sessions, lambda: bytes(bytearray(snapshot_json)))
+    if msgpack:
+        packed = template.snapshot("msgpack")
+        measure("snapshot bytes (msgpack)", args.sessions, lambda: bytes(bytearray(packed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Worker cold start: import cost, time-to-first-page and resident memory.
+
+Each measurement runs in a fresh interpreter. Pass --baseline <git ref> to
+measure an older revision of the tree side by side (it is extracted with
+git archive into a temporary directory).
+
+    python benchmarks/bench_startup.py [--baseline HEAD~1] [--runs 5]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+MODULES = ("chatbot", "report_generator", "rag_engine")
+HEAVY = ("streamlit", "langchain", "langchain_core", "langchain_openai", "langchain_community",
+         "openai", "matplotlib", "PIL", "reportlab", "numpy", "cv2", "skimage", "pytesseract")
+
+IMPORT_MODULES = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {modules}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+FIRST_PAGE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+page = AppTest.from_file("app.py").run(timeout=120)
+assert not page.exception, page.exception
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run(tree, code, index_dir, importtime=False):
+    env = dict(os.environ, RAG_INDEX_DIR=index_dir, PYTHONPATH=os.pathsep.join(
+        [tree] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]))
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    out = subprocess.run(cmd, cwd=tree, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1]), out.stderr
+
+
+def top_imports(stderr, limit):
+    """Packages with the most import time from -X importtime output (self time summed per package)"""
+    totals = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \| +(\S+)", line)
+        if match:
+            name = match.group(2).split(".")[0]
+            totals[name] = totals.get(name, 0) + int(match.group(1))
+    return sorted(totals.items(), key=lambda item: -item[1])[:limit]
+
+
+def measure(tree, runs):
+    index_dir = tempfile.mkdtemp(prefix="rag_index_")
+    imports = IMPORT_MODULES.format(modules=", ".join(MODULES), heavy=HEAVY)
+    page = FIRST_PAGE.format(heavy=HEAVY)
+    run(tree, page, index_dir)  # build the on-disk index and warm the page cache
+
+    result = {}
+    for label, code in (("import", imports), ("first page", page)):
+        samples = [run(tree, code, index_dir)[0] for _ in range(runs)]
+        result[label] = {
+            "seconds": statistics.median(s["seconds"] for s in samples),
+            "rss_mb": statistics.median(s["rss_kb"] for s in samples) / 1024,
+            "loaded": samples[-1]["loaded"],
+        }
+    _, stderr = run(tree, imports, index_dir, importtime=True)
+    result["top_imports"] = top_imports(stderr, 6)
+    return result
+
+
+def extract(ref):
+    tree = tempfile.mkdtemp(prefix="bench_startup_")
+    archive = subprocess.run(["git", "archive", ref], cwd=ROOT, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", tree], input=archive, check=True)
+    return tree
+
+
+def report(name, result):
+    print(f"\n== {name}")
+    print(f"{'phase':<12} {'seconds':>8} {'RSS MB':>8}  heavy modules loaded")
+    for label in ("import", "first page"):
+        r = result[label]
+        print(f"{label:<12} {r['seconds']:>8.3f} {r['rss_mb']:>8.1f}  {', '.join(r['loaded']) or '-'}")
+    print("-X importtime, import of " + ", ".join(MODULES) + ":")
+    for name, micros in result["top_imports"]:
+        print(f"  {name:<24} {micros / 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", help="git ref to compare against, e.g. HEAD~1")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.baseline:
+        report(f"baseline ({args.baseline})", measure(extract(args.baseline), args.runs))
+    report("working tree", measure(ROOT, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Time-to-first-token of TechnicalChatbot.chat_stream versus chat.
+
+Uses MockLLM with synthetic latency so the numbers reflect the chat turn
+pipeline rather than a remote provider.
+
+    python benchmarks/bench_streaming.py [--latency 0.3] [--token-delay 0.01]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chatbot import TechnicalChatbot, MockLLM
+
+CONTEXT_ANSWERS = [
+    "Hydraulic press cycle time increased by 20%",
+    "Started on Monday after the weekend maintenance window",
+    "Line output down 15%, no safety impact",
+]
+RCA_ANSWERS = [
+    "Pressure drops intermittently during the clamp phase",
+    "The pump was replaced last month with a different supplier part",
+    "Oil temperature runs 8C higher than on the sister line",
+]
+
+
+def measure(streaming, llm):
+    bot = TechnicalChatbot(workflow="8D", llm=llm, incidents=False, routing="remote")
+    bot.chat("start")
+    for answer in CONTEXT_ANSWERS:
+        bot.chat(answer)
+
+    ttft, total = [], []
+    for answer in RCA_ANSWERS:
+        start = time.perf_counter()
+        if streaming:
+            first = None
+            for _ in bot.chat_stream(answer):
+                if first is None:
+                    first = time.perf_counter() - start
+        else:
+            bot.chat(answer)
+            first = time.perf_counter() - start
+        ttft.append(first)
+        total.append(time.perf_counter() - start)
+    return sum(ttft) / len(ttft), sum(total) / len(total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help="seconds before the first token of each LLM call")
+    parser.add_argument('--token-delay', type=float, default=0.01, help="seconds per generated token")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'ttft ms':>9} {'turn ms':>9}")
+    for streaming in (False, True):
+        llm = MockLLM(latency=args.latency, token_delay=args.token_delay)
+        ttft, total = measure(streaming, llm)
+        print(f"{'stream' if streaming else 'chat':>8} {ttft * 1000:>9.1f} {total * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""Offline end-to-end benchmark suite with a stored baseline.
+
+Scripts complete 8D, 5-Why and A3 investigations through
+TechnicalChatbot.chat on MockLLM (optionally with synthetic latency) with
+every turn sent to the model, and again answered by the local engine, and
+times the RAG index build and retrieve plus text and PDF report
+generation. Every case reports throughput, latency percentiles and its
+tracemalloc peak (measured in a separate pass so tracing doesn't skew the
+timings). Results are written as JSON and compared with a baseline; any
+case that is slower or larger than the baseline by more than --tolerance
+is flagged and the exit status is 1.
+
+    python benchmarks/bench_suite.py                                 # compare with benchmarks/baseline.json
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --save-baseline                 # record a new baseline
+    python benchmarks/bench_suite.py --only investigation --latency 0.05
+
+Baselines are machine specific: record one on the machine that runs the
+comparison.
+"""
+import argparse
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from chatbot import TechnicalChatbot, MockLLM
+from rag_engine import RAGEngine
+from incident_store import IncidentStore
+from report_generator import ReportGenerator
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Scripted answers: three problem-context answers, then the RCA turns
+INVESTIGATIONS = {
+    "8D": [
+        "Intermittent seal leaks on hydraulic press 4 contaminate finished parts with oil",
+        "First seen on the night shift three weeks ago, roughly twice per shift",
+        "Scrap rate up 4%, 30 minutes of downtime per shift, slip hazard near the press",
+        "A cross-functional team of maintenance, quality and the press operators is formed",
+        "Containment: every part from press 4 is wiped and inspected before packing",
+        "Leaks start about ten minutes after start-up when the oil reaches 55 C",
+        "The seal supplier changed the elastomer compound in the lot used since the last rebuild",
+        "Seals from the new lot are 8 Shore A harder than the drawing allows",
+        "Corrective action: return to the previous compound and add incoming hardness checks",
+        "Preventive action: supplier change notifications now require a PPAP resubmission",
+    ],
+    "5-Why": [
+        "Conveyor 2 stops several times per day with a motor overload trip",
+        "Since the line speed increase on the first of the month",
+        "Each stop costs 15 minutes of output on the packing line",
+        "Why? The drive motor draws more current than its overload setting",
+        "Why? The belt drags on the return rollers",
+        "Why? Three return rollers have seized bearings",
+        "Why? The bearings are not on the lubrication schedule",
+        "Why? The schedule was written before the rollers were retrofitted",
+        "Root cause: no management of change for the retrofit; the schedule is now updated",
+    ],
+    "A3": [
+        "Customer complaints about scratched housings rose from 2 to 11 per month",
+        "The increase started in the second quarter after moving assembly to cell B",
+        "Two key customers raised formal concerns; rework costs 6 hours per week",
+        "Current state: housings are stacked without separators between assembly and packing",
+        "Target: fewer than 2 complaints per month by the end of the quarter",
+        "Analysis: scratches match the stacking pattern on the cell B transfer cart",
+        "Countermeasure: foam separators on the cart and a packing check at the end of the line",
+        "Plan: separators installed next week, packing check trained by the end of the month",
+        "Follow-up: complaint count and internal scratch audit reviewed weekly",
+    ],
+}
+
+RETRIEVAL_QUERIES = [
+    "8D methodology root cause analysis questions",
+    "5-Why root cause analysis techniques",
+    "A3 problem solving current state target",
+    "containment action verification",
+    "fishbone diagram categories",
+    "preventive action systemic change",
+    "seal leak hydraulic press oil temperature",
+    "conveyor overload bearing lubrication schedule",
+]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies, elapsed, unit_count=None):
+    values = sorted(latencies)
+    return {
+        "iterations": len(values),
+        "throughput": (unit_count or len(values)) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+    }
+
+
+def peak_mb(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run_investigation(workflow, rag, latency, incidents, routing="remote"):
+    """One scripted investigation; returns (per-turn latencies, chatbot)"""
+    bot = TechnicalChatbot(workflow=workflow, llm=MockLLM(latency=latency), rag=rag, incidents=incidents,
+                           routing=routing)
+    latencies = []
+    for answer in ["start"] + INVESTIGATIONS[workflow]:
+        start = time.perf_counter()
+        bot.chat(answer)
+        latencies.append(time.perf_counter() - start)
+    return latencies, bot
+
+
+def bench_investigations(args, rag):
+    results, bots = {}, {}
+    # Every finished investigation is archived, so later ones search a growing incident store
+    with tempfile.TemporaryDirectory() as incident_dir:
+        incidents = IncidentStore(incident_dir)
+        for workflow, routing in itertools.product(INVESTIGATIONS, ("remote", "local")):
+            run_investigation(workflow, rag, 0.0, incidents, routing)  # warm-up
+            latencies, sessions = [], 0
+            start = time.perf_counter()
+            deadline = start + args.min_time
+            while sessions < args.sessions or time.perf_counter() < deadline:
+                turn_latencies, bot = run_investigation(workflow, rag, args.latency, incidents, routing)
+                latencies.extend(turn_latencies)
+                sessions += 1
+            elapsed = time.perf_counter() - start
+            result = summarize(latencies, elapsed)
+            result["investigations_per_s"] = sessions / elapsed
+            result["unit"] = "turns"
+            result["peak_mb"] = peak_mb(lambda: run_investigation(workflow, rag, 0.0, incidents, routing))
+            if routing == "remote":
+                results[f"investigation.{workflow}"] = result
+                bots[workflow] = bot
+            else:
+                results[f"investigation.{workflow}.local"] = result
+    return results, bots
+
+
+def measure(fn, args):
+    """Latencies of fn() over at least args.repeat calls and args.min_time seconds"""
+    latencies = []
+    deadline = time.perf_counter() + args.min_time
+    while len(latencies) < args.repeat or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def case(fn, args, unit, peak_fn=None):
+    latencies = measure(fn, args)
+    return {**summarize(latencies, sum(latencies)), "unit": unit, "peak_mb": peak_mb(peak_fn or fn)}
+
+
+def bench_rag(args):
+    results = {}
+
+    def build_memory():
+        RAGEngine(index_dir=None).build_vectorstore()
+
+    build_memory()  # warm-up: lazy imports
+    results["rag.build"] = case(build_memory, args, "builds")
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        results["rag.build_persistent"] = case(
+            lambda: RAGEngine(index_dir=index_dir).build_vectorstore(force=True), args, "builds")
+        results["rag.open_persistent"] = case(
+            lambda: RAGEngine(index_dir=index_dir).build_vectorstore(), args, "opens")
+
+    rag = RAGEngine(index_dir=None)
+    rag.build_vectorstore()
+    store = rag.vectorstore
+    queries = itertools.cycle(RETRIEVAL_QUERIES)
+
+    def retrieve_uncached():
+        rag._results.clear()
+        store._query_memo.clear()
+        rag.retrieve(next(queries), k=3)
+
+    def retrieve_memoized():
+        rag.retrieve(next(queries), k=3)
+
+    results["rag.retrieve"] = case(retrieve_uncached, args, "queries")
+    results["rag.retrieve_memoized"] = case(retrieve_memoized, args, "queries")
+    return results, rag
+
+
+def long_history(turns):
+    history = [("System", "8D Investigation started")]
+    for i in range(turns):
+        history.append((f"What evidence do you have about failure mode {i}?",
+                        f"Observation {i}: leaks appear {i % 12 + 1} minutes after start-up on press {i % 5}. " * 3))
+    return history
+
+
+def bench_reports(args, bots):
+    results = {}
+    reports = [ReportGenerator(bot.get_metrics(), bot.conversation_history, bot.problem_context, workflow=wf)
+               for wf, bot in bots.items()]
+    long_report = ReportGenerator(reports[0].metrics, long_history(args.long_turns), reports[0].problem_context)
+    for kind in ("text", "pdf"):
+        results.update(bench_report_kind(args, kind, f"report.{kind}", reports))
+        results.update(bench_report_kind(args, kind, f"report.{kind}_long", [long_report]))
+    return results
+
+
+def bench_report_kind(args, kind, name, reports):
+    reports = itertools.cycle(reports)
+
+    def render():
+        report = next(reports)
+        if kind == "text":
+            report.generate_text_report()
+        else:
+            report.generate_pdf_report(output=io.BytesIO())
+
+    render()  # warm-up: lazy imports, chart cache and font metrics
+    return {name: case(render, args, "reports")}
+
+
+def calibrate(rounds=5):
+    """Best-of time (ms) of a fixed pure-Python workload, a proxy for the machine's current speed"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        counts = {}
+        for i in range(200000):
+            key = "k" + str(i % 1000)
+            counts[key] = counts.get(key, 0) + i * i % 7
+        " ".join(sorted(counts))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def environment(args, calibration_ms):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "calibration_ms": calibration_ms,
+        "params": {"sessions": args.sessions, "latency": args.latency, "repeat": args.repeat,
+                   "min_time": args.min_time, "long_turns": args.long_turns},
+    }
+
+
+# (metric, True if higher is better)
+COMPARED = (("p50_ms", False), ("p95_ms", False), ("throughput", True), ("peak_mb", False))
+# Differences below these are noise whatever the ratio
+ABSOLUTE_FLOOR = {"p50_ms": 0.02, "p95_ms": 0.05, "peak_mb": 0.5, "throughput": 0.0}
+
+
+# Scaled by the machine-speed factor; memory is not
+TIME_METRICS = {"p50_ms", "p95_ms"}
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline; returns the list of regressions.
+
+    Timings are first scaled by the ratio of the two runs' calibration
+    times, so a machine that is uniformly slower right now (CPU frequency,
+    a noisy neighbour) doesn't show up as a regression everywhere.
+    """
+    if baseline["environment"]["params"] != results["environment"]["params"]:
+        print(f"Note: baseline parameters {baseline['environment']['params']} differ from this run")
+    speed = results["environment"]["calibration_ms"] / baseline["environment"]["calibration_ms"]
+    print(f"\nMachine speed factor {speed:.2f} (calibration {results['environment']['calibration_ms']:.1f} ms "
+          f"vs {baseline['environment']['calibration_ms']:.1f} ms in the baseline); baseline timings are scaled by it")
+    regressions = []
+    print(f"\n{'case':<26} {'metric':<11} {'baseline':>11} {'current':>11} {'change':>8}")
+    for case, current in results["cases"].items():
+        base = baseline["cases"].get(case)
+        if base is None:
+            print(f"{case:<26} (not in baseline)")
+            continue
+        for metric, higher_is_better in COMPARED:
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            if metric in TIME_METRICS:
+                old *= speed
+            elif metric == "throughput":
+                old /= speed
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance and abs(new - old) > ABSOLUTE_FLOOR[metric]:
+                flag = "  REGRESSION"
+                regressions.append((case, metric, old, new))
+            elif -worse > tolerance and abs(new - old) > ABSOLUTE_FLOOR[metric]:
+                flag = "  improved"
+            print(f"{case:<26} {metric:<11} {old:>11.3f} {new:>11.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="minimum investigations per workflow")
+    parser.add_argument("--latency", type=float, default=0.0, help="MockLLM latency per call, seconds")
+    parser.add_argument("--repeat", type=int, default=20, help="minimum calls per RAG and report case")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum seconds per case")
+    parser.add_argument("--long-turns", type=int, default=500, help="turns in the long report case")
+    parser.add_argument("--only", nargs="+", choices=["investigation", "rag", "report"],
+                        help="run only these groups")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+    groups = set(args.only or ["investigation", "rag", "report"])
+
+    calibration_ms = calibrate()
+    cases = {}
+    rag_results, rag = bench_rag(args)
+    if "rag" in groups:
+        cases.update(rag_results)
+    investigation_results, bots = bench_investigations(args, rag)
+    if "investigation" in groups:
+        cases.update(investigation_results)
+    if "report" in groups:
+        cases.update(bench_reports(args, bots))
+    # Calibrated before and after the cases; the best of both is the machine's speed
+    calibration_ms = min(calibration_ms, calibrate())
+    results = {"environment": environment(args, calibration_ms), "cases": cases}
+
+    print(f"{'case':<26} {'throughput':>20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8}")
+    for case, r in cases.items():
+        throughput = f"{r['throughput']:.1f} {r['unit']}/s"
+        print(f"{case:<26} {throughput:>20} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {r['peak_mb']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Cost of the stage instrumentation, and a sample per-stage breakdown.
+
+Measures the per-span cost with telemetry disabled and enabled, then runs
+the same MockLLM investigations (real RAG index, synthetic LLM latency)
+with it off and on and prints the recorded stage histograms.
+
+    python benchmarks/bench_telemetry.py [--sessions 20] [--latency 0.0]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chatbot import TechnicalChatbot, MockLLM
+from rag_engine import get_shared_engine
+from telemetry import get_shared_telemetry, span
+
+ANSWERS = [
+    "Spindle motor on line 3 overheats and trips",
+    "Since Monday, on the night shift",
+    "Line stops for 40 minutes per trip, about 200 parts lost",
+    "Coolant flow was low at the last trip",
+    "The coolant filter was clogged",
+    "Filter change interval was extended last month",
+    "Nobody reviewed the interval change against the load",
+    "No maintenance standard covers coolant filters",
+    "We will add the filter to the PM checklist",
+    "Temperature alarm threshold will be lowered",
+]
+
+
+def per_span_ns(enabled, n=200000):
+    telemetry = get_shared_telemetry()
+    telemetry.enabled = enabled
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench"):
+            pass
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        pass
+    return (elapsed - (time.perf_counter() - start)) / n * 1e9
+
+
+def run_sessions(sessions, latency, rag):
+    start = time.perf_counter()
+    for i in range(sessions):
+        bot = TechnicalChatbot(workflow=("8D", "5-Why", "A3")[i % 3], llm=MockLLM(latency=latency), rag=rag,
+                              incidents=False, routing="remote")
+        with span("turn"):
+            bot.chat("start")
+        for answer in ANSWERS:
+            with span("turn"):
+                bot.chat(answer)
+    return (time.perf_counter() - start) / (sessions * (len(ANSWERS) + 1)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="MockLLM latency per call, seconds")
+    args = parser.parse_args()
+
+    print(f"per span: disabled {per_span_ns(False):.0f} ns, enabled {per_span_ns(True):.0f} ns")
+
+    rag = get_shared_engine()
+    telemetry = get_shared_telemetry()
+    run_sessions(2, 0.0, rag)  # warm the retrieval memos
+    for enabled in (False, True, False, True):
+        telemetry.enabled = enabled
+        telemetry.reset()
+        ms = run_sessions(args.sessions, args.latency, rag)
+        print(f"telemetry {'on ' if enabled else 'off'}: {ms:.3f} ms/turn")
+
+    print(f"\n{'stage':<18} {'count':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, h in telemetry.summary().items():
+        print(f"{name:<18} {h['count']:>6} {h['mean'] * 1000:>9.3f} {h['p50'] * 1000:>8.3f} "
+              f"{h['p95'] * 1000:>8.3f} {h['max'] * 1000:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Per-turn retrieval cost of the chatbot's workflow queries.
+
+Compares a full-corpus search on every call (the previous behaviour) with
+the methodology-partitioned index: the first search per query, and the
+steady state where fixed workflow queries come from the precomputed table
+and repeated ones from the result memo. Synthetic chunks are spread over
+the four methodology partitions.
+
+    python benchmarks/bench_workflow_retrieval.py [--sizes 1000 10000 100000] [--turns 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from langchain_core.documents import Document
+
+from bench_retrieval import corpus_words, synthetic_docs
+from rag_engine import (RAGEngine, TfidfVectorStore, WORKFLOW_QUERIES, WORKFLOWS, precompute_workflow_queries,
+                        workflow_scope)
+
+SOURCES = ["data/8d_methodology.txt", "data/5why_technique.txt", "data/a3_problem_solving.txt",
+           "data/rca_best_practices.txt"]
+
+
+def turn_queries(workflow, turns):
+    """Question and analysis queries of one investigation; some analyses carry evidence OCR terms"""
+    queries = []
+    for turn in range(turns):
+        queries.append(WORKFLOW_QUERIES[0].format(workflow=workflow))
+        analysis = WORKFLOW_QUERIES[1].format(workflow=workflow)
+        queries.append(f"{analysis} spindle overtemp alarm" if turn % 3 == 2 else analysis)
+    return queries
+
+
+def per_turn_us(fn, queries, turns):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def bench(engine, turns, k=2):
+    store = engine.vectorstore
+    full, cold, steady = [], [], []
+    for workflow in WORKFLOWS:
+        queries = turn_queries(workflow, turns)
+        scope = workflow_scope(workflow)
+
+        def full_search(query):
+            store._query_memo.clear()
+            store.similarity_search(query, k=3)
+
+        engine._results.clear()
+        full.append(per_turn_us(full_search, queries, turns))
+        # First pass: every distinct query misses the result memo once; second pass: all hits
+        cold.append(per_turn_us(lambda q: engine.retrieve(q, k=k, methodology=scope), queries, turns))
+        steady.append(per_turn_us(lambda q: engine.retrieve(q, k=k, methodology=scope), queries, turns))
+    return sum(full) / 3, sum(cold) / 3, sum(steady) / 3
+
+
+def synthetic_engine(n, words):
+    docs = [Document(page_content=d.page_content, metadata={"source": SOURCES[i % len(SOURCES)]})
+            for i, d in enumerate(synthetic_docs(n, words))]
+    engine = RAGEngine(index_dir=None)
+    store = TfidfVectorStore(docs)
+    start = time.perf_counter()
+    store.precomputed = precompute_workflow_queries(store)
+    precompute_ms = (time.perf_counter() - start) * 1000
+    engine.vectorstore = store
+    return engine, precompute_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'precompute ms':>14} {'full search us/turn':>20} {'first pass us/turn':>19} "
+          f"{'steady us/turn':>15}")
+    real = RAGEngine(index_dir=None)
+    real.build_vectorstore()
+    full, cold, steady = bench(real, args.turns)
+    print(f"{'data/':>8} {'-':>14} {full:>20.1f} {cold:>19.1f} {steady:>15.2f}")
+
+    words = corpus_words()
+    for n in args.sizes:
+        engine, precompute_ms = synthetic_engine(n, words)
+        full, cold, steady = bench(engine, args.turns)
+        print(f"{n:>8} {precompute_ms:>14.1f} {full:>20.1f} {cold:>19.1f} {steady:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Local OpenAI-compatible chat completions server with injected latency and errors.
+
+Answers POST /v1/chat/completions (streaming and non-streaming) with
+MockLLM replies, so ChatOpenAI can be pointed at it through base_url and
+exercised offline over real HTTP. Like a real provider it can also turn
+requests away: 429 with Retry-After above a concurrency limit or at
+random, and random 503s.
+
+    python benchmarks/fake_llm_server.py --port 8399 --latency 0.5
+    python benchmarks/fake_llm_server.py --max-concurrent 4 --rate-limit-rate 0.1 --retry-after 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chatbot import MockLLM
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(body or b"{}")
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            status = self._injected_error()
+            if status is None:
+                server.in_flight += 1
+                reply = server.llm._respond(prompt)
+            else:
+                server.rejected[status] += 1
+        if status is not None:
+            self._send_json(status, {"error": {"message": "injected error", "type": "rate_limit_exceeded"
+                                               if status == 429 else "server_error"}})
+            return
+        try:
+            self._answer(request, prompt, reply)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _injected_error(self):
+        """Status to reject the request with, if any; called under server.lock"""
+        server = self.server
+        if server.max_concurrent and server.in_flight >= server.max_concurrent:
+            return 429
+        if server.rate_limit_rate and random.random() < server.rate_limit_rate:
+            return 429
+        if server.error_rate and random.random() < server.error_rate:
+            return 503
+        return None
+
+    def _answer(self, request, prompt, reply):
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        if request.get("stream"):
+            self._send_stream(request, reply)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4,
+                          "total_tokens": (len(prompt) + len(reply)) // 4},
+            })
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if status == 429 and self.server.retry_after is not None:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, request, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for token in MockLLM._tokens(reply):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": request.get("model", "fake"),
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def start_server(port=0, latency=0.0, jitter=0.0, token_delay=0.0, max_concurrent=None, rate_limit_rate=0.0,
+                 error_rate=0.0, retry_after=None):
+    """Run the fake server in a daemon thread; returns (server, base_url).
+
+    server.requests counts every request, server.rejected the injected
+    errors by status code.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.llm = MockLLM()
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.latency = latency
+    server.jitter = jitter
+    server.token_delay = token_delay
+    server.max_concurrent = max_concurrent
+    server.rate_limit_rate = rate_limit_rate
+    server.error_rate = error_rate
+    server.retry_after = retry_after
+    server.in_flight = 0
+    server.rejected = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8399)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random latency, seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="answer 429 above this many in flight")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency, args.jitter, args.token_delay, args.max_concurrent,
+                               args.rate_limit_rate, args.error_rate, args.retry_after)
+    print(f"Fake LLM listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Load test for the headless RCA service.
+
+Runs N concurrent virtual users, each driving a full investigation (start,
+all answers, text report), and reports p50/p99 request latency and
+throughput. Without --url an in-process server on MockLLM is started.
+
+    python benchmarks/load_test_service.py --users 50 --investigations 200 --mock-latency 0.2
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import httpx
+import numpy as np
+
+ANSWERS = [
+    "Intermittent seal leaks on hydraulic press 4",
+    "First seen on the night shift three weeks ago",
+    "Scrap rate up 4%, 30 minutes of downtime per shift",
+    "Leaks appear after long idle periods, mostly on cold mornings",
+    "A new seal supplier was qualified two months ago",
+    "Operators report higher start-up pressure spikes",
+    "The sister press uses the old seal supplier and has no leaks",
+    "Seal hardness measured 10% above specification on the new lot",
+    "Incoming inspection does not check seal hardness",
+    "Temporary fix: pre-warm the hydraulic oil before start-up",
+]
+
+
+def start_local_server(mock_latency):
+    import uvicorn
+    from chatbot import MockLLM
+    from service import create_app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app = create_app(llm=MockLLM(latency=mock_latency), incidents=False, routing="remote")
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def investigation(client, latencies):
+    async def call(method, path, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        latencies.setdefault(path.split("/")[-1] if "/" in path.strip("/") else "start", []).append(
+            time.perf_counter() - start)
+        response.raise_for_status()
+        return response
+
+    session = (await call("POST", "/sessions", json={"workflow": "8D"})).json()
+    sid = session["session_id"]
+    for answer in ANSWERS:
+        turn = (await call("POST", f"/sessions/{sid}/answer", json={"answer": answer})).json()
+        if turn["complete"]:
+            break
+    await call("GET", f"/sessions/{sid}/report", params={"format": "text"})
+    await client.delete(f"/sessions/{sid}")
+
+
+async def run(url, users, investigations):
+    latencies = {}
+    queue = asyncio.Queue()
+    for i in range(investigations):
+        queue.put_nowait(i)
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        async def user():
+            while not queue.empty():
+                queue.get_nowait()
+                await investigation(client, latencies)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(users)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def summarize(values):
+    ms = np.array(values) * 1000
+    return {"count": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2), "max_ms": round(float(ms.max()), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target an already running service instead of an in-process one")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--investigations", type=int, default=200, help="total investigations to run")
+    parser.add_argument("--mock-latency", type=float, default=0.2, help="MockLLM latency for the in-process server")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_server(args.mock_latency)
+
+    latencies, elapsed = asyncio.run(run(url, args.users, args.investigations))
+    if server is not None:
+        server.should_exit = True
+
+    all_requests = [v for values in latencies.values() for v in values]
+    result = {
+        "users": args.users,
+        "investigations": args.investigations,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(all_requests) / elapsed, 1),
+        "investigations_per_s": round(args.investigations / elapsed, 2),
+        "all": summarize(all_requests),
+        "by_endpoint": {name: summarize(values) for name, values in sorted(latencies.items())},
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['investigations']} investigations, {args.users} users in {result['elapsed_s']} s: "
+          f"{result['requests_per_s']} req/s, {result['investigations_per_s']} investigations/s")
+    print(f"{'endpoint':>10} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in [("all", result["all"])] + list(result["by_endpoint"].items()):
+        print(f"{name:>10} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,268 @@
 import os
+import re
+import time
+import asyncio
+import textwrap
+import logging
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from rag_engine import RAGEngine
+from collections import deque, Counter
+from string import Formatter
+from rag_engine import get_shared_engine, tokenize, workflow_scope, WORKFLOW_QUERIES
+from llm_cache import get_shared_cache, cache_key
+from llm_scheduler import get_shared_scheduler, INTERACTIVE
+from context_builder import ContextAssembler, estimate_tokens, summarize_turn
+from session_state import InvestigationState
+from image_analysis import describe
+from incident_store import get_shared_incident_store, format_match
+from local_engine import LocalRCAEngine, retriever
+from metric_scoring import MetricScorer
+from telemetry import get_shared_telemetry, span, timed
 from mcp_module import MCPModule
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Where turns are answered: "remote" sends every RCA question and analysis to the LLM,
+# "auto" answers questions and easy analyses with the local engine, "local" never calls the LLM
+ROUTING_MODES = ("remote", "auto", "local")
+
+
+class CompiledPrompt:
+    """Prompt template parsed once into literal/field segments.
+
+    Rendering is a single join over the precomputed segments, with none of
+    the per-call parsing and validation of building a PromptTemplate.
+    """
+
+    def __init__(self, template):
+        self.template = textwrap.dedent(template).strip("\n") + "\n"
+        self.segments = []
+        for literal, field, _, _ in Formatter().parse(self.template):
+            self.segments.append((literal, field))
+        self.input_variables = sorted({field for _, field in self.segments if field})
+        # Tokens contributed by the fixed template text, for per-prompt estimates
+        self.literal_tokens = estimate_tokens("".join(literal for literal, _ in self.segments))
+
+    def format(self, **values):
+        parts = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+
+def create_llm(use_mock=False, http_client=None, http_async_client=None):
+    """Build the chat model from OPENAI_API_KEY; returns (llm, using_mock).
+
+    Pass httpx clients to share one connection pool between every session
+    that uses the returned model.
+    """
+    # Initialize LLM (supports both OpenAI and OpenRouter)
+    api_key = os.getenv("OPENAI_API_KEY")
+    if api_key and not use_mock:
+        pool = {}
+        if http_client is not None:
+            pool["http_client"] = http_client
+        if http_async_client is not None:
+            pool["http_async_client"] = http_async_client
+        try:
+            # Imported here: langchain_openai costs over a second at startup
+            from langchain_openai import ChatOpenAI
+
+            # Check if it's an OpenRouter key (starts with sk-or-v1-)
+            if api_key.startswith("sk-or-v1-"):
+                # Configure for OpenRouter
+                llm = ChatOpenAI(
+                    temperature=0.7,
+                    model="openai/gpt-4o-mini",  # OpenRouter model format
+                    openai_api_key=api_key,
+                    openai_api_base="https://openrouter.ai/api/v1",
+                    default_headers={
+                        "HTTP-Referer": "https://github.com/yourusername/rca-chatbot",
+                        "X-Title": "RCA Technical Chatbot"
+                    },
+                    max_retries=0,  # retried by the LLM scheduler
+                    **pool
+                )
+            else:
+                # Standard OpenAI configuration
+                llm = ChatOpenAI(temperature=0.7, model="gpt-4o-mini", openai_api_key=api_key, max_retries=0,
+                                 **pool)
+            return llm, False
+        except Exception as e:
+            print(f"Warning: Failed to initialize LLM: {e}")
+            return MockLLM(), True
+    return MockLLM(), True  # Fallback to mock if no API key
+
+
+def _state_field(name):
+    return property(lambda self: getattr(self.state, name),
+                    lambda self, value: setattr(self.state, name, value))
+
+
 class TechnicalChatbot:
-    def __init__(self, workflow="8D", use_mock=False):
-        # Initialize LLM (supports both OpenAI and OpenRouter)
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key and not use_mock:
-            try:
-                # Check if it's an OpenRouter key (starts with sk-or-v1-)
-                if api_key.startswith("sk-or-v1-"):
-                    # Configure for OpenRouter
-                    self.llm = ChatOpenAI(
-                        temperature=0.7,
-                        model="openai/gpt-4o-mini",  # OpenRouter model format
-                        openai_api_key=api_key,
-                        openai_api_base="https://openrouter.ai/api/v1",
-                        default_headers={
-                            "HTTP-Referer": "https://github.com/yourusername/rca-chatbot",
-                            "X-Title": "RCA Technical Chatbot"
-                        }
-                    )
-                else:
-                    # Standard OpenAI configuration
-                    self.llm = ChatOpenAI(temperature=0.7, model="gpt-4o-mini", openai_api_key=api_key)
-                self.using_mock = False
-            except Exception as e:
-                print(f"Warning: Failed to initialize LLM: {e}")
-                self.llm = MockLLM()
-                self.using_mock = True
+    # Scheduling of remote LLM calls; batch jobs set BATCH priority, the service sets the tenant
+    tenant = "default"
+    priority = INTERACTIVE
+
+    # Initial problem context questions
+    context_questions = (
+        "What technical problem are you investigating?",
+        "When did this problem first occur? (Date/Time)",
+        "What is the impact or severity of this problem? (e.g., production downtime, quality issues, safety concerns)"
+    )
+
+    CONTEXT_RECORDED = "Problem context recorded. Let's begin the root cause investigation."
+
+    # Number of recent Q/A pairs included in prompts
+    HISTORY_WINDOW = 3
+
+    # Methodology chunks retrieved per prompt; whole sections make two enough
+    RETRIEVAL_K = 2
+
+    # OCR terms from evidence images appended to the analysis retrieval query
+    EVIDENCE_QUERY_TERMS = 16
+
+    # Similar past incidents shown in prompts and reports
+    INCIDENT_K = 3
+
+    QUESTION_PROMPT = CompiledPrompt("""
+        You are a technical problem-solving expert guiding a Root Cause Analysis (RCA) investigation using the {workflow} methodology.
+
+        RCA Methodology Context:
+        {context}
+
+        Problem Context: {problem}
+
+        Similar Past Incidents:
+        {incidents}
+
+        Recent Investigation History:
+        {history}
+
+        Current Metrics: {metrics}
+
+        Based on the {workflow} methodology, generate ONE specific, probing question to help identify the root cause of this technical problem.
+        The question should:
+        - Be open-ended and encourage detailed responses
+        - Focus on facts, data, and evidence
+        - Help narrow down potential root causes
+        - Follow the {workflow} framework structure
+        - Avoid yes/no questions
+        - Build upon previous answers
+
+        Generate only the question, nothing else.
+        Question:
+        """)
+
+    ANALYSIS_PROMPT = CompiledPrompt("""
+        You are analyzing a response in a {workflow} Root Cause Analysis investigation.
+
+        RCA Context:
+        {context}
+
+        Problem Context: {problem}
+
+        Similar Past Incidents:
+        {incidents}
+
+        Evidence Image Findings:
+        {evidence}
+
+        User's Response: {response}
+
+        Investigation History: {history}
+
+        Analyze this response and provide:
+        1. Key insights about potential root causes
+        2. What this reveals about the problem
+        3. Suggested next investigation steps
+        4. Update investigation progress (0-100%)
+
+        Provide a brief, actionable analysis focusing on root cause identification.
+        Analysis:
+        """)
+
+    def __init__(self, workflow="8D", use_mock=False, rag=None, llm=None, cache=None, token_budgets=None,
+                 incidents=None, scheduler=None, routing=None):
+        if llm is not None:
+            self.llm = llm
+            self.using_mock = isinstance(llm, MockLLM)
         else:
-            self.llm = MockLLM()  # Fallback to mock if no API key
-            self.using_mock = True
-        
-        self.rag = RAGEngine()
+            self.llm, self.using_mock = create_llm(use_mock=use_mock)
+
+        # The RAG index is read-only, so all sessions share one per process
+        self.rag = rag if rag is not None else get_shared_engine()
+        # Responses are cached per normalized prompt/model/temperature across sessions; False disables it
+        if cache is None:
+            cache = get_shared_cache()
+        self.cache = None if cache is False else cache
+        # Remote calls from every session queue for the same concurrency and rate limits
+        self.scheduler = scheduler if scheduler is not None else get_shared_scheduler()
+        # Finished investigations are archived here and searched for similar ones; False disables it
+        if incidents is None:
+            incidents = get_shared_incident_store()
+        self.incidents = None if incidents is False else incidents
         self.mcp = MCPModule()
-        self.conversation_history = []
-        self.problem_context = {}
-        self.workflow = workflow  # "8D", "5-Why", or "A3"
-        self.evidence_images = []
-        
-        # RCA metrics instead of personality scores
-        self.metrics = {
-            "Problem Severity": 0,
-            "Root Cause Confidence": 0,
-            "Solution Feasibility": 0,
-            "Investigation Progress": 0
-        }
-        
-        self.question_count = 0
-        self.max_questions = 10
-        
-        # Initial problem context questions
-        self.context_questions = [
-            "What technical problem are you investigating?",
-            "When did this problem first occur? (Date/Time)",
-            "What is the impact or severity of this problem? (e.g., production downtime, quality issues, safety concerns)"
-        ]
-
+        routing = routing or os.getenv("RCA_ROUTING", "remote")
+        if routing not in ROUTING_MODES:
+            print(f"Warning: Unknown routing {routing!r}, using 'remote'")
+            routing = "remote"
+        self.routing = routing
+        self.local = LocalRCAEngine(retriever(self.rag))
+        # Turns answered per tier ("local"/"remote") and kind ("question"/"analysis")
+        self.route_counts = Counter()
+        # Per-investigation data lives in a compact, serializable record
+        self.state = InvestigationState(workflow=workflow)  # "8D", "5-Why", or "A3"
+        # Rendered prompt pieces, kept up to date as turns are appended
+        self._history_window = deque(maxlen=self.HISTORY_WINDOW)
+        self._problem_str = None
+        self._evidence_str = None
+        self._evidence_query = None
+        self._incident_matches = None
+        self._incidents_str = None
+        # Running lexicon evidence behind the scored metrics; rebuilt from the history when None
+        self._scorer = None
+        # Per-section token budgets for prompt assembly
+        self.context = ContextAssembler(token_budgets)
+        self.last_prompt_stats = {}
+
+    # The investigation fields are views onto self.state
+    workflow = _state_field("workflow")
+    question_count = _state_field("question_count")
+    max_questions = _state_field("max_questions")
+    conversation_history = _state_field("conversation_history")
+    problem_context = _state_field("problem_context")
+    metrics = _state_field("metrics")
+    evidence_images = _state_field("evidence_images")
+    evidence_findings = _state_field("evidence_findings")
+    complete = _state_field("complete")
+
+    @classmethod
+    def from_state(cls, state, llm=None, rag=None, cache=None, token_budgets=None, incidents=None,
+                   scheduler=None, routing=None):
+        """Wrap a saved InvestigationState, re-attaching the shared LLM, RAG index, cache, incident store
+        and scheduler"""
+        chatbot = cls(workflow=state.workflow, rag=rag, llm=llm, cache=cache, token_budgets=token_budgets,
+                      incidents=incidents, scheduler=scheduler, routing=routing)
+        chatbot.state = state
+        for question, answer in state.conversation_history[-cls.HISTORY_WINDOW:]:
+            chatbot._history_window.append(cls._render_pair(question, answer))
+        return chatbot
+
+    @classmethod
+    def restore(cls, data, format="json", **resources):
+        """Rebuild a chatbot from snapshot() bytes; resources are passed to from_state"""
+        return cls.from_state(InvestigationState.loads(data, format), **resources)
+
+    def snapshot(self, format="json"):
+        """Serialize this investigation's state ("json" or "msgpack" bytes)"""
+        return self.state.dumps(format)
+
+    @timed("generate_question")
     def generate_question(self):
         if self.question_count >= self.max_questions:
             return None
@@ -71,62 +270,192 @@ class TechnicalChatbot:
         if self.question_count < 3:
             # Initial problem context questions
             question = self.context_questions[self.question_count]
+        elif self.routing != "remote":
+            question = self._local_question()
         else:
             # Adaptive RCA questions using LLM based on selected workflow
-            workflow_query = f"{self.workflow} methodology root cause analysis questions"
-            context = self.rag.retrieve(workflow_query, k=3)
-            context_str = "\n".join(context)
-
-            history_str = "\n".join([f"Q: {q}\nA: {a}" for q, a in self.conversation_history[-3:]])
-            problem_str = str(self.problem_context)
-
-            prompt = PromptTemplate(
-                input_variables=["context", "history", "problem", "workflow", "metrics"],
-                template="""
-                You are a technical problem-solving expert guiding a Root Cause Analysis (RCA) investigation using the {workflow} methodology.
-                
-                RCA Methodology Context:
-                {context}
-
-                Problem Context: {problem}
-
-                Recent Investigation History:
-                {history}
-
-                Current Metrics: {metrics}
-
-                Based on the {workflow} methodology, generate ONE specific, probing question to help identify the root cause of this technical problem.
-                The question should:
-                - Be open-ended and encourage detailed responses
-                - Focus on facts, data, and evidence
-                - Help narrow down potential root causes
-                - Follow the {workflow} framework structure
-                - Avoid yes/no questions
-                - Build upon previous answers
-
-                Generate only the question, nothing else.
-                Question:
-                """
-            )
-
-            formatted_prompt = prompt.format(
-                context=context_str,
-                history=history_str,
-                problem=problem_str,
-                workflow=self.workflow,
-                metrics=str(self.metrics)
-            )
-            
-            if isinstance(self.llm, MockLLM):
-                question = self.llm(formatted_prompt)
-            else:
-                response = self.llm.invoke(formatted_prompt)
-                question = response.content.strip()
+            self.route_counts["remote question"] += 1
+            question = self._invoke_llm(self._question_prompt())
 
         self.question_count += 1
         return question
 
+    def _question_prompt(self):
+        # Fixed per workflow, so answered from the index's precomputed results
+        with span("prompt.build", kind="question"):
+            workflow_query = WORKFLOW_QUERIES[0].format(workflow=self.workflow)
+            context, retrieval_stats = self.context.retrieval(self._retrieve(workflow_query))
+            history, history_stats = self._history_str()
+            problem, problem_stats = self._problem_context_str()
+            incidents, incident_stats = self._similar_incidents_str()
+            metrics = str(self.metrics)
+
+            prompt = self.QUESTION_PROMPT.format(
+                context=context,
+                history=history,
+                problem=problem,
+                incidents=incidents,
+                workflow=self.workflow,
+                metrics=metrics
+            )
+            self._log_prompt("question", prompt, self.QUESTION_PROMPT, retrieval_stats, history_stats,
+                             problem_stats, incidents=incident_stats,
+                             extra_tokens=estimate_tokens(metrics) + 2 * estimate_tokens(self.workflow))
+        return prompt
+
+    def _local_question(self):
+        """The next RCA question from the local engine, following up on the latest answer"""
+        self.route_counts["local question"] += 1
+        with span("local.question"):
+            return self.local.question(self.workflow, self.question_count - 3, self.problem_context,
+                                       self.conversation_history)
+
+    def _analyze_locally(self, response):
+        """Route the analysis of response: True for the local engine, False for the LLM"""
+        if self.routing != "auto":
+            return self.routing == "local"
+        # The answer is to RCA question question_count - 4; the last answer closes the investigation
+        reason = self.local.escalation(self.workflow, self.question_count - 4, response,
+                                       evidence=bool(self.evidence_findings),
+                                       final=self.question_count >= self.max_questions)
+        if reason:
+            logger.info("analysis escalated to the LLM: %s", reason)
+        return reason is None
+
+    def _local_analysis(self, response):
+        self.route_counts["local analysis"] += 1
+        with span("local.analysis"):
+            return self.local.analysis(self.workflow, self.question_count - 4, response, self.problem_context,
+                                       final=self.question_count >= self.max_questions)
+
+    def _retrieve(self, query):
+        """Methodology chunks from this workflow's partition and the general best practices"""
+        with span("rag.retrieve"):
+            return self.rag.retrieve(query, k=self.RETRIEVAL_K, methodology=workflow_scope(self.workflow))
+
+    def _append_history(self, question, answer):
+        """Record a Q/A pair, rendering it once for the prompt history window"""
+        self.conversation_history.append((question, answer))
+        self._history_window.append(self._render_pair(question, answer))
+        # The pair that just left the window is summarized once for the older-history section
+        if len(self.conversation_history) > self.HISTORY_WINDOW:
+            old_q, old_a = self.conversation_history[-self.HISTORY_WINDOW - 1]
+            if old_q != "System":
+                self.state.history_summaries.append(summarize_turn(old_q, old_a))
+
+    @staticmethod
+    def _render_pair(question, answer):
+        return f"Q: {question}\nA: {answer}"
+
+    def _history_str(self):
+        return self.context.history(self._history_window, self.state.history_summaries)
+
+    def _problem_context_str(self):
+        if self._problem_str is None:
+            self._problem_str = self.context.problem(self.problem_context)
+        return self._problem_str
+
+    def similar_incidents(self):
+        """Archived incidents most similar to this problem, best first, as incident store matches.
+
+        Searched once per problem context; the investigation's own archived
+        record is never among them.
+        """
+        if self._incident_matches is None:
+            query = " ".join(str(value) for value in self.problem_context.values())
+            if self.incidents is None or not query:
+                return []
+            exclude = (self.state.incident_id,) if self.state.incident_id else ()
+            try:
+                with span("incidents.search"):
+                    self._incident_matches = self.incidents.search(query, self.INCIDENT_K, exclude=exclude)
+            except OSError as e:
+                print(f"Warning: Could not search past incidents: {e}")
+                return []
+        return self._incident_matches
+
+    def _similar_incidents_str(self):
+        if self._incidents_str is None:
+            self._incidents_str = self.context.incidents([format_match(m) for m in self.similar_incidents()])
+        return self._incidents_str
+
+    def archive_incident(self, analysis=""):
+        """Add the finished investigation to the incident store, once"""
+        if self.incidents is None or self.state.incident_id:
+            return
+        record = {
+            "workflow": self.workflow,
+            "problem_context": dict(self.problem_context),
+            "history": [list(pair) for pair in self.conversation_history],
+            "analysis": analysis,
+            "metrics": dict(self.metrics),
+        }
+        try:
+            with span("incidents.add"):
+                self.state.incident_id = self.incidents.add(record)
+        except OSError as e:
+            print(f"Warning: Could not archive the investigation: {e}")
+
+    def _evidence_findings_str(self):
+        if self._evidence_str is None:
+            lines = [describe(f, f"Evidence {i}") for i, f in enumerate(self.evidence_findings, 1)]
+            self._evidence_str = self.context.evidence(lines)
+        return self._evidence_str
+
+    def _evidence_query_terms(self):
+        """Distinct OCR words from the evidence images, for the retrieval query"""
+        if self._evidence_query is None:
+            terms = dict.fromkeys(t for f in self.evidence_findings for t in tokenize(f.get("ocr_text", ""))
+                                  if not t.isdigit())
+            self._evidence_query = " ".join(list(terms)[:self.EVIDENCE_QUERY_TERMS])
+        return self._evidence_query
+
+    def _log_prompt(self, kind, prompt, template, retrieval, history, problem, response=None, evidence=None,
+                    incidents=None, extra_tokens=0):
+        sections = {
+            "retrieval": retrieval["tokens"],
+            "history": history["tokens"],
+            "problem": problem["tokens"],
+            "response": response["tokens"] if response else 0,
+            "evidence": evidence["tokens"] if evidence else 0,
+            "incidents": incidents["tokens"] if incidents else 0,
+        }
+        self.last_prompt_stats = {
+            "kind": kind,
+            "chars": len(prompt),
+            "est_tokens": template.literal_tokens + sum(sections.values()) + extra_tokens,
+            "sections": sections,
+            "chunks": retrieval["chunks"],
+            "duplicates_dropped": retrieval["duplicates_dropped"],
+            "history_summaries": history["summaries"],
+        }
+        logger.info(
+            "%s prompt turn=%d chars=%d est_tokens=%d retrieval=%d history=%d problem=%d response=%d "
+            "evidence=%d incidents=%d chunks=%d duplicates_dropped=%d",
+            kind, self.question_count, len(prompt), self.last_prompt_stats["est_tokens"],
+            sections["retrieval"], sections["history"], sections["problem"], sections["response"],
+            sections["evidence"], sections["incidents"],
+            retrieval["chunks"], retrieval["duplicates_dropped"],
+        )
+
+    @timed("analyze_response")
     def analyze_response(self, response):
+        in_context = self._record_context(response)
+        self._score_metrics(response)
+        if in_context:
+            return self.CONTEXT_RECORDED
+
+        if self._analyze_locally(response):
+            analysis = self._local_analysis(response)
+        else:
+            # RCA analysis using LLM
+            self.route_counts["remote analysis"] += 1
+            analysis = self._invoke_llm(self._analysis_prompt(response))
+        self._update_progress()
+        return analysis
+
+    def _record_context(self, response):
+        """Store answers to the problem context questions; True while in that phase"""
         if self.question_count <= 3:
             # Problem context collection
             if self.question_count == 1:
@@ -135,88 +464,303 @@ class TechnicalChatbot:
                 self.problem_context['occurrence_time'] = response
             elif self.question_count == 3:
                 self.problem_context['impact_severity'] = response
-            return "Problem context recorded. Let's begin the root cause investigation."
-
-        # RCA analysis using LLM
-        context = self.rag.retrieve(f"{self.workflow} root cause analysis techniques", k=3)
-        context_str = "\n".join(context)
-
-        history_str = "\n".join([f"Q: {q}\nA: {a}" for q, a in self.conversation_history[-3:]])
-        problem_str = str(self.problem_context)
-
-        prompt = PromptTemplate(
-            input_variables=["context", "response", "history", "problem", "workflow"],
-            template="""
-            You are analyzing a response in a {workflow} Root Cause Analysis investigation.
-
-            RCA Context:
-            {context}
-
-            Problem Context: {problem}
-
-            User's Response: {response}
+            self._problem_str = None
+            self._incident_matches = self._incidents_str = None
+            return True
+        return False
+
+    def _score_metrics(self, response):
+        """Update severity, root cause confidence and feasibility from the lexicon scores (no LLM call)"""
+        with span("metrics.score"):
+            if self._scorer is None:
+                # Restored or new investigation: score the whole history at once, this answer included
+                answers = [a for q, a in self.conversation_history if q != "System"][len(self.context_questions):]
+                self._scorer = MetricScorer.from_history(self.problem_context, answers)
+            elif self.question_count > len(self.context_questions):
+                self._scorer.add(response)
+            self._scorer.set_context(self.problem_context)
+            self.metrics.update(self._scorer.scores())
+
+    def _update_progress(self):
+        # Update metrics based on progress
+        self.metrics["Investigation Progress"] = min(100, (self.question_count / self.max_questions) * 100)
 
-            Investigation History: {history}
+    def _analysis_prompt(self, response):
+        with span("prompt.build", kind="analysis"):
+            query = WORKFLOW_QUERIES[1].format(workflow=self.workflow)
+            evidence_terms = self._evidence_query_terms()
+            if evidence_terms:
+                query = f"{query} {evidence_terms}"
+            context, retrieval_stats = self.context.retrieval(self._retrieve(query))
+            history, history_stats = self._history_str()
+            problem, problem_stats = self._problem_context_str()
+            evidence, evidence_stats = self._evidence_findings_str()
+            incidents, incident_stats = self._similar_incidents_str()
+            response, response_stats = self.context.response(response)
+
+            prompt = self.ANALYSIS_PROMPT.format(
+                context=context,
+                response=response,
+                history=history,
+                problem=problem,
+                incidents=incidents,
+                evidence=evidence,
+                workflow=self.workflow
+            )
+            self._log_prompt("analysis", prompt, self.ANALYSIS_PROMPT, retrieval_stats, history_stats,
+                             problem_stats, response_stats, evidence_stats, incident_stats,
+                             extra_tokens=2 * estimate_tokens(self.workflow))
+        return prompt
+
+    def _llm_params(self):
+        model = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", "unknown")
+        temperature = getattr(self.llm, "temperature", None)
+        return model, 0.0 if temperature is None else temperature
+
+    def _cache_params(self):
+        """(model, temperature) of the LLM if its responses may be cached, else None"""
+        if isinstance(self.llm, MockLLM) or self.cache is None:
+            # The mock cycles canned replies and costs nothing; keep its behaviour
+            return None
+        return self._llm_params()
 
-            Analyze this response and provide:
-            1. Key insights about potential root causes
-            2. What this reveals about the problem
-            3. Suggested next investigation steps
-            4. Update investigation progress (0-100%)
+    def _coalesce_key(self, prompt):
+        """Identical prompts to the same model in flight at once are sent only once"""
+        return cache_key(prompt, *self._llm_params())
 
-            Provide a brief, actionable analysis focusing on root cause identification.
-            Analysis:
-            """
-        )
-
-        formatted_prompt = prompt.format(
-            context=context_str,
-            response=response,
-            history=history_str,
-            problem=problem_str,
-            workflow=self.workflow
-        )
-        
+    def _invoke_llm(self, prompt):
         if isinstance(self.llm, MockLLM):
-            analysis = self.llm(formatted_prompt)
-        else:
-            response_obj = self.llm.invoke(formatted_prompt)
-            analysis = response_obj.content.strip()
-
-        # Update metrics based on progress
-        self.metrics["Investigation Progress"] = min(100, (self.question_count / self.max_questions) * 100)
-        
-        return analysis
+            with span("llm.invoke", mock=True):
+                return self.llm(prompt)
+        params = self._cache_params()
+        if params:
+            cached = self.cache.get(prompt, *params)
+            if cached is not None:
+                return cached
+        with span("llm.invoke"):
+            response = self.scheduler.invoke(self.llm, prompt, self.tenant, self.priority,
+                                             self._coalesce_key(prompt))
+        text = response.content.strip()
+        if params:
+            self.cache.set(prompt, *params, text)
+        return text
+
+    async def _ainvoke_llm(self, prompt):
+        if isinstance(self.llm, MockLLM):
+            with span("llm.invoke", mock=True):
+                return await self.llm.acall(prompt)
+        params = self._cache_params()
+        if params:
+            cached = self.cache.get(prompt, *params)
+            if cached is not None:
+                return cached
+        with span("llm.invoke"):
+            response = await self.scheduler.ainvoke(self.llm, prompt, self.tenant, self.priority,
+                                                    self._coalesce_key(prompt))
+        text = response.content.strip()
+        if params:
+            self.cache.set(prompt, *params, text)
+        return text
+
+    def _stream_llm(self, prompt):
+        """Yield the LLM completion for prompt piece by piece as it arrives"""
+        if isinstance(self.llm, MockLLM):
+            yield from self._timed_stream(self.llm.stream(prompt), mock=True)
+            return
+        params = self._cache_params()
+        if params:
+            cached = self.cache.get(prompt, *params)
+            if cached is not None:
+                yield cached
+                return
+        pieces = []
+        for chunk in self._timed_stream(self.scheduler.stream(self.llm, prompt, self.tenant, self.priority)):
+            text = chunk.content if pieces else chunk.content.lstrip()
+            if text:
+                pieces.append(text)
+                yield text
+        if params:
+            self.cache.set(prompt, *params, "".join(pieces).strip())
+
+    @staticmethod
+    def _timed_stream(chunks, **attrs):
+        """Pass chunks through, recording llm.first_token and llm.stream.
+
+        Only the time spent waiting on the model counts; the consumer's time
+        between chunks (e.g. rendering them) is left out.
+        """
+        telemetry = get_shared_telemetry()
+        if not telemetry.enabled:
+            yield from chunks
+            return
+        waited, first, end = 0.0, None, object()
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, end)
+            waited += time.perf_counter() - start
+            if chunk is end:
+                break
+            if first is None:
+                first = waited
+                telemetry.observe("llm.first_token", first, **attrs)
+            yield chunk
+        telemetry.observe("llm.stream", waited, **attrs)
+
+    def _store_response(self, user_input):
+        prev_question = self.conversation_history[-1][0] if self.conversation_history and self.conversation_history[-1][0] != "System" else "Initial"
+        self._append_history(prev_question, user_input)
 
     def chat(self, user_input):
         if user_input.lower() in ['start', 'begin']:
             self.conversation_history = []
             self.problem_context = {}
+            self._history_window.clear()
+            self.state.history_summaries = []
+            self._problem_str = None
+            self._incident_matches = self._incidents_str = None
+            self.state.incident_id = None
+            self.complete = False
+            self.route_counts.clear()
+            self._scorer = None
             self.metrics = {k: 0 for k in self.metrics}
             self.question_count = 0
             self.evidence_images = []
+            self.evidence_findings = []
+            self._evidence_str = self._evidence_query = None
             question = self.generate_question()
-            self.conversation_history.append(("System", f"{self.workflow} Investigation started"))
+            self._append_history("System", f"{self.workflow} Investigation started")
             return f"Welcome to the AI-Driven Technical Problem-Solving Chatbot.\n\nI'll guide you through a {self.workflow} Root Cause Analysis investigation.\n\n{question}"
 
-        # Store response
-        prev_question = self.conversation_history[-1][0] if self.conversation_history and self.conversation_history[-1][0] != "System" else "Initial"
-        self.conversation_history.append((prev_question, user_input))
+        self._store_response(user_input)
 
         analysis = self.analyze_response(user_input)
 
         if self.question_count >= self.max_questions:
+            self.complete = True
+            self.archive_incident(analysis)
             return f"Investigation complete.\n\n{analysis}\n\nYou can now generate a detailed RCA report with your findings."
 
         next_question = self.generate_question()
         return f"{analysis}\n\n{next_question}"
 
-    def get_metrics(self):
+    def chat_stream(self, user_input):
+        """Same turn as chat(), but yields the reply as the LLM produces it.
+
+        Analysis tokens are yielded first, then the next question's tokens;
+        joining everything yielded gives the string chat() would return.
+        """
+        if user_input.lower() in ['start', 'begin']:
+            yield self.chat(user_input)
+            return
+
+        self._store_response(user_input)
+
+        complete = self.question_count >= self.max_questions
+        if complete:
+            yield "Investigation complete.\n\n"
+
+        analysis = []
+        in_context = self._record_context(user_input)
+        self._score_metrics(user_input)
+        if in_context:
+            yield self.CONTEXT_RECORDED
+        elif self._analyze_locally(user_input):
+            analysis.append(self._local_analysis(user_input))
+            yield analysis[0]
+            self._update_progress()
+        else:
+            self.route_counts["remote analysis"] += 1
+            for piece in self._stream_llm(self._analysis_prompt(user_input)):
+                analysis.append(piece)
+                yield piece
+            self._update_progress()
+
+        if complete:
+            self.complete = True
+            self.archive_incident("".join(analysis))
+            yield "\n\nYou can now generate a detailed RCA report with your findings."
+            return
+
+        yield "\n\n"
+        if self.question_count < 3:
+            yield self.context_questions[self.question_count]
+        elif self.routing != "remote":
+            yield self._local_question()
+        else:
+            self.route_counts["remote question"] += 1
+            yield from self._stream_llm(self._question_prompt())
+        self.question_count += 1
+
+    async def achat(self, user_input):
+        """Async chat(): the turn's retrievals and LLM calls run concurrently.
+
+        The next-question prompt only depends on the history and the new
+        answer, not on the analysis text, so both LLM calls are issued
+        together and the turn takes about as long as the slower one. The
+        returned text, history and metrics match chat().
+        """
+        if user_input.lower() in ['start', 'begin']:
+            return self.chat(user_input)
+
+        self._store_response(user_input)
+
+        in_context = self._record_context(user_input)
+        self._score_metrics(user_input)
+        local_analysis = not in_context and self._analyze_locally(user_input)
+        if not in_context:
+            # Progress only depends on question_count, so apply it before the
+            # question prompt is built, exactly as chat() would have
+            self._update_progress()
+        complete = self.question_count >= self.max_questions
+        ask_llm = not complete and self.question_count >= 3 and self.routing == "remote"
+
+        prompt_jobs = []
+        if not in_context and not local_analysis:
+            self.route_counts["remote analysis"] += 1
+            prompt_jobs.append(asyncio.to_thread(self._analysis_prompt, user_input))
+        if ask_llm:
+            self.route_counts["remote question"] += 1
+            prompt_jobs.append(asyncio.to_thread(self._question_prompt))
+        prompts = await asyncio.gather(*prompt_jobs)
+        # Issue the calls in chat() order so stateful mocks answer identically
+        replies = list(await asyncio.gather(*(self._ainvoke_llm(p) for p in prompts)))
+
+        if in_context:
+            analysis = self.CONTEXT_RECORDED
+        elif local_analysis:
+            analysis = self._local_analysis(user_input)
+        else:
+            analysis = replies.pop(0)
+        if complete:
+            self.complete = True
+            self.archive_incident(analysis)
+            return f"Investigation complete.\n\n{analysis}\n\nYou can now generate a detailed RCA report with your findings."
+
+        if ask_llm:
+            next_question = replies.pop(0)
+        elif self.question_count < 3:
+            next_question = self.context_questions[self.question_count]
+        else:
+            next_question = self._local_question()
+        self.question_count += 1
+        return f"{analysis}\n\n{next_question}"
+
+    def get_metrics(self, include_cache=False):
+        if include_cache and self.cache is not None:
+            return {**self.metrics, **self.cache.stats()}
         return self.metrics
     
-    def add_evidence_image(self, image_path):
-        """Add evidence image to the investigation"""
-        self.evidence_images.append(image_path)
+    def add_evidence_image(self, image_path, features=None):
+        """Add evidence image to the investigation; the same stored image is only recorded once.
+
+        features (from ImageAnalyzer) are kept as findings for the analysis prompt and retrieval query.
+        """
+        if image_path not in self.evidence_images:
+            self.evidence_images.append(image_path)
+            if features:
+                self.evidence_findings.append({"image": image_path, **features})
+                self._evidence_str = self._evidence_query = None
         return f"Evidence image added: {image_path}"
     
     def set_workflow(self, workflow):
@@ -227,7 +771,10 @@ class TechnicalChatbot:
         return "Invalid workflow. Choose: 8D, 5-Why, or A3"
 
 class MockLLM:
-    def __init__(self):
+    def __init__(self, latency=0.0, token_delay=0.0):
+        # Optional synthetic timing: latency before the first token, token_delay per token
+        self.latency = latency
+        self.token_delay = token_delay
         self.mock_question_index = 0
         self.rca_questions = [
             "Can you describe the exact symptoms or manifestations of this problem? What specifically goes wrong?",
@@ -249,6 +796,32 @@ class MockLLM:
         ]
 
     def __call__(self, prompt):
+        text = self._respond(prompt)
+        if self.latency or self.token_delay:
+            time.sleep(self.latency + self.token_delay * len(self._tokens(text)))
+        return text
+
+    async def acall(self, prompt):
+        text = self._respond(prompt)
+        if self.latency or self.token_delay:
+            await asyncio.sleep(self.latency + self.token_delay * len(self._tokens(text)))
+        return text
+
+    def stream(self, prompt):
+        """Yield the response word by word, like a streaming chat model"""
+        tokens = self._tokens(self._respond(prompt))
+        if self.latency:
+            time.sleep(self.latency)
+        for token in tokens:
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
+
+    @staticmethod
+    def _tokens(text):
+        return re.findall(r"\S+\s*", text)
+
+    def _respond(self, prompt):
         if "Question:" in prompt or "generate" in prompt.lower():
             # RCA question generation
             q = self.rca_questions[self.mock_question_index % len(self.rca_questions)]
@@ -0,0 +1,160 @@
+import re
+from functools import lru_cache
+
+# Word runs and single punctuation marks, roughly how BPE tokenizers split text
+TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+DEFAULT_BUDGETS = {
+    "retrieval": 700,  # methodology chunks from the RAG index
+    "history": 500,    # recent Q/A pairs plus summaries of older ones
+    "problem": 250,    # problem context collected in the first questions
+    "response": 400,   # the user answer being analyzed
+    "evidence": 200,   # OCR text and defect features of evidence images
+    "incidents": 200,  # similar past incidents from the incident store
+}
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text):
+    """Fast local token estimate, close to tiktoken counts for English prose.
+
+    Each word or punctuation mark is one token, plus one more for every six
+    characters of a long word, which is how BPE vocabularies tend to split
+    identifiers, part numbers and rare words.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_PIECES.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens, marker=" \u2026"):
+    """Cut text at a token boundary so it fits in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    end = 0
+    for match in TOKEN_PIECES.finditer(text):
+        used += 1 + (len(match.group()) - 1) // 6
+        if used > max_tokens - 1:
+            break
+        end = match.end()
+    return text[:end] + marker
+
+
+def summarize_turn(question, answer, max_tokens=40):
+    """One-line deterministic digest of an older Q/A pair: question gist plus the answer's first sentence"""
+    first_sentence = SENTENCE_END.split(answer.strip(), 1)[0]
+    question = truncate_to_tokens(question, max_tokens // 3)
+    return f"- {question} -> {truncate_to_tokens(first_sentence, max_tokens - estimate_tokens(question))}"
+
+
+@lru_cache(maxsize=1024)
+def shingles(text, size=3):
+    words = TOKEN_PIECES.findall(text.lower())
+    if len(words) <= size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def dedupe_chunks(chunks, threshold=0.8):
+    """Drop chunks whose word 3-gram Jaccard similarity to an earlier kept chunk is >= threshold"""
+    kept, kept_shingles = [], []
+    for chunk in chunks:
+        current = shingles(chunk)
+        if any(len(current & other) / len(current | other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(chunk)
+        kept_shingles.append(current)
+    return kept
+
+
+class ContextAssembler:
+    """Fits each prompt section into its token budget.
+
+    Retrieved chunks are de-duplicated and packed in rank order, the last
+    one truncated if enough budget remains. History keeps the most recent
+    pairs first and fills what is left with summaries of older turns,
+    newest first. Problem context values and the user response are trimmed
+    at token boundaries, so the same inputs always give the same prompt.
+    """
+
+    MIN_PARTIAL_CHUNK = 60
+
+    def __init__(self, budgets=None):
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+
+    def retrieval(self, chunks):
+        budget = self.budgets["retrieval"]
+        unique = dedupe_chunks(chunks)
+        parts, used = [], 0
+        for chunk in unique:
+            remaining = budget - used
+            cost = estimate_tokens(chunk)
+            if cost > remaining:
+                if remaining >= self.MIN_PARTIAL_CHUNK:
+                    chunk = truncate_to_tokens(chunk, remaining)
+                    parts.append(chunk)
+                    used += estimate_tokens(chunk)
+                break
+            parts.append(chunk)
+            used += cost
+        return "\n".join(parts), {"tokens": used, "chunks": len(parts),
+                                  "duplicates_dropped": len(chunks) - len(unique)}
+
+    def history(self, recent, summaries):
+        """recent: rendered Q/A pairs, oldest first; summaries: digests of older turns, oldest first"""
+        budget = self.budgets["history"]
+        kept, used = [], 0
+        for pair in reversed(recent):
+            pair = truncate_to_tokens(pair, budget - used)
+            if not pair:
+                break
+            kept.append(pair)
+            used += estimate_tokens(pair)
+        kept.reverse()
+
+        earlier = []
+        for summary in reversed(summaries):
+            cost = estimate_tokens(summary)
+            if used + cost > budget:
+                break
+            earlier.append(summary)
+            used += cost
+        if earlier:
+            earlier.reverse()
+            kept.insert(0, "Earlier findings (summarized):\n" + "\n".join(earlier))
+        return "\n".join(kept), {"tokens": used, "summaries": len(earlier)}
+
+    def problem(self, problem_context):
+        if not problem_context:
+            return str(problem_context), {"tokens": 0}
+        per_value = max(1, self.budgets["problem"] // len(problem_context))
+        trimmed = {key: truncate_to_tokens(str(value), per_value) for key, value in problem_context.items()}
+        text = str(trimmed)
+        return text, {"tokens": estimate_tokens(text)}
+
+    def evidence(self, findings):
+        """findings: one line per evidence image, oldest first; kept in order until the budget is spent"""
+        text, used, kept = self._lines(findings, self.budgets["evidence"])
+        return text, {"tokens": used, "images": kept}
+
+    def incidents(self, matches):
+        """matches: one line per similar past incident, best first; kept in order until the budget is spent"""
+        text, used, kept = self._lines(matches, self.budgets["incidents"])
+        return text, {"tokens": used, "incidents": kept}
+
+    @staticmethod
+    def _lines(lines, budget):
+        kept, used = [], 0
+        for line in lines:
+            line = truncate_to_tokens(line, budget - used)
+            if not line:
+                break
+            kept.append(line)
+            used += estimate_tokens(line)
+        return "\n".join(kept) or "None", used, len(kept)
+
+    def response(self, response):
+        text = truncate_to_tokens(response, self.budgets["response"])
+        return text, {"tokens": estimate_tokens(text)}
@@ -0,0 +1,136 @@
+import io
+import os
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Stored images and thumbnails; set RCA_EVIDENCE_DIR to move them
+DEFAULT_EVIDENCE_DIR = os.getenv("RCA_EVIDENCE_DIR", ".evidence")
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+def write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class EvidenceStore:
+    """Content-addressed evidence images with a cached thumbnail per image.
+
+    Originals live at objects/<sha[:2]>/<sha><ext>, so uploading the same
+    bytes again (under any name) maps to the file already on disk. Each
+    image gets one JPEG thumbnail at thumbs/<sha>.jpg, generated once in a
+    background thread pool; later sessions and reruns only stat the file.
+    """
+
+    def __init__(self, root=DEFAULT_EVIDENCE_DIR, thumbnail_size=THUMBNAIL_SIZE, max_workers=2):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evidence-thumbs")
+        self._pending = {}  # digest -> Future for thumbnails being generated
+        self._failed = set()  # unreadable images, not retried
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "thumbnails": 0, "failed": 0}
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "thumbs"), exist_ok=True)
+
+    @staticmethod
+    def digest_of(path):
+        """Content hash of a stored image from its path"""
+        return os.path.basename(path).split(".", 1)[0]
+
+    def object_path(self, digest, ext):
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def thumbnail_path(self, digest):
+        return os.path.join(self.root, "thumbs", digest + ".jpg")
+
+    def add(self, data, filename=""):
+        """Store image bytes and queue their thumbnail; returns the stored path"""
+        digest = hashlib.sha256(data).hexdigest()
+        ext = os.path.splitext(filename)[1].lower()
+        path = self.object_path(digest, ext if ext in IMAGE_EXTENSIONS else ".img")
+        if os.path.exists(path):
+            self.stats["deduplicated"] += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, data)
+            self.stats["stored"] += 1
+        self._schedule(digest, path)
+        return path
+
+    def _schedule(self, digest, path):
+        with self._lock:
+            if digest in self._pending or digest in self._failed or os.path.exists(self.thumbnail_path(digest)):
+                return self._pending.get(digest)
+            future = self._pool.submit(self._make_thumbnail, digest, path)
+            self._pending[digest] = future
+            return future
+
+    def _make_thumbnail(self, digest, path):
+        from PIL import Image
+
+        target = self.thumbnail_path(digest)
+        try:
+            with Image.open(path) as image:
+                image.draft("RGB", self.thumbnail_size)  # JPEG: decode at reduced scale
+                image.thumbnail(self.thumbnail_size)
+                buf = io.BytesIO()
+                image.convert("RGB").save(buf, format="JPEG", quality=85)
+            write_atomic(target, buf.getvalue())
+        except Exception as e:
+            print(f"Warning: Could not create thumbnail for {path}: {e}")
+            with self._lock:
+                self._failed.add(digest)
+            self.stats["failed"] += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+        self.stats["thumbnails"] += 1
+        return target
+
+    def thumbnail(self, path, wait=True):
+        """Thumbnail path for a stored image, or None if unavailable.
+
+        With wait=False a thumbnail still being generated also returns None
+        instead of blocking.
+        """
+        digest = self.digest_of(path)
+        target = self.thumbnail_path(digest)
+        if os.path.exists(target):
+            return target
+        with self._lock:
+            future = self._pending.get(digest)
+        if future is None and os.path.exists(path):
+            # Stored by another process, or the thumbnail was removed
+            future = self._schedule(digest, path)
+        if future is None:
+            # Finished between the checks above, or the image is unreadable
+            return target if os.path.exists(target) else None
+        if not wait:
+            return None
+        return future.result()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_evidence_store():
+    """Process-wide EvidenceStore under DEFAULT_EVIDENCE_DIR"""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = EvidenceStore()
+    return _shared_store
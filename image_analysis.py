@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from evidence_store import DEFAULT_EVIDENCE_DIR, write_atomic
+
+# Bump when extract_features changes so cached results are recomputed
+FEATURES_VERSION = 1
+DEFAULT_FEATURES_DIR = os.getenv("RCA_IMAGE_FEATURES_DIR", os.path.join(DEFAULT_EVIDENCE_DIR, "features"))
+MAX_SIDE = 1600       # images are downscaled to this before feature extraction
+MAX_OCR_CHARS = 500
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_tesseract = None
+
+
+def _tesseract_available():
+    """Checked once per process: pytesseract writes a temp image before finding a missing binary"""
+    global _tesseract
+    if _tesseract is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            _tesseract = True
+        except (ImportError, EnvironmentError, RuntimeError):
+            _tesseract = False
+    return _tesseract
+
+
+def extract_features(path):
+    """OCR text and defect features of one image; runs in a worker process.
+
+    Blobs are connected dark or bright regions that stand out from the
+    Otsu threshold (spots, pits, inclusions); edge density is the share
+    of Canny edge pixels, high for cracks, scratches and busy screenshots.
+    """
+    import cv2
+    import numpy as np
+    from skimage import filters, measure
+
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError(f"Unreadable image: {path}")
+    height, width = gray.shape
+    scale = MAX_SIDE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    edge_density = float(np.count_nonzero(edges)) / edges.size
+
+    # Blobs are the minority side of the threshold, ignoring specks under 0.01% of the image
+    mask = blurred > filters.threshold_otsu(blurred) if blurred.std() > 0 else np.zeros_like(blurred, bool)
+    if mask.mean() > 0.5:
+        mask = ~mask
+    labels = measure.label(mask, connectivity=2)
+    areas = np.bincount(labels.ravel())[1:]
+    blob_count = int(np.count_nonzero(areas >= max(4, mask.size // 10000)))
+
+    ocr_text, ocr_available = "", _tesseract_available()
+    if ocr_available:
+        import pytesseract
+        ocr_text = " ".join(pytesseract.image_to_string(gray).split())[:MAX_OCR_CHARS]
+
+    return {
+        "version": FEATURES_VERSION,
+        "width": width,
+        "height": height,
+        "edge_density": round(edge_density, 4),
+        "blob_count": blob_count,
+        "ocr_text": ocr_text,
+        "ocr_available": ocr_available,
+    }
+
+
+def describe(features, label="Image"):
+    """One-line finding for prompts and retrieval"""
+    parts = []
+    if features.get("ocr_text"):
+        parts.append(f'text "{features["ocr_text"]}"')
+    parts.append(f'{features["blob_count"]} blob(s)')
+    parts.append(f'edge density {features["edge_density"]:.3f}')
+    return f"{label}: " + "; ".join(parts)
+
+
+class ImageAnalyzer:
+    """Batched image analysis in a process pool, cached per image hash.
+
+    Results are kept in memory and as one JSON file per sha256 under
+    cache_dir, so an image that was analyzed before (in this or any other
+    process) is never decoded again.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_FEATURES_DIR, max_workers=None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._warned_ocr = False
+        self.stats = {"analyzed": 0, "cache_hits": 0, "failed": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, digest + ".json")
+
+    def _cached(self, digest):
+        features = self._memory.get(digest)
+        if features is None:
+            try:
+                with open(self._cache_path(digest), encoding="utf-8") as f:
+                    features = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if features.get("version") != FEATURES_VERSION:
+                return None
+        # Analyzed without OCR while tesseract was missing: redo it now that it is installed
+        if not features.get("ocr_available") and _tesseract_available():
+            return None
+        self._memory[digest] = features
+        return features
+
+    def analyze(self, paths):
+        """Features for each path, in order (None for unreadable images)"""
+        digests = [file_digest(path) for path in paths]
+        results = [self._cached(digest) for digest in digests]
+        misses = {}
+        for i, (path, digest) in enumerate(zip(paths, digests)):
+            if results[i] is None:
+                misses.setdefault(digest, (path, []))[1].append(i)
+            else:
+                self.stats["cache_hits"] += 1
+        if misses:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            futures = {digest: self._pool.submit(extract_features, path) for digest, (path, _) in misses.items()}
+            for digest, future in futures.items():
+                try:
+                    features = future.result()
+                except Exception as e:
+                    print(f"Warning: Image analysis failed for {misses[digest][0]}: {e}")
+                    self.stats["failed"] += 1
+                    continue
+                if not features["ocr_available"] and not self._warned_ocr:
+                    print("Warning: tesseract not available; evidence images are analyzed without OCR")
+                    self._warned_ocr = True
+                self._memory[digest] = features
+                write_atomic(self._cache_path(digest), json.dumps(features).encode("utf-8"))
+                self.stats["analyzed"] += 1
+                for i in misses[digest][1]:
+                    results[i] = features
+        return results
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_shared_analyzer = None
+_shared_analyzer_lock = threading.Lock()
+
+
+def get_shared_analyzer():
+    """Process-wide ImageAnalyzer writing to DEFAULT_FEATURES_DIR"""
+    global _shared_analyzer
+    if _shared_analyzer is None:
+        with _shared_analyzer_lock:
+            if _shared_analyzer is None:
+                _shared_analyzer = ImageAnalyzer()
+    return _shared_analyzer
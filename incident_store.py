@@ -0,0 +1,452 @@
+"""Archive of completed investigations with similar-incident search.
+
+Every finished investigation (problem context, Q/A history, final
+analysis) is appended to an on-disk store together with a fixed-size
+vector of its text. A new investigation is matched against the archive by
+cosine similarity of those vectors:
+
+- up to exact_threshold incidents, by scanning every vector;
+- beyond that, through an inverted-file (IVF) index: the vectors are
+  grouped by their nearest k-means centroid and a query only scans the
+  nprobe lists whose centroids are closest. Incidents added since the
+  index was built are scanned exactly until the next reindex.
+
+Files under the store directory:
+
+    records.jsonl  one JSON record per incident, append-only
+    records.idx    int64 end offset of each record; an incident exists once its offset is written
+    vectors.f32    float32 vectors, DIM per incident, in insertion order
+    ivf.json       current IVF generation; its arrays live in ivf-<generation>/
+
+    python incident_store.py --reindex
+    python incident_store.py --query "hydraulic press seal leaks after start-up"
+"""
+import os
+import json
+import math
+import time
+import uuid
+import zlib
+import shutil
+import argparse
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+from rag_engine import tokenize
+from context_builder import truncate_to_tokens
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: appends are then only serialized within one process
+    fcntl = None
+
+# Set RCA_INCIDENT_DIR to move the store, or to an empty string to disable it
+DEFAULT_INCIDENT_DIR = os.getenv("RCA_INCIDENT_DIR", ".incidents")
+
+# Hashed bag-of-words dimensions
+DIM = 256
+ROW_BYTES = DIM * 4
+# Stores up to this size are always searched exactly
+EXACT_THRESHOLD = 20000
+# Matches below this cosine similarity are not worth showing
+MIN_SIMILARITY = 0.25
+# Rows scored per block in exact scans and list assignment
+SCAN_BLOCK = 65536
+
+
+@lru_cache(maxsize=65536)
+def _feature(token):
+    # crc32 rather than hash(): the vectors are stored, so the mapping must not change between runs
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % DIM, 1.0 if h & 0x80000000 else -1.0
+
+
+def embed(text):
+    """Unit-length signed feature-hashing vector of the text's word counts (sublinear tf)"""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for token, count in Counter(tokenize(text)).items():
+        column, sign = _feature(token)
+        vector[column] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def incident_text(record):
+    """The text an incident is indexed by: problem context, answers and final analysis"""
+    parts = [str(value) for value in record.get("problem_context", {}).values()]
+    parts.extend(str(a) for q, a in record.get("history", []) if q != "System")
+    if record.get("analysis"):
+        parts.append(record["analysis"])
+    return "\n".join(parts)
+
+
+def format_match(match, max_tokens=40):
+    """One line per match for prompts and reports"""
+    record = match["record"]
+    problem = record.get("problem_context", {}).get("problem_description", "")
+    answers = [a for q, a in record.get("history", []) if q != "System"]
+    line = (f"{record['id']} ({record.get('workflow', '?')}, {record.get('created', '')[:10]}, "
+            f"similarity {match['score']:.2f}): {truncate_to_tokens(str(problem), max_tokens)}")
+    if answers:
+        line += f" -> last finding: {truncate_to_tokens(str(answers[-1]), max_tokens)}"
+    return line
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first, ties broken by position"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def exact_search(vectors, query, k, offset=0):
+    """(row ids, scores) of the top-k rows of vectors, scanned block by block"""
+    ids, scores = [], []
+    for start in range(0, len(vectors), SCAN_BLOCK):
+        block = vectors[start:start + SCAN_BLOCK] @ query
+        top = top_k(block, k)
+        ids.append(top + start + offset)
+        scores.append(block[top])
+    if not ids:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    ids, scores = np.concatenate(ids), np.concatenate(scores)
+    top = top_k(scores, k)
+    return ids[top], scores[top]
+
+
+def assign_lists(vectors, centroids):
+    """Index of the nearest (highest inner product) centroid for every row"""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SCAN_BLOCK):
+        assign[start:start + SCAN_BLOCK] = np.argmax(vectors[start:start + SCAN_BLOCK] @ centroids.T, axis=1)
+    return assign
+
+
+def train_centroids(vectors, nlist, iterations=8, sample_per_list=64, seed=0):
+    """Spherical k-means on a sample of at most nlist * sample_per_list rows"""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample = np.asarray(vectors[np.sort(rng.choice(n, min(n, nlist * sample_per_list), replace=False))])
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = assign_lists(sample, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.empty_like(centroids)
+        sums[nonempty] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts[nonempty])
+        # Lists that lost every member restart from random rows
+        sums[~nonempty] = sample[rng.choice(len(sample), int((~nonempty).sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index over unit vectors.
+
+    Rows are stored grouped by list (nearest centroid), so the lists probed
+    by a query are contiguous slices; ids maps those positions back to
+    store rows.
+    """
+
+    def __init__(self, centroids, offsets, ids, vectors, assign):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.assign = assign  # list of every indexed row, in row order; reused by incremental reindexing
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, centroids, assign):
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(centroids, offsets, order, np.asarray(vectors[order]), assign)
+
+    def search(self, query, k, nprobe):
+        nprobe = min(nprobe, self.nlist)
+        probe = top_k(self.centroids @ query, nprobe)
+        starts, ends = self.offsets[probe], self.offsets[probe + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        scores = self.vectors[positions] @ query
+        top = top_k(scores, k)
+        return self.ids[positions[top]], scores[top]
+
+
+class IncidentStore:
+    """Append-only archive of completed investigations, searchable by similarity.
+
+    Appends from several processes (service workers, batch workers) are
+    serialized by a lock file; each process picks up the others' incidents
+    and rebuilt indexes on its next search. Once the exactly-scanned tail
+    outgrows tail_limit, the IVF index is rebuilt in a background thread,
+    reusing the trained centroids until the store has grown fourfold.
+    """
+
+    def __init__(self, root=DEFAULT_INCIDENT_DIR, nprobe=16, exact_threshold=EXACT_THRESHOLD, tail_limit=None,
+                 background_reindex=True):
+        self.root = root
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.tail_limit = tail_limit or max(1000, exact_threshold // 2)
+        self.background_reindex = background_reindex
+        self._lock = threading.Lock()
+        self._count = 0
+        self._vectors = None
+        self._offsets = None
+        self._ivf = None
+        self._ivf_meta = None
+        self._ivf_stamp = None
+        self._reindexing = None
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return self._count
+
+    @contextmanager
+    def _file_lock(self, name="append.lock", blocking=True):
+        """Exclusive inter-process lock; yields False if not blocking and already held"""
+        with open(self._path(name), "a") as f:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Re-map the files if other processes appended incidents or rebuilt the index"""
+        try:
+            count = os.stat(self._path("records.idx")).st_size // 8
+        except FileNotFoundError:
+            count = 0
+        if count != self._count or self._vectors is None:
+            self._count = count
+            self._vectors = (np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(count, DIM))
+                             if count else np.zeros((0, DIM), dtype=np.float32))
+            self._offsets = (np.memmap(self._path("records.idx"), dtype=np.int64, mode="r", shape=(count,))
+                             if count else np.zeros(0, dtype=np.int64))
+        try:
+            stamp = os.stat(self._path("ivf.json")).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._ivf_stamp:
+            self._ivf_stamp = stamp
+            self._ivf, self._ivf_meta = self._load_ivf() if stamp else (None, None)
+
+    def _load_ivf(self):
+        try:
+            with open(self._path("ivf.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            directory = self._path(f"ivf-{meta['generation']}")
+            arrays = [np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+                      for name in ("centroids", "offsets", "ids", "vectors", "assign")]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: incident index at {self.root} unreadable, searching exactly: {e}")
+            return None, None
+        return IVFIndex(*arrays), meta
+
+    def add(self, record):
+        """Append one incident record; returns its id"""
+        return self.add_many([record])[0]
+
+    def add_many(self, records):
+        """Append incident records (dicts); missing ids and timestamps are filled in"""
+        ids, lines, vectors = [], [], []
+        for record in records:
+            record = {**record, "id": record.get("id") or uuid.uuid4().hex[:12],
+                      "created": record.get("created") or time.strftime("%Y-%m-%dT%H:%M:%S")}
+            ids.append(record["id"])
+            lines.append((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+            vectors.append(embed(incident_text(record)))
+        if not ids:
+            return ids
+        ends = np.cumsum([len(line) for line in lines], dtype=np.int64)
+        with self._lock, self._file_lock():
+            try:
+                count = os.path.getsize(self._path("records.idx")) // 8
+            except FileNotFoundError:
+                count = 0
+            end = 0
+            if count:
+                with open(self._path("records.idx"), "rb") as f:
+                    f.seek((count - 1) * 8)
+                    end = int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+            # Cut whatever a crashed append left past the last committed incident, then append;
+            # the offsets are written last since they are what makes the new incidents visible
+            for name, size, data in (("records.jsonl", end, b"".join(lines)),
+                                     ("vectors.f32", count * ROW_BYTES, np.stack(vectors).tobytes()),
+                                     ("records.idx", count * 8, (ends + end).tobytes())):
+                with open(self._path(name), "ab") as f:
+                    f.truncate(size)
+                    f.write(data)
+            self._sync()
+            indexed = self._ivf_meta["n_indexed"] if self._ivf_meta else 0
+            stale = self._count >= self.exact_threshold and self._count - indexed >= self.tail_limit
+        if stale:
+            if not self.background_reindex:
+                self.reindex()
+            elif self._reindexing is None or not self._reindexing.is_alive():
+                self._reindexing = threading.Thread(target=self.reindex, name="incident-reindex", daemon=True)
+                self._reindexing.start()
+        return ids
+
+    def reindex(self, retrain=False):
+        """Rebuild the IVF index over every incident; returns False if another process is at it"""
+        with self._file_lock("reindex.lock", blocking=False) as acquired:
+            if not acquired:
+                return False
+            with self._lock:
+                self._sync()
+                count, vectors, ivf, meta = self._count, self._vectors, self._ivf, self._ivf_meta
+            if not count:
+                return True
+            start = time.perf_counter()
+            if ivf is None or retrain or count >= 4 * meta["n_trained"]:
+                nlist = max(1, min(int(math.sqrt(count)), count // 39))
+                centroids = train_centroids(vectors, nlist)
+                assign = assign_lists(vectors, centroids)
+                n_trained = count
+            else:
+                # Same centroids: only the rows added since the last build need assigning
+                centroids, n_trained = np.asarray(ivf.centroids), meta["n_trained"]
+                indexed = meta["n_indexed"]
+                assign = np.concatenate([ivf.assign[:indexed], assign_lists(vectors[indexed:count], centroids)])
+            index = IVFIndex.build(vectors, centroids, assign)
+
+            generation = uuid.uuid4().hex[:8]
+            directory = self._path(f"ivf-{generation}")
+            os.makedirs(directory)
+            for name in ("centroids", "offsets", "ids", "vectors", "assign"):
+                np.save(os.path.join(directory, name + ".npy"), getattr(index, name))
+            meta = {"generation": generation, "n_indexed": count, "n_trained": n_trained, "nlist": index.nlist,
+                    "dim": DIM, "build_s": round(time.perf_counter() - start, 3)}
+            tmp = self._path(f".ivf.json.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self._path("ivf.json"))
+            # Readers still holding an older generation keep their memory maps open
+            for name in os.listdir(self.root):
+                if name.startswith("ivf-") and name != f"ivf-{generation}":
+                    shutil.rmtree(self._path(name), ignore_errors=True)
+        return True
+
+    def get(self, row):
+        """Record of the incident at a row"""
+        with self._lock:
+            self._sync()
+            offsets = self._offsets
+        start = int(offsets[row - 1]) if row else 0
+        with open(self._path("records.jsonl"), "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(int(offsets[row]) - start))
+
+    def search_rows(self, query, k=3, exact=False):
+        """(rows, scores) of the incidents most similar to a query vector"""
+        with self._lock:
+            self._sync()
+            count, vectors, ivf = self._count, self._vectors, self._ivf
+        if ivf is None or exact or count < self.exact_threshold:
+            return exact_search(vectors[:count], query, k)
+        rows, scores = ivf.search(query, k, self.nprobe)
+        indexed = len(ivf)
+        if count > indexed:
+            tail_rows, tail_scores = exact_search(vectors[indexed:count], query, k, offset=indexed)
+            rows, scores = np.concatenate([rows, tail_rows]), np.concatenate([scores, tail_scores])
+            top = top_k(scores, k)
+            rows, scores = rows[top], scores[top]
+        return rows, scores
+
+    def search(self, text, k=3, exclude=(), min_score=MIN_SIMILARITY, exact=False):
+        """Up to k matches {"id", "score", "record"} for a text, best first; ids in exclude are skipped"""
+        query = embed(text)
+        if not query.any():
+            return []
+        rows, scores = self.search_rows(query, k + len(exclude), exact)
+        matches = []
+        for row, score in zip(rows.tolist(), scores.tolist()):
+            if score < min_score or len(matches) == k:
+                break
+            record = self.get(row)
+            if record["id"] not in exclude:
+                matches.append({"id": record["id"], "score": score, "record": record})
+        return matches
+
+    def stats(self):
+        with self._lock:
+            self._sync()
+            meta = self._ivf_meta or {}
+            return {"incidents": self._count, "indexed": meta.get("n_indexed", 0), "nlist": meta.get("nlist", 0),
+                    "mode": "ivf" if self._ivf is not None and self._count >= self.exact_threshold else "exact"}
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_incident_store():
+    """Process-wide IncidentStore under DEFAULT_INCIDENT_DIR, or None when RCA_INCIDENT_DIR is empty"""
+    global _shared_store
+    if _shared_store is None and DEFAULT_INCIDENT_DIR:
+        with _shared_store_lock:
+            if _shared_store is None:
+                try:
+                    _shared_store = IncidentStore()
+                except OSError as e:
+                    print(f"Warning: Incident store at {DEFAULT_INCIDENT_DIR} unavailable: {e}")
+    return _shared_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, reindex or query the incident store")
+    parser.add_argument("--dir", default=DEFAULT_INCIDENT_DIR or ".incidents", help="store directory")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the IVF index now")
+    parser.add_argument("--retrain", action="store_true", help="with --reindex, also retrain the centroids")
+    parser.add_argument("--query", help="print the incidents most similar to this text")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    store = IncidentStore(args.dir)
+    if args.reindex:
+        start = time.perf_counter()
+        if not store.reindex(retrain=args.retrain):
+            print("Another process is reindexing this store")
+        else:
+            print(f"Reindexed in {time.perf_counter() - start:.1f}s")
+    print(json.dumps(store.stats()))
+    if args.query:
+        for match in store.search(args.query, args.k):
+            print(format_match(match))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so re-indented templates map to the same entry"""
+    return " ".join(prompt.split())
+
+
+def cache_key(prompt, model, temperature):
+    payload = json.dumps([model, float(temperature), normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with optional per-entry TTL (seconds)"""
+
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Persistent cache tier in a single SQLite file, evicted by TTL and LRU size"""
+
+    def __init__(self, path, max_entries=100000, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """LLM response cache keyed by normalized prompt, model and temperature.
+
+    Lookups go to the in-memory LRU first and then to the optional SQLite
+    tier, promoting persistent hits into memory. Sampling at temperature
+    above 0 is not deterministic, so those calls bypass the cache unless
+    cache_high_temperature is set.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, persist_path=None, persist_max_entries=100000,
+                 cache_high_temperature=False):
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.persistent = SQLiteCache(persist_path, persist_max_entries, ttl) if persist_path else None
+        self.cache_high_temperature = cache_high_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+    def enabled_for(self, temperature):
+        return temperature <= 0 or self.cache_high_temperature
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, prompt, model, temperature):
+        if not self.enabled_for(temperature):
+            self._count("bypassed")
+            return None
+        key = cache_key(prompt, model, temperature)
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        self._count("misses" if value is None else "hits")
+        return value
+
+    def set(self, prompt, model, temperature, value):
+        if not self.enabled_for(temperature):
+            return
+        key = cache_key(prompt, model, temperature)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self):
+        return {"Cache Hits": self.hits, "Cache Misses": self.misses, "Cache Bypassed": self.bypassed}
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Process-wide ResponseCache configured from the environment.
+
+    RCA_LLM_CACHE_SIZE      in-memory entries (default 1024)
+    RCA_LLM_CACHE_TTL       seconds before an entry expires (default: never)
+    RCA_LLM_CACHE_DB        SQLite file for the persistent tier (default: none)
+    RCA_LLM_CACHE_HIGH_TEMP set to 1 to also cache calls with temperature > 0
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                ttl = os.getenv("RCA_LLM_CACHE_TTL")
+                _shared_cache = ResponseCache(
+                    max_entries=int(os.getenv("RCA_LLM_CACHE_SIZE", "1024")),
+                    ttl=float(ttl) if ttl else None,
+                    persist_path=os.getenv("RCA_LLM_CACHE_DB") or None,
+                    cache_high_temperature=os.getenv("RCA_LLM_CACHE_HIGH_TEMP") == "1",
+                )
+    return _shared_cache
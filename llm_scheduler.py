@@ -0,0 +1,360 @@
+"""Process-wide scheduler for remote LLM calls.
+
+Every session's model calls go through one LLMScheduler, which
+
+- caps concurrent calls globally and per tenant,
+- spaces them with a token bucket (requests per second with a burst),
+- retries 429 and 5xx responses, timeouts and connection errors with
+  jittered exponential backoff, honouring Retry-After and holding every
+  caller back while the provider is rate limiting,
+- runs identical in-flight prompts once and hands the result to every
+  caller (single-flight),
+- serves queued interactive turns before batch work.
+
+Both threads and asyncio tasks can wait for a slot; the same scheduler
+can be shared by both.
+"""
+import os
+import time
+import bisect
+import random
+import asyncio
+import itertools
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+
+from telemetry import get_shared_telemetry
+
+# Priorities; lower is served first
+INTERACTIVE = 0
+BATCH = 1
+
+
+def retry_info(exc):
+    """(retryable, Retry-After seconds or None) for an exception raised by an LLM client"""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if not isinstance(status, int):
+        # No HTTP response: the request timed out or never reached the provider
+        name = type(exc).__name__
+        return isinstance(exc, (ConnectionError, TimeoutError)) or "Timeout" in name or "Connection" in name, None
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return status in (408, 429) or status >= 500, retry_after
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst; the caller serializes access"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now, cost=1.0):
+        """0 if cost tokens were taken, else the seconds until they will be available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class _Waiter:
+    """A thread (event) or asyncio task (future on its loop) queued for a slot"""
+
+    __slots__ = ("tenant", "granted", "event", "loop", "future")
+
+    def __init__(self, tenant, loop=None):
+        self.tenant = tenant
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency=16, tenant_concurrency=None, rate=None, burst=None, max_retries=5,
+                 base_delay=0.5, max_delay=30.0, coalesce=True):
+        self.max_concurrency = max_concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.coalesce = coalesce
+        self.counts = Counter()
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._lock = threading.Lock()
+        self._waiters = []          # (priority, seq, _Waiter), sorted
+        self._seq = itertools.count()
+        self._active = 0
+        self._tenants = Counter()   # tenant -> calls holding a slot
+        self._paused_until = 0.0    # set from Retry-After on 429s
+        self._inflight = {}         # coalescing key -> Future of the leading call
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, "active": self._active, "queued": len(self._waiters)}
+
+    # Slots
+
+    def _dispatch(self, caller=None):
+        """Grant free slots to queued callers in priority order.
+
+        Returns how long caller should wait before calling again if the rate
+        limit or a provider pause (rather than a lack of slots) holds the
+        queue back, else None. The first caller held back that way is woken
+        so that someone keeps polling.
+        """
+        now = time.monotonic()
+        i = 0
+        while i < len(self._waiters) and self._active < self.max_concurrency:
+            waiter = self._waiters[i][2]
+            if self.tenant_concurrency and self._tenants[waiter.tenant] >= self.tenant_concurrency:
+                i += 1
+                continue
+            wait = self._paused_until - now
+            if wait <= 0 and self._bucket is not None:
+                wait = self._bucket.take(now)
+            if wait > 0:
+                if waiter is not caller:
+                    waiter.wake()
+                return wait
+            del self._waiters[i]
+            self._active += 1
+            self._tenants[waiter.tenant] += 1
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def _enqueue(self, waiter, priority):
+        with self._lock:
+            bisect.insort(self._waiters, (priority, next(self._seq), waiter))
+            return None if waiter.granted else self._dispatch(waiter)
+
+    def _poll(self, waiter):
+        with self._lock:
+            return None if waiter.granted else self._dispatch(waiter)
+
+    def _release(self, tenant):
+        with self._lock:
+            self._active -= 1
+            self._tenants[tenant] -= 1
+            if not self._tenants[tenant]:
+                del self._tenants[tenant]
+            self._dispatch()
+
+    def _abandon(self, waiter):
+        """A waiter gave up (cancelled or interrupted); give back its slot or its place"""
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+        if granted:
+            self._release(waiter.tenant)
+
+    def _observe_queue(self, start):
+        get_shared_telemetry().observe("llm.queue", time.perf_counter() - start)
+
+    @contextmanager
+    def slot(self, tenant="default", priority=INTERACTIVE):
+        """Hold one call slot (blocking the thread until it is granted)"""
+        start = time.perf_counter()
+        waiter = _Waiter(tenant)
+        try:
+            delay = self._enqueue(waiter, priority)
+            while not waiter.granted:
+                waiter.event.wait(delay)
+                waiter.event.clear()
+                delay = self._poll(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self._observe_queue(start)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    @asynccontextmanager
+    async def aslot(self, tenant="default", priority=INTERACTIVE):
+        """Hold one call slot (suspending the task until it is granted)"""
+        start = time.perf_counter()
+        waiter = _Waiter(tenant, asyncio.get_running_loop())
+        try:
+            waiter.future = waiter.loop.create_future()
+            delay = self._enqueue(waiter, priority)
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(waiter.future, delay)
+                except asyncio.TimeoutError:
+                    pass
+                waiter.future = waiter.loop.create_future()
+                delay = self._poll(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self._observe_queue(start)
+        try:
+            yield
+        finally:
+            self._release(tenant)
+
+    # Retries
+
+    def _retry_delay(self, exc, attempt):
+        """Seconds to back off before retrying after exc, or None to give up"""
+        retryable, retry_after = retry_info(exc)
+        status = getattr(exc, "status_code", None)
+        with self._lock:
+            self.counts["rate_limited" if status == 429 else "errors"] += 1
+            if not retryable or attempt >= self.max_retries:
+                self.counts["failed"] += 1
+                return None
+            self.counts["retries"] += 1
+            # Full jitter: callers that failed together do not retry together
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if retry_after:
+                delay = max(delay, retry_after)
+                # The provider said when to come back; nobody else goes before then either
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        return delay
+
+    def run(self, call, tenant="default", priority=INTERACTIVE):
+        """call() in a slot, retried on rate limits and transient errors"""
+        for attempt in itertools.count():
+            with self.slot(tenant, priority):
+                self._count("calls")
+                try:
+                    return call()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            time.sleep(delay)
+
+    async def arun(self, call, tenant="default", priority=INTERACTIVE):
+        """await call() in a slot, retried on rate limits and transient errors"""
+        for attempt in itertools.count():
+            async with self.aslot(tenant, priority):
+                self._count("calls")
+                try:
+                    return await call()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+
+    # Model calls
+
+    def _lead(self, key):
+        """(future, True) for the caller that makes the call for key, (future, False) for followers"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counts["coalesced"] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _finish(self, key, future, result=None, exc=None):
+        with self._lock:
+            del self._inflight[key]
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
+
+    def invoke(self, llm, prompt, tenant="default", priority=INTERACTIVE, key=None):
+        """llm.invoke(prompt) through the scheduler; calls sharing a key while in flight run once"""
+        if key is None or not self.coalesce:
+            return self.run(lambda: llm.invoke(prompt), tenant, priority)
+        future, leader = self._lead(key)
+        if not leader:
+            return future.result()
+        try:
+            result = self.run(lambda: llm.invoke(prompt), tenant, priority)
+        except BaseException as e:
+            self._finish(key, future, exc=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def ainvoke(self, llm, prompt, tenant="default", priority=INTERACTIVE, key=None):
+        """await llm.ainvoke(prompt) through the scheduler, coalesced like invoke()"""
+        if key is None or not self.coalesce:
+            return await self.arun(lambda: llm.ainvoke(prompt), tenant, priority)
+        future, leader = self._lead(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await self.arun(lambda: llm.ainvoke(prompt), tenant, priority)
+        except BaseException as e:
+            self._finish(key, future, exc=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stream(self, llm, prompt, tenant="default", priority=INTERACTIVE):
+        """Yield llm.stream(prompt) chunks while holding a slot; retried only until the first chunk"""
+        end = object()
+        for attempt in itertools.count():
+            with self.slot(tenant, priority):
+                self._count("calls")
+                chunks = iter(llm.stream(prompt))
+                try:
+                    first = next(chunks, end)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    if first is not end:
+                        yield first
+                        yield from chunks
+                    return
+            time.sleep(delay)
+
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler():
+    """Process-wide LLMScheduler configured from the RCA_LLM_* environment variables"""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        with _shared_scheduler_lock:
+            if _shared_scheduler is None:
+                _shared_scheduler = LLMScheduler(
+                    max_concurrency=int(os.getenv("RCA_LLM_CONCURRENCY", "16")),
+                    tenant_concurrency=int(os.getenv("RCA_LLM_TENANT_CONCURRENCY", "0")) or None,
+                    rate=float(os.getenv("RCA_LLM_RATE", "0")) or None,
+                    burst=float(os.getenv("RCA_LLM_BURST", "0")) or None,
+                    max_retries=int(os.getenv("RCA_LLM_MAX_RETRIES", "5")),
+                )
+    return _shared_scheduler
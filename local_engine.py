@@ -0,0 +1,259 @@
+"""Deterministic local question/analysis engine.
+
+A tier between MockLLM and the remote model: it tracks where the
+investigation is in its workflow (8D disciplines, the 5-Why chain, A3
+sections), fills step templates with the problem, the causes named in the
+user's answers and the most relevant line of the step's methodology
+chunk, and answers in well under 5 ms. TechnicalChatbot routes cheap
+turns here and escalates hard analysis turns (see LocalRCAEngine.escalation)
+to the remote LLM.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from rag_engine import tokenize, workflow_scope
+
+# (code, title, retrieval query, question template) per RCA question after the problem context.
+# Templates may use {topic} (the problem) and {cause} (the latest cause named in an answer, else the problem).
+WORKFLOW_STEPS = {
+    "8D": (
+        ("D2", "Describe the problem", "8D D2 describe the problem is is not what where when how much",
+         "Where and when does {topic} occur, and where would you expect it but not see it (Is/Is Not)? "
+         "How much is affected?"),
+        ("D3", "Interim containment", "8D D3 interim containment actions protect customers",
+         "What interim containment currently protects customers from {topic}, and how have you verified "
+         "that it works?"),
+        ("D4", "Root cause", "8D D4 determine verify root causes hypotheses data",
+         "Which cause best explains {topic}, and what data or test reproduces it?"),
+        ("D4", "Root cause verification", "8D D4 verify root cause reproducing problem contributing factors",
+         "Why did the process let {cause} escape detection, and how did you rule out other contributing "
+         "factors?"),
+        ("D5", "Permanent corrective action", "8D D5 choose verify permanent corrective actions",
+         "What permanent corrective action would remove {cause}, and how will you verify it has no side "
+         "effects?"),
+        ("D6", "Implement and validate", "8D D6 implement validate permanent corrective actions monitor",
+         "How will the corrective action be rolled out, and what data will show over time that {topic} "
+         "is gone?"),
+        ("D7", "Prevent recurrence", "8D D7 prevent recurrence FMEA control plans mistake-proofing",
+         "Which FMEAs, control plans or procedures must change so that {cause} cannot recur here or on "
+         "similar processes?"),
+    ),
+    "5-Why": (
+        ("Why 1", "First why", "5-Why basic process define problem ask why",
+         "Why does {topic} happen? Describe the immediate cause you can observe."),
+        ("Why 2", "Second why", "5-Why each answer ask why again facts data",
+         "You said {cause}. Why does that happen?"),
+        ("Why 3", "Third why", "5-Why each answer ask why again facts data",
+         "You said {cause}. Why does that happen?"),
+        ("Why 4", "Fourth why", "5-Why process system failure not human error",
+         "You said {cause}. Why does that happen?"),
+        ("Why 5", "Fifth why", "5-Why process system failure not human error",
+         "You said {cause}. Why does that happen, and is it a process or system gap rather than one "
+         "person's mistake?"),
+        ("Verify", "Verify the root cause", "5-Why verify root cause evidence actionable",
+         "If {cause} were corrected, would {topic} stop? What evidence confirms it is the root cause?"),
+        ("Act", "Corrective action", "5-Why corrective action root cause actionable",
+         "What corrective action would eliminate {cause}, and how will you confirm it stays in place?"),
+    ),
+    "A3": (
+        ("Current condition", "Background and current condition", "A3 background current situation",
+         "What does the current process around {topic} look like, and what data describes it today?"),
+        ("Goal", "Goal / target condition", "A3 goal target condition measurable",
+         "What measurable target condition would show that {topic} is solved, and by when?"),
+        ("Root cause", "Root cause analysis", "A3 root cause analysis 5 why fishbone",
+         "What is the gap between the current and target condition for {topic}, and which cause explains "
+         "it?"),
+        ("Root cause", "Root cause verification", "A3 analyze root cause verify data",
+         "What data confirms {cause} as the root cause rather than a symptom?"),
+        ("Countermeasures", "Countermeasures", "A3 countermeasures solutions address root cause",
+         "Which countermeasures address {cause}, and how do they compare on effect, cost and effort?"),
+        ("Plan", "Implementation plan", "A3 implementation plan action items owners timeline milestones",
+         "Who will implement the countermeasures for {cause}, in which order, and by when?"),
+        ("Follow-up", "Follow-up and confirmation", "A3 follow-up confirmation of effect standardize",
+         "How and when will you check that the countermeasures removed {topic}, and what becomes the new "
+         "standard?"),
+    ),
+}
+
+# Markers that introduce a cause in an answer, longest first
+CAUSE_MARKERS = re.compile(r"\b(?:because of|because|due to|caused by|as a result of|results from|"
+                           r"resulting from|after)\b\s+", re.IGNORECASE)
+CHANGE_TERMS = re.compile(r"\b(?:changed?|changes|new|replaced|upgraded?|updated?|modified|switched|"
+                          r"introduced|installed|after)\b", re.IGNORECASE)
+MEASUREMENT = re.compile(r"\d+(?:[.,]\d+)?\s*(?:%|percent|bar|psi|mm|um|°c|ms|s\b|sec|min|h\b|hours?|"
+                         r"days?|rpm|kg|nm|ppm)?", re.IGNORECASE)
+UNCERTAIN = re.compile(r"\b(?:not sure|unsure|unknown|unclear|no idea|don'?t know|can'?t tell|maybe|"
+                       r"perhaps|possibly|intermittent(?:ly)?|random(?:ly)?|sporadic(?:ally)?|"
+                       r"can'?t reproduce|cannot reproduce)\b", re.IGNORECASE)
+# Words too generic to be a key factor
+FILLER_WORDS = frozenset("""
+about after again all also any before both each every just more most much not now only other our out over
+same some still such them they under very we were while would one two three four five because due caused
+""".split())
+SENTENCE = re.compile(r"(?<=[.!?;])\s+")
+BULLET = re.compile(r"^\s*(?:[-*]|\d+\.)\s+(.+?)\s*$", re.MULTILINE)
+
+# Answers longer than this are analyzed remotely in "auto" routing
+HARD_ANSWER_WORDS = 80
+CAUSE_WORDS = 14
+KEY_TERMS = 4
+
+
+def steps(workflow):
+    return WORKFLOW_STEPS.get(workflow, WORKFLOW_STEPS["8D"])
+
+
+def step_for(workflow, index):
+    """The workflow step of the index-th RCA question (0-based); the last one repeats"""
+    workflow_steps = steps(workflow)
+    return workflow_steps[min(max(index, 0), len(workflow_steps) - 1)]
+
+
+def _phrase(text, max_words):
+    words = text.split()
+    phrase = " ".join(words[:max_words]).rstrip(".,;:!?")
+    if len(words) > max_words:
+        phrase += " ..."
+    # Lowercase the first letter unless it starts an acronym or a part number
+    if phrase[:1].isupper() and not phrase[1:2].isupper():
+        phrase = phrase[0].lower() + phrase[1:]
+    return phrase
+
+
+@lru_cache(maxsize=1024)
+def topic(problem_description):
+    """Short phrase naming the problem, for question templates"""
+    first = SENTENCE.split(problem_description.strip(), 1)[0]
+    return f'"{_phrase(first, 10)}"' if first else "the problem"
+
+
+@lru_cache(maxsize=4096)
+def cause_phrase(answer):
+    """The cause an answer names: the clause after "because", "due to"... else its first sentence"""
+    answer = answer.strip()
+    if not answer:
+        return ""
+    match = CAUSE_MARKERS.search(answer)
+    text = answer[match.end():] if match else answer
+    return _phrase(SENTENCE.split(text, 1)[0], CAUSE_WORDS)
+
+
+@lru_cache(maxsize=4096)
+def key_terms(text, k=KEY_TERMS):
+    """Most frequent content words of text, ties broken by first occurrence"""
+    counts = Counter(t for t in tokenize(text) if len(t) > 2 and not t.isdigit() and t not in FILLER_WORDS)
+    return tuple(term for term, _ in counts.most_common(k))
+
+
+@lru_cache(maxsize=256)
+def _chunk_lines(chunk):
+    """Bullet and numbered lines of a methodology chunk with their token sets"""
+    lines = BULLET.findall(chunk) or [line for line in chunk.splitlines()[1:] if line.strip()]
+    # Lines ending in ":" only introduce a sub-list
+    return tuple((line.strip(), frozenset(tokenize(line))) for line in lines if not line.rstrip().endswith(":"))
+
+
+def methodology_hint(chunks, terms):
+    """The methodology line sharing most words with terms (the first line on a tie)"""
+    terms = frozenset(terms)
+    best, best_overlap = "", -1
+    for chunk in chunks:
+        for line, tokens in _chunk_lines(chunk):
+            overlap = len(tokens & terms)
+            if overlap > best_overlap:
+                best, best_overlap = line, overlap
+    return best
+
+
+class LocalRCAEngine:
+    """Step-tracked questions and analyses from templates, keywords and methodology chunks.
+
+    Stateless: the step is derived from the RCA question index, and the
+    cause from the latest answer, so any number of sessions can share one
+    engine. retrieve is a callable (query, workflow) -> chunk texts.
+    """
+
+    def __init__(self, retrieve):
+        self.retrieve = retrieve
+
+    def _chunks(self, workflow, step):
+        return self.retrieve(step[2], workflow)
+
+    def question(self, workflow, index, problem_context, history=()):
+        """The index-th RCA question (0-based, after the problem context questions).
+
+        history is the conversation's (question, answer) pairs; its last
+        index entries are the answers to the earlier RCA questions.
+        """
+        step = step_for(workflow, index)
+        problem = topic(problem_context.get("problem_description", ""))
+        cause = self.latest_cause(workflow, history[len(history) - index:] if index else ())
+        question = step[3].format(topic=problem, cause=f'"{cause}"' if cause else problem)
+        return f"{step[0]} - {step[1]}: {question}"
+
+    @staticmethod
+    def latest_cause(workflow, answers):
+        """Cause to follow up on: in 5-Why every answer is the cause behind the previous one,
+        elsewhere the newest answer that names a cause"""
+        if not answers:
+            return ""
+        if workflow == "5-Why":
+            return cause_phrase(answers[-1][1])
+        for _, answer in reversed(answers):
+            if CAUSE_MARKERS.search(answer):
+                return cause_phrase(answer)
+        return ""
+
+    def analysis(self, workflow, index, response, problem_context, final=False):
+        """Analysis of the answer to the index-th RCA question"""
+        step = step_for(workflow, index)
+        terms = key_terms(response)
+        parts = [f"Analysis ({step[0]} - {step[1]}):"]
+        if terms:
+            parts.append(f"Key factors in your answer: {', '.join(terms)}.")
+        cause = cause_phrase(response)
+        if CAUSE_MARKERS.search(response) and cause:
+            parts.append(f'It names a candidate cause: "{cause}".')
+        if CHANGE_TERMS.search(response):
+            parts.append("A change is involved; compare conditions before and after it.")
+        measurements = [m.strip() for m in MEASUREMENT.findall(response) if m.strip()]
+        if measurements:
+            parts.append(f"It is backed by measurements ({', '.join(measurements[:3])}).")
+        else:
+            parts.append("No measurements are cited yet; collect data to confirm it.")
+        problem_terms = key_terms(problem_context.get("problem_description", ""))
+        hint = methodology_hint(self._chunks(workflow, step), terms + problem_terms)
+        if hint:
+            parts.append(f"Methodology ({workflow}): {hint}" + ("" if hint[-1] in ".?!" else "."))
+        if final:
+            parts.append("This completes the investigation steps; verify the root cause and corrective "
+                         "actions in the report.")
+        else:
+            following = step_for(workflow, index + 1)
+            if following is not step:
+                parts.append(f"Next: {following[0]} - {following[1]}.")
+        return " ".join(parts)
+
+    def escalation(self, workflow, index, response, evidence=False, final=False):
+        """Why the analysis of this answer needs the remote model, or None if it can stay local"""
+        if final:
+            return "final"
+        if step_for(workflow, index)[1].startswith(("Root cause", "Verify")):
+            return "root-cause step"
+        if evidence:
+            return "evidence"
+        if len(response.split()) > HARD_ANSWER_WORDS:
+            return "long answer"
+        if UNCERTAIN.search(response):
+            return "uncertain answer"
+        if len(CAUSE_MARKERS.findall(response)) > 1:
+            return "several causes"
+        return None
+
+
+def retriever(rag, k=1):
+    """retrieve callable for LocalRCAEngine over a RAGEngine (results are memoized by the engine)"""
+    def retrieve(query, workflow):
+        return rag.retrieve(query, k=k, methodology=workflow_scope(workflow))
+    return retrieve
@@ -0,0 +1,105 @@
+import re
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+class MarkdownSectionSplitter:
+    """Heading-aware chunker for the markdown-like methodology files.
+
+    Reads the text line by line in a single pass, tracking the heading path
+    and the blocks (paragraphs, lists, fenced code, example steps) of the
+    current section. Every section under a heading up to split_level
+    becomes its own chunk, starting with its breadcrumb line, e.g.
+    "5-Why Root Cause Analysis Technique > Example 1: Manufacturing Defect".
+    A section longer than max_chars is cut only between blocks, and headings
+    that have no text of their own only contribute to the path.
+    """
+
+    def __init__(self, max_chars=1500, split_level=4):
+        self.max_chars = max_chars
+        self.split_level = split_level
+
+    @property
+    def chunker_id(self):
+        return f"{type(self).__name__}:{self.max_chars}:{self.split_level}"
+
+    def split(self, lines):
+        """Yield (chunk text, section path) for an iterable of lines or a string"""
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        path = []            # [(level, title)] of the enclosing headings
+        blocks, block = [], []
+        in_fence = False
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if ("```" in line or "~~~" in line) and FENCE.match(line):
+                in_fence = not in_fence
+                block.append(line)
+                continue
+            if in_fence:
+                block.append(line)
+                continue
+            match = HEADING.match(line) if line[:1] == "#" else None
+            if match and len(match.group(1)) <= self.split_level:
+                if block:
+                    blocks.append(block)
+                    block = []
+                yield from self._flush(path, blocks)
+                blocks = []
+                level = len(match.group(1))
+                while path and path[-1][0] >= level:
+                    path.pop()
+                path.append((level, match.group(2)))
+            elif not line.strip():
+                if block:
+                    blocks.append(block)
+                    block = []
+            else:
+                if match and block:
+                    # A deeper heading starts a new block inside the current section
+                    blocks.append(block)
+                    block = []
+                block.append(line)
+        if block:
+            blocks.append(block)
+        yield from self._flush(path, blocks)
+
+    def split_text(self, text):
+        return [chunk for chunk, _ in self.split(text)]
+
+    def _flush(self, path, blocks):
+        if not blocks:
+            return
+        section = " > ".join(title for _, title in path)
+        header_len = len(section) + 1
+        parts, size = [], header_len
+        for block in blocks:
+            text = "\n".join(block)
+            if parts and size + len(text) + 2 > self.max_chars:
+                yield self._chunk(section, parts), section
+                parts, size = [], header_len
+            if len(text) + header_len > 2 * self.max_chars:
+                # Only a block far beyond the limit is broken, and then at line boundaries
+                yield from self._split_long_block(section, block, header_len)
+                continue
+            parts.append(text)
+            size += len(text) + 2
+        if parts:
+            yield self._chunk(section, parts), section
+
+    def _split_long_block(self, section, block, header_len):
+        lines, size = [], header_len
+        for line in block:
+            if lines and size + len(line) + 1 > self.max_chars:
+                yield self._chunk(section, ["\n".join(lines)]), section
+                lines, size = [], header_len
+            lines.append(line)
+            size += len(line) + 1
+        if lines:
+            yield self._chunk(section, ["\n".join(lines)]), section
+
+    @staticmethod
+    def _chunk(section, parts):
+        body = "\n\n".join(parts)
+        return f"{section}\n{body}" if section else body
@@ -0,0 +1,151 @@
+"""Local scoring of the RCA metrics from the problem context and the answers.
+
+Every lexicon entry is one named group of a single precompiled regex, so a
+text is scanned once and each match maps straight to a feature column. A
+(features x metrics) weight matrix turns feature counts into raw metric
+evidence; a whole history is scored as one count matrix product with a
+cumulative sum per turn, and a new turn only adds its own count vector,
+which takes microseconds. Investigation Progress stays question-based and
+is not scored here.
+"""
+import math
+import re
+from functools import lru_cache
+
+import numpy as np
+
+METRICS = ("Problem Severity", "Root Cause Confidence", "Solution Feasibility")
+SEVERITY, CONFIDENCE, FEASIBILITY = range(3)
+
+# name -> (pattern, weights for (severity, confidence, feasibility)). Patterns match lowercased text
+# and are anchored at a word start by the combined regex, so they carry no leading \b.
+LEXICON = {
+    # Negated impact comes first so "no safety impact" is not also counted as a safety term
+    "no_impact": (r"no\s+(?:real\s+|major\s+|safety\s+|customer\s+)?(?:impact|safety|injur\w*|downtime|"
+                  r"customer\w*|complaints?)\b|negligible\b|minor\b|cosmetic\b|nuisance\b",
+                  (-1.0, 0.0, 0.0)),
+    "safety": (r"safety\b|injur\w*|hazard\w*|fire\b|burns?\b|toxic\b|explos\w*|fatal\w*|recall\w*",
+               (3.0, 0.0, 0.0)),
+    "downtime": (r"downtime\b|shut\s*down\b|stopp(?:ed|age|s)\b|line (?:stop|down)\w*|outages?\b|"
+                 r"trip(?:s|ped)?\b|standstill\b", (1.5, 0.0, 0.0)),
+    "customer": (r"customers?\b|complaints?\b|complained\b|warranty\b|field failures?\b|escaped?\b|returns?\b",
+                 (2.0, 0.0, 0.0)),
+    "quality": (r"scrap\w*|defect\w*|reject\w*|rework\w*|non-?conform\w*|leak\w*|contaminat\w*",
+                (1.0, 0.0, 0.0)),
+    "magnitude": (r"\d+(?:[.,]\d+)?\s*(?:%|percent\b|hours?\b|hrs?\b|minutes?\b|min\b|days?\b|shifts?\b|"
+                  r"k?(?:usd|eur|dollars?|euros?)\b)|cost\w*|loss\w*|lost\b", (0.5, 0.3, 0.0)),
+    "cause": (r"because\b|due to\b|caused by\b|root cause\b|result(?:s|ed)? (?:from|in)\b", (0.0, 1.0, 0.0)),
+    "verified": (r"confirm\w*|verif\w*|reproduc\w*|measured\b|tested\b|prov(?:ed|en)\b|data shows?\b|"
+                 r"correlat\w*|evidence\b|inspect(?:ed|ion)\b", (0.0, 1.5, 0.0)),
+    "measurement": (r"\d+(?:[.,]\d+)?\s*(?:bar|psi|mm/s|mm|µm|um|°c|c\b|rpm|nm|kg|ppm|v\b|amps?\b|hz|ms\b)",
+                    (0.0, 0.8, 0.0)),
+    "uncertain": (r"not sure\b|unsure\b|unknown\b|unclear\b|no idea\b|don'?t know\b|maybe\b|perhaps\b|"
+                  r"possibly\b|might\b|could be\b|suspect\w*|guess\w*|intermittent\w*|random\w*|sporadic\w*|"
+                  r"can'?t reproduce\b", (0.3, -1.5, 0.0)),
+    "action": (r"replac\w*|install\w*|add(?:ed|ing)?\b|updat\w*|implement\w*|train(?:ed|ing)?\b|adjust\w*|"
+               r"calibrat\w*|introduc\w*|standardi[sz]\w*|checklist\b|poka-?yoke\b|procedure\w*|"
+               r"countermeasure\w*|corrective action\w*|preventive\b", (0.0, 0.2, 1.2)),
+    "plan": (r"by (?:next|the end|monday|tuesday|wednesday|thursday|friday|\d)\w*|within\b|weeks?\b|owners?\b|"
+             r"responsible\b|schedul\w*|plan(?:ned|s)?\b|pilot\w*|trial\w*|roll(?:ed)? out\b|milestones?\b",
+             (0.0, 0.0, 1.0)),
+    "low_effort": (r"cheap\w*|low[- ]cost\b|simple\b|quick\w*|easy\b|existing\b|spares?\b|in stock\b|"
+                   r"standard parts?\b", (0.0, 0.0, 1.0)),
+    "barrier": (r"expensive\b|costly\b|budget\w*|capex\b|redesign\w*|lead time\b|months\b|approval\w*|"
+                r"not possible\b|impossible\b|difficult\w*|complex\w*|new supplier\b", (0.0, 0.0, -1.0)),
+}
+
+FEATURES = tuple(LEXICON)
+# One \b in front of the whole alternation lets the scan skip every position inside a word
+LEXICON_PATTERN = re.compile(r"\b(?:" + "|".join(f"(?P<{name}>{pattern})" for name, (pattern, _) in LEXICON.items())
+                             + ")")
+# (features x metrics)
+WEIGHTS = np.array([weights for _, weights in LEXICON.values()], dtype=np.float64)
+_COLUMN = {name: i for i, name in enumerate(FEATURES)}
+
+# How much each source counts per metric: the problem context sets the severity,
+# answers move all three
+CONTEXT_WEIGHT = np.array([2.0, 0.0, 0.0])
+ANSWER_WEIGHT = np.array([0.5, 1.0, 1.0])
+# Raw evidence at which a metric reaches ~63 (100 * (1 - 1/e))
+SCALES = np.array([6.0, 5.0, 4.0])
+_SCALAR_WEIGHTS = (CONTEXT_WEIGHT.tolist(), ANSWER_WEIGHT.tolist(), SCALES.tolist())
+
+
+@lru_cache(maxsize=4096)
+def _feature_counts(text):
+    counts = np.zeros(len(FEATURES))
+    for match in LEXICON_PATTERN.finditer(text.lower()):
+        counts[_COLUMN[match.lastgroup]] += 1
+    counts.flags.writeable = False
+    return counts
+
+
+def features(text):
+    """Lexicon match counts of one text (a read-only vector, shared via the memo)"""
+    return _feature_counts(text)
+
+
+def feature_matrix(texts):
+    """(len(texts) x features) match counts"""
+    if not texts:
+        return np.zeros((0, len(FEATURES)))
+    return np.stack([_feature_counts(text) for text in texts])
+
+
+@lru_cache(maxsize=4096)
+def _raw_evidence(text):
+    # Per-turn updates stay in plain floats: numpy overhead dominates on three values
+    return tuple((_feature_counts(text) @ WEIGHTS).tolist())
+
+
+def context_features(problem_context):
+    text = " ".join(str(problem_context.get(key, "")) for key in ("problem_description", "impact_severity"))
+    return features(text)
+
+
+def squash(raw):
+    """Raw evidence to 0-100 scores, one decimal"""
+    return np.round(100.0 * (1.0 - np.exp(-np.maximum(raw, 0.0) / SCALES)), 1)
+
+
+class MetricScorer:
+    """Running metric evidence for one investigation.
+
+    add() folds in one answer; scores() maps the totals to metric values.
+    The context evidence is recomputed only when the problem context changes.
+    """
+
+    __slots__ = ("answers", "context", "_context_key")
+
+    def __init__(self):
+        self.answers = [0.0] * len(METRICS)
+        self.context = [0.0] * len(METRICS)
+        self._context_key = None
+
+    def set_context(self, problem_context):
+        key = (problem_context.get("problem_description"), problem_context.get("impact_severity"))
+        if key != self._context_key:
+            self._context_key = key
+            self.context = (context_features(problem_context) @ WEIGHTS).tolist()
+
+    def add(self, answer):
+        self.answers = [total + raw for total, raw in zip(self.answers, _raw_evidence(answer))]
+
+    def scores(self):
+        return {name: round(100.0 * (1.0 - math.exp(-max(c * cw + a * aw, 0.0) / scale)), 1)
+                for name, c, a, cw, aw, scale in zip(METRICS, self.context, self.answers, *_SCALAR_WEIGHTS)}
+
+    @classmethod
+    def from_history(cls, problem_context, answers):
+        scorer = cls()
+        scorer.set_context(problem_context)
+        if answers:
+            scorer.answers = (feature_matrix(answers) @ WEIGHTS).sum(axis=0).tolist()
+        return scorer
+
+
+def score_history(problem_context, answers):
+    """Metric values after each answer, as a (len(answers) x metrics) array, in one pass"""
+    context_raw = (context_features(problem_context) @ WEIGHTS) * CONTEXT_WEIGHT
+    answer_raw = np.cumsum(feature_matrix(answers) @ WEIGHTS, axis=0) * ANSWER_WEIGHT
+    return squash(context_raw + answer_raw)
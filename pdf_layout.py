@@ -0,0 +1,135 @@
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+class PdfLayout:
+    """Flowing text layout on a reportlab canvas.
+
+    Keeps a cursor, wraps text to the frame width, and starts a new page
+    (with a page-number footer) whenever the next line or block does not
+    fit, so content of any length paginates without hand-computed offsets.
+    Output goes to whatever the canvas was given: a path or a binary stream.
+    """
+
+    def __init__(self, output, pagesize=letter, margin=72, footer=None):
+        self.canvas = canvas.Canvas(output, pagesize=pagesize)
+        self.width, self.height = pagesize
+        self.left = margin
+        self.right = self.width - margin
+        self.top = self.height - margin
+        self.bottom = margin
+        self.footer = footer
+        self.page = 1
+        self.y = self.top
+        self._word_widths = {}
+
+    @property
+    def frame_width(self):
+        return self.right - self.left
+
+    def new_page(self):
+        self._draw_footer()
+        self.canvas.showPage()
+        self.page += 1
+        self.y = self.top
+
+    def ensure_space(self, height):
+        if self.y - height < self.bottom:
+            self.new_page()
+
+    def spacer(self, height):
+        if self.y - height < self.bottom:
+            self.new_page()
+        else:
+            self.y -= height
+
+    def heading(self, text, size=14, space_before=12, space_after=6):
+        # Keep a heading on the same page as at least two lines of what follows
+        self.spacer(space_before)
+        self.ensure_space(size * 1.2 + 2 * 14)
+        self.paragraph(text, font="Helvetica-Bold", size=size, space_after=space_after)
+
+    def paragraph(self, text, font="Helvetica", size=10, indent=0, leading=None, space_after=4):
+        leading = leading or size * 1.35
+        x = self.left + indent
+        width = self.frame_width - indent
+        text_obj = None
+        for line in self.wrap(text, font, size, width):
+            if self.y - leading < self.bottom:
+                if text_obj is not None:
+                    self.canvas.drawText(text_obj)
+                    text_obj = None
+                self.new_page()
+            if text_obj is None:
+                text_obj = self.canvas.beginText(x, self.y - size)
+                text_obj.setFont(font, size, leading)
+            text_obj.textLine(line)
+            self.y -= leading
+        if text_obj is not None:
+            self.canvas.drawText(text_obj)
+        self.y -= space_after
+
+    def wrap(self, text, font, size, width):
+        """Yield lines of text that fit width, breaking overlong words"""
+        space = self._width(" ", font, size)
+        for raw_line in str(text).splitlines() or [""]:
+            words = raw_line.split()
+            if not words:
+                yield ""
+                continue
+            line, line_width = [], 0.0
+            for word in words:
+                word_width = self._width(word, font, size)
+                if word_width > width:
+                    # Hard-break a word longer than the frame (URLs, part numbers, hashes)
+                    if line:
+                        yield " ".join(line)
+                        line, line_width = [], 0.0
+                    piece = ""
+                    for ch in word:
+                        if stringWidth(piece + ch, font, size) > width and piece:
+                            yield piece
+                            piece = ""
+                        piece += ch
+                    line, line_width = [piece], stringWidth(piece, font, size)
+                    continue
+                needed = word_width if not line else line_width + space + word_width
+                if needed > width and line:
+                    yield " ".join(line)
+                    line, line_width = [word], word_width
+                else:
+                    line.append(word)
+                    line_width = needed
+            if line:
+                yield " ".join(line)
+
+    def _width(self, word, font, size):
+        key = (word, font, size)
+        width = self._word_widths.get(key)
+        if width is None:
+            width = stringWidth(word, font, size)
+            if len(self._word_widths) < 50000:
+                self._word_widths[key] = width
+        return width
+
+    def image(self, image, width, height):
+        self.ensure_space(height)
+        self.canvas.drawImage(image, self.left, self.y - height, width=width, height=height,
+                              preserveAspectRatio=True)
+        self.y -= height
+
+    def drawing(self, width, height, draw):
+        """Reserve a width x height block and call draw(canvas, x, y, width, height) with its bottom-left corner"""
+        self.ensure_space(height)
+        draw(self.canvas, self.left, self.y - height, width, height)
+        self.y -= height
+
+    def _draw_footer(self):
+        if self.footer:
+            self.canvas.setFont("Helvetica", 8)
+            self.canvas.drawRightString(self.right, self.bottom / 2, f"{self.footer} - Page {self.page}")
+
+    def save(self):
+        self._draw_footer()
+        self.canvas.save()
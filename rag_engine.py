@@ -1,42 +1,610 @@
 import os
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+import re
+import json
+import argparse
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+from markdown_splitter import MarkdownSectionSplitter
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process locking
+    fcntl = None
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have how i if in
+into is it its of on or so than that the their then there these this to was were what
+when where which who why will with you your
+""".split())
+
+# On-disk index location; set RAG_INDEX_DIR to move it, pass index_dir=None to disable
+DEFAULT_INDEX_DIR = os.getenv("RAG_INDEX_DIR", ".rag_index")
+
+# Index partitions; every chunk belongs to exactly one
+METHODOLOGIES = ("8D", "5-Why", "A3", "general")
+WORKFLOWS = METHODOLOGIES[:3]
+
+# The chatbot's per-workflow retrieval queries, answered once when the index is built
+WORKFLOW_QUERIES = (
+    "{workflow} methodology root cause analysis questions",
+    "{workflow} root cause analysis techniques",
+)
+PRECOMPUTED_K = 8
+
+
+def methodology_of(source):
+    """Partition of a knowledge file, from its name: 8D, 5-Why, A3 or general"""
+    name = re.sub(r"[^a-z0-9]", "", os.path.basename(source).lower())
+    for prefix, methodology in (("8d", "8D"), ("5why", "5-Why"), ("a3", "A3")):
+        if name.startswith(prefix):
+            return methodology
+    return "general"
+
+
+def workflow_scope(workflow):
+    """Partitions searched for a workflow: its own documents plus general best practices"""
+    return (workflow, "general")
+
+
+def _scope(methodology):
+    if methodology is None:
+        return None
+    return (methodology,) if isinstance(methodology, str) else tuple(sorted(set(methodology)))
+
+
+def precompute_key(query, methodology=None):
+    scope = _scope(methodology)
+    return f"{'|'.join(scope) if scope else '*'}::{query}"
+
+
+def workflow_query_keys():
+    return {precompute_key(template.format(workflow=workflow), workflow_scope(workflow))
+            for workflow in WORKFLOWS for template in WORKFLOW_QUERIES}
+
+
+def precompute_workflow_queries(store):
+    """Ranked chunk ids for every WORKFLOW_QUERIES query within its workflow scope"""
+    results = {}
+    for workflow in WORKFLOWS:
+        scope = workflow_scope(workflow)
+        for template in WORKFLOW_QUERIES:
+            query = template.format(workflow=workflow)
+            results[precompute_key(query, scope)] = store.search_ids(query, PRECOMPUTED_K, scope).tolist()
+    return results
+
+
+def make_document(text, source, section=None):
+    # langchain is imported on first use so opening a saved index stays cheap
+    from langchain_core.documents import Document
+    metadata = {"source": source, "methodology": methodology_of(source)}
+    if section is not None:
+        metadata["section"] = section
+    return Document(page_content=text, metadata=metadata)
+
+
+def tokenize(text):
+    """Lowercase word tokens with stop words removed"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def count_terms(texts, vocabulary):
+    """Per-text term counts in CSR layout, growing vocabulary (term -> column) in place"""
+    indptr, cols, counts = [0], [], []
+    for text in texts:
+        for term, count in Counter(tokenize(text)).items():
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(cols))
+    return (np.asarray(indptr, dtype=np.int64),
+            np.asarray(cols, dtype=np.int32),
+            np.asarray(counts, dtype=np.float32))
+
 
 class RAGEngine:
-    def __init__(self, data_dir='data'):
+    def __init__(self, data_dir='data', index_dir=DEFAULT_INDEX_DIR):
         self.data_dir = data_dir
+        self.index_dir = index_dir
         self.vectorstore = None
+        self._build_lock = threading.Lock()
+        self._results = {}  # (query key, k) -> chunk texts; the index is read-only once built
+        # Chunks follow the ##/### sections of the knowledge files
+        self.text_splitter = MarkdownSectionSplitter(max_chars=1500)
         # Use a mock or local embeddings for testing without API calls
         # self.embeddings = OpenAIEmbeddings()
         self.embeddings = None  # Placeholder for now
 
+    @property
+    def chunker(self):
+        """Identifies the chunking settings an index was built with"""
+        return self.text_splitter.chunker_id
+
     def load_documents(self):
         documents = []
-        for file in os.listdir(self.data_dir):
+        for file in sorted(os.listdir(self.data_dir)):
             if file.endswith('.txt'):
-                loader = TextLoader(os.path.join(self.data_dir, file))
-                documents.extend(loader.load())
+                path = os.path.join(self.data_dir, file)
+                with open(path, encoding='utf-8') as f:
+                    documents.append(make_document(f.read(), path))
         return documents
 
-    def build_vectorstore(self):
-        documents = self.load_documents()
-        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-        docs = text_splitter.split_documents(documents)
-        # Mock vectorstore for testing without embeddings
-        self.vectorstore = MockVectorStore(docs)
+    def split_text(self, text):
+        return self.text_splitter.split_text(text)
+
+    def split_sections(self, text):
+        """(chunk text, section path) pairs"""
+        return list(self.text_splitter.split(text))
+
+    def split_documents(self, documents):
+        return [make_document(chunk, doc.metadata["source"], section)
+                for doc in documents for chunk, section in self.text_splitter.split(doc.page_content)]
+
+    RESULT_MEMO_SIZE = 4096
 
-    def retrieve(self, query, k=3):
+    def build_vectorstore(self, force=False):
+        self._results = {}
+        if self.index_dir:
+            try:
+                self.vectorstore = PersistentIndex(self, self.index_dir).load_or_update(force=force)
+                return
+            except OSError as e:
+                print(f"Warning: RAG index at {self.index_dir} unavailable, building in memory: {e}")
+        docs = self.split_documents(self.load_documents())
+        # Local TF-IDF index, no embedding API calls needed
+        store = TfidfVectorStore(docs)
+        store.precomputed = precompute_workflow_queries(store)
+        self.vectorstore = store
+
+    def retrieve(self, query, k=3, methodology=None):
+        """Text of the top-k chunks for query.
+
+        methodology restricts the search to one partition or a collection
+        of them (see METHODOLOGIES). Queries precomputed at build time are
+        answered from a table without scoring, and every result is memoized,
+        so repeated queries cost a dict lookup.
+        """
         if self.vectorstore is None:
-            self.build_vectorstore()
-        docs = self.vectorstore.similarity_search(query, k=k)
-        return [doc.page_content for doc in docs]
+            with self._build_lock:
+                if self.vectorstore is None:
+                    self.build_vectorstore()
+        store = self.vectorstore
+        memo_key = (precompute_key(query, methodology), k)
+        texts = self._results.get(memo_key)
+        if texts is None:
+            ids = store.precomputed.get(memo_key[0]) if k <= PRECOMPUTED_K else None
+            ids = ids[:k] if ids is not None else store.search_ids(query, k, methodology)
+            texts = [store.text(i) for i in ids]
+            if len(self._results) >= self.RESULT_MEMO_SIZE:
+                self._results.clear()
+            self._results[memo_key] = texts
+        return list(texts)
+
+
+_shared_engines = {}
+_shared_engines_lock = threading.Lock()
+
+
+def get_shared_engine(data_dir='data'):
+    """Process-wide RAGEngine for data_dir, built once and shared read-only.
 
-class MockVectorStore:
-    def __init__(self, docs):
+    Every chat session (and thread) gets the same index instead of re-reading
+    and re-splitting the corpus on its first question.
+    """
+    key = os.path.abspath(data_dir)
+    engine = _shared_engines.get(key)
+    if engine is None:
+        with _shared_engines_lock:
+            engine = _shared_engines.get(key)
+            if engine is None:
+                engine = RAGEngine(data_dir)
+                engine.build_vectorstore()
+                _shared_engines[key] = engine
+    return engine
+
+
+class TfidfVectorStore:
+    """In-memory TF-IDF index over document chunks.
+
+    The chunk/term weights are kept as a sparse matrix in compressed sparse
+    column layout (one posting list per term) using plain NumPy arrays, so a
+    query is scored with a single sparse matrix-vector product that only
+    touches the posting lists of the query terms.
+    """
+
+    QUERY_MEMO_SIZE = 4096
+
+    def __init__(self, docs, vocabulary=None, counts=None):
         self.docs = docs
+        self.vocabulary = {} if vocabulary is None else vocabulary
+        if counts is None:
+            counts = count_terms((doc.page_content for doc in docs), self.vocabulary)
+        self._build(*counts)
+        self._init_search_state()
+
+    @classmethod
+    def from_arrays(cls, docs, vocabulary, idf, indptr, indices, data):
+        """Wrap precomputed (possibly memory-mapped) index arrays"""
+        store = cls.__new__(cls)
+        store.docs = docs
+        store.vocabulary = vocabulary
+        store.idf, store.indptr, store.indices, store.data = idf, indptr, indices, data
+        store.n_docs = len(docs)
+        store._init_search_state()
+        return store
+
+    def _init_search_state(self):
+        self.precomputed = {}      # precompute_key -> ranked chunk ids
+        self._query_memo = {}      # query -> (terms, weights)
+        self._partitions = {}      # scope -> sorted chunk ids
+        self._chunk_methodology = None
+
+    def chunk_methodologies(self):
+        """Partition index (into METHODOLOGIES) of every chunk"""
+        if self._chunk_methodology is None:
+            if isinstance(self.docs, ChunkTable):
+                per_file = np.array([METHODOLOGIES.index(methodology_of(s)) for s in self.docs.sources],
+                                    dtype=np.int8)
+                self._chunk_methodology = per_file[np.asarray(self.docs.file_ids)]
+            else:
+                self._chunk_methodology = np.array(
+                    [METHODOLOGIES.index(methodology_of(doc.metadata.get("source", ""))) for doc in self.docs],
+                    dtype=np.int8)
+        return self._chunk_methodology
+
+    def partition(self, methodology):
+        """Sorted ids of the chunks in one or more partitions"""
+        scope = _scope(methodology)
+        ids = self._partitions.get(scope)
+        if ids is None:
+            unknown = set(scope) - set(METHODOLOGIES)
+            if unknown:
+                raise ValueError(f"Unknown methodology {sorted(unknown)}; expected one of {METHODOLOGIES}")
+            wanted = [METHODOLOGIES.index(m) for m in scope]
+            ids = np.flatnonzero(np.isin(self.chunk_methodologies(), wanted))
+            self._partitions[scope] = ids
+        return ids
+
+    def _build(self, count_indptr, cols, counts):
+        n_docs = len(count_indptr) - 1
+        n_terms = len(self.vocabulary)
+        rows = np.repeat(np.arange(n_docs, dtype=np.int32), np.diff(count_indptr))
+
+        # Smoothed idf and sublinear tf, rows L2-normalised for cosine scoring
+        df = np.bincount(cols, minlength=n_terms).astype(np.float32)
+        self.idf = np.log((1.0 + n_docs) / (1.0 + df)).astype(np.float32) + 1.0
+        weights = (1.0 + np.log(counts)) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_docs))
+        norms[norms == 0] = 1.0
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        # Group entries by term to get CSC posting lists
+        order = np.argsort(cols, kind='stable')
+        self.indices = rows[order]
+        self.data = weights[order]
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=n_terms), out=self.indptr[1:])
+        self.n_docs = n_docs
+
+    def _query_vector(self, query):
+        # The chatbot's queries repeat every turn; memoize their weighted term vectors
+        vector = self._query_memo.get(query)
+        if vector is None:
+            if len(self._query_memo) >= self.QUERY_MEMO_SIZE:
+                self._query_memo.clear()
+            vector = self._query_memo[query] = self._compute_query_vector(query)
+        return vector
+
+    def _compute_query_vector(self, query):
+        term_counts = Counter(tokenize(query))
+        terms = np.array([self.vocabulary[t] for t in term_counts if t in self.vocabulary], dtype=np.int64)
+        if terms.size == 0:
+            return terms, np.zeros(0, dtype=np.float32)
+        tf = np.array([term_counts[t] for t in term_counts if t in self.vocabulary], dtype=np.float32)
+        weights = (1.0 + np.log(tf)) * self.idf[terms]
+        return terms, weights / np.linalg.norm(weights)
+
+    def scores(self, query):
+        """Cosine similarity of every chunk against the query"""
+        terms, weights = self._query_vector(query)
+        if terms.size == 0:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        lengths = ends - starts
+        # Gather the query terms' posting lists in one shot
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contrib = self.data[offsets] * np.repeat(weights, lengths)
+        return np.bincount(self.indices[offsets], weights=contrib, minlength=self.n_docs)
+
+    def search_ids(self, query, k=3, methodology=None):
+        """Ids of the top-k chunks, optionally within the given partition(s)"""
+        candidates = None if methodology is None else self.partition(methodology)
+        n = self.n_docs if candidates is None else len(candidates)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        scores = self.scores(query)
+        if candidates is not None:
+            scores = scores[candidates]
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Highest score first, ties broken by corpus order
+        top = top[np.lexsort((top, -scores[top]))]
+        return top if candidates is None else candidates[top]
+
+    def text(self, i):
+        """Chunk text without building a Document"""
+        if isinstance(self.docs, ChunkTable):
+            return self.docs.text(i)
+        return self.docs[i].page_content
+
+    def similarity_search(self, query, k=3, methodology=None):
+        return [self.docs[i] for i in self.search_ids(query, k, methodology)]
+
+
+class ChunkTable:
+    """Read-only chunk sequence backed by a UTF-8 blob and offsets.
+
+    Chunks are decoded into Documents only when a search returns them, so
+    opening a memory-mapped index does no per-chunk work.
+    """
+
+    def __init__(self, blob, offsets, file_ids, sources, section_blob=None, section_offsets=None):
+        self.blob = blob
+        self.offsets = offsets
+        self.file_ids = file_ids
+        self.sources = sources
+        self.section_blob = section_blob
+        self.section_offsets = section_offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def text(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def section(self, i):
+        if self.section_offsets is None:
+            return None
+        return bytes(self.section_blob[self.section_offsets[i]:self.section_offsets[i + 1]]).decode('utf-8')
+
+    def __getitem__(self, i):
+        return make_document(self.text(i), self.sources[self.file_ids[i]], self.section(i))
+
+
+class PersistentIndex:
+    """TF-IDF index saved under index_dir and refreshed incrementally.
+
+    The manifest records each data file's path, mtime, size and sha256 along
+    with its chunk range. On load, files whose mtime and size are unchanged
+    are trusted without being read; only added or modified files are
+    re-chunked and re-counted, deleted files are dropped, and the raw term
+    counts of everything else are reused to recompute the weights. With an
+    unchanged corpus, loading is a manifest read plus memory-mapping the
+    arrays. Loading and rebuilding hold an inter-process lock on the index
+    directory, so no process maps a half-written set of files.
+    """
+
+    VERSION = 3
+    ARRAYS = ("chunk_blob", "chunk_offsets", "chunk_file", "section_blob", "section_offsets",
+              "count_indptr", "count_cols", "count_data",
+              "idf", "indptr", "indices", "data")
+
+    def __init__(self, engine, index_dir):
+        self.engine = engine
+        self.data_dir = engine.data_dir
+        self.index_dir = index_dir
+        self.chunker = engine.chunker
+        self.stats = {}
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path("manifest.json"), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != self.VERSION or manifest.get("chunker") != self.chunker:
+            return None
+        return manifest
+
+    def _load_array(self, name):
+        try:
+            return np.load(self._path(name + ".npy"), mmap_mode='r')
+        except ValueError:
+            # Zero-length arrays cannot be memory-mapped
+            return np.load(self._path(name + ".npy"))
+
+    def _load_arrays(self):
+        return {name: self._load_array(name) for name in self.ARRAYS}
+
+    def _scan(self):
+        files = []
+        for name in sorted(os.listdir(self.data_dir)):
+            if name.endswith('.txt'):
+                files.append((name, os.stat(os.path.join(self.data_dir, name))))
+        return files
+
+    @contextmanager
+    def _file_lock(self, name="index.lock"):
+        """Exclusive inter-process lock"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._path(name), "a") as f:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load_or_update(self, force=False):
+        # The arrays, vocabulary and manifest are each replaced atomically but only consistent as a set:
+        # hold the lock from reading the manifest until everything is mapped (or rewritten)
+        with self._file_lock():
+            return self._load_or_update(force)
+
+    def _load_or_update(self, force):
+        manifest = None if force else self._read_manifest()
+        previous = {f["path"]: f for f in manifest["files"]} if manifest else {}
+
+        entries, changed, touched = [], {}, False
+        for name, st in self._scan():
+            old = previous.get(name)
+            if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                entries.append(dict(old))
+                continue
+            with open(os.path.join(self.data_dir, name), 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            entry = {"path": name, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+            if old and old["sha256"] == digest:
+                # Touched but identical content: keep the chunks, refresh mtime
+                entry["chunks"] = old["chunks"]
+                touched = True
+            else:
+                changed[name] = raw.decode('utf-8')
+            entries.append(entry)
+
+        deleted = set(previous) - {e["path"] for e in entries}
+        self.stats = {"changed": sorted(changed), "deleted": sorted(deleted),
+                      "unchanged": len(entries) - len(changed)}
+
+        if manifest and not changed and not deleted:
+            if touched:
+                manifest["files"] = entries
+                self._write_manifest(manifest)
+            return self._open(manifest, self._load_arrays())
+        return self._rebuild(entries, changed, self._load_arrays() if manifest else None)
+
+    def _rebuild(self, entries, changed, old):
+        vocabulary = {}
+        if old is not None:
+            with open(self._path("vocab.json"), encoding='utf-8') as f:
+                vocabulary = {term: i for i, term in enumerate(json.load(f))}
+
+        texts, lengths, sections, section_lengths, parts = [], [], [], [], []
+        chunk_start = 0
+        for file_id, entry in enumerate(entries):
+            if entry["path"] in changed:
+                pairs = self.engine.split_sections(changed[entry["path"]])
+                chunks = [chunk for chunk, _ in pairs]
+                chunk_bytes = [c.encode('utf-8') for c in chunks]
+                section_bytes = [section.encode('utf-8') for _, section in pairs]
+                texts.append(b"".join(chunk_bytes))
+                lengths.append(np.array([len(b) for b in chunk_bytes], dtype=np.int64))
+                sections.append(b"".join(section_bytes))
+                section_lengths.append(np.array([len(b) for b in section_bytes], dtype=np.int64))
+                indptr, cols, counts = count_terms(chunks, vocabulary)
+            else:
+                # Reuse the stored chunk bytes, section paths and raw term counts
+                lo, hi = entry["chunks"]
+                for blob, offsets, values, value_lengths in (
+                        (old["chunk_blob"], old["chunk_offsets"], texts, lengths),
+                        (old["section_blob"], old["section_offsets"], sections, section_lengths)):
+                    values.append(bytes(blob[offsets[lo]:offsets[hi]]))
+                    value_lengths.append(np.diff(offsets[lo:hi + 1]))
+                c_lo, c_hi = old["count_indptr"][lo], old["count_indptr"][hi]
+                indptr = old["count_indptr"][lo:hi + 1] - c_lo
+                cols = np.asarray(old["count_cols"][c_lo:c_hi])
+                counts = np.asarray(old["count_data"][c_lo:c_hi])
+            n_chunks = len(indptr) - 1
+            entry["chunks"] = [chunk_start, chunk_start + n_chunks]
+            chunk_start += n_chunks
+            parts.append((np.diff(indptr), cols, counts, np.full(n_chunks, file_id, dtype=np.int32)))
+
+        def concat(i, dtype):
+            return np.concatenate([p[i] for p in parts]).astype(dtype) if parts else np.zeros(0, dtype)
+
+        # Drop terms no longer used by any chunk so the vocabulary stays compact
+        cols = concat(1, np.int32)
+        terms = [None] * len(vocabulary)
+        for term, i in vocabulary.items():
+            terms[i] = term
+        used = np.unique(cols)
+        remap = np.zeros(len(terms), dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        terms = [terms[i] for i in used]
+
+        def offsets(value_lengths):
+            value_lengths = np.concatenate(value_lengths) if value_lengths else np.zeros(0, np.int64)
+            return np.concatenate([[0], np.cumsum(value_lengths)]).astype(np.int64)
+
+        arrays = {
+            "chunk_blob": np.frombuffer(b"".join(texts), dtype=np.uint8),
+            "chunk_offsets": offsets(lengths),
+            "chunk_file": concat(3, np.int32),
+            "section_blob": np.frombuffer(b"".join(sections), dtype=np.uint8),
+            "section_offsets": offsets(section_lengths),
+            "count_indptr": np.concatenate([[0], np.cumsum(concat(0, np.int64))]).astype(np.int64),
+            "count_cols": remap[cols],
+            "count_data": concat(2, np.float32),
+        }
+
+        chunks = ChunkTable(arrays["chunk_blob"], arrays["chunk_offsets"], arrays["chunk_file"],
+                            [os.path.join(self.data_dir, e["path"]) for e in entries],
+                            arrays["section_blob"], arrays["section_offsets"])
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        store = TfidfVectorStore(chunks, vocabulary,
+                                 (arrays["count_indptr"], arrays["count_cols"], arrays["count_data"]))
+        arrays.update(idf=store.idf, indptr=store.indptr, indices=store.indices, data=store.data)
+        store.precomputed = precompute_workflow_queries(store)
+
+        for name, array in arrays.items():
+            self._atomic_write(name + ".npy", lambda f, a=array: np.save(f, a))
+        self._atomic_write("vocab.json", lambda f: f.write(json.dumps(terms).encode('utf-8')))
+        self._atomic_write("precomputed.json", lambda f: f.write(json.dumps(store.precomputed).encode('utf-8')))
+        # The manifest is written last; it is what makes the new arrays current
+        self._write_manifest({"version": self.VERSION, "chunker": self.chunker, "files": entries})
+        self.stats["rebuilt"] = True
+        return store
+
+    def _open(self, manifest, arrays):
+        with open(self._path("vocab.json"), encoding='utf-8') as f:
+            vocabulary = {term: i for i, term in enumerate(json.load(f))}
+        chunks = ChunkTable(arrays["chunk_blob"], arrays["chunk_offsets"], arrays["chunk_file"],
+                            [os.path.join(self.data_dir, e["path"]) for e in manifest["files"]],
+                            arrays["section_blob"], arrays["section_offsets"])
+        self.stats["rebuilt"] = False
+        store = TfidfVectorStore.from_arrays(chunks, vocabulary, arrays["idf"], arrays["indptr"],
+                                             arrays["indices"], arrays["data"])
+        with open(self._path("precomputed.json"), encoding='utf-8') as f:
+            store.precomputed = json.load(f)
+        if store.precomputed.keys() != workflow_query_keys():
+            # WORKFLOW_QUERIES changed since the index was built
+            store.precomputed = precompute_workflow_queries(store)
+        return store
+
+    def _write_manifest(self, manifest):
+        self._atomic_write("manifest.json", lambda f: f.write(json.dumps(manifest, indent=1).encode('utf-8')))
+
+    def _atomic_write(self, name, write):
+        tmp = self._path(f".{name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            write(f)
+        os.replace(tmp, self._path(name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or refresh the on-disk RAG index")
+    parser.add_argument("--data-dir", default="data", help="directory of .txt knowledge files")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="where the index is stored")
+    parser.add_argument("--force", action="store_true", help="rebuild from scratch, ignoring the manifest")
+    args = parser.parse_args(argv)
+
+    engine = RAGEngine(args.data_dir, index_dir=args.index_dir)
+    index = PersistentIndex(engine, args.index_dir)
+    store = index.load_or_update(force=args.force)
+    stats = index.stats
+    action = "Rebuilt" if stats.get("rebuilt") else "Up to date:"
+    print(f"{action} {args.index_dir}: {store.n_docs} chunks, {len(store.vocabulary)} terms "
+          f"({stats['unchanged']} unchanged, {len(stats['changed'])} changed, {len(stats['deleted'])} deleted)")
+
 
-    def similarity_search(self, query, k=3):
-        # Simple mock: return first k docs
-        return self.docs[:k]
+if __name__ == '__main__':
+    main()
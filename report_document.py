@@ -0,0 +1,262 @@
+"""Format-independent RCA report model and its streaming renderers.
+
+ReportGenerator builds one ReportDocument per export; every renderer
+walks it once and yields output chunks, so the cost and peak memory of an
+export stay linear in the investigation length whatever the format. The
+investigation history is referenced, not copied.
+"""
+import json
+import textwrap
+from functools import lru_cache
+from dataclasses import dataclass, field
+from html import escape as html_escape
+
+RULE_WIDTH = 80
+TEXT_WIDTH = 70
+
+
+@dataclass(slots=True)
+class Paragraph:
+    text: str
+
+
+@dataclass(slots=True)
+class Fields:
+    """Label/value lines, e.g. problem context or metrics"""
+    items: list
+
+
+@dataclass(slots=True)
+class BulletList:
+    items: list
+    title: str = None
+    indent: int = 0  # text renderer only
+
+
+class Turns:
+    """Q/A turns of a conversation history, filtered lazily.
+
+    Only the first len(history) entries at construction time are rendered,
+    so a report started while the investigation continues stays consistent.
+    """
+
+    __slots__ = ("history", "count", "workflow")
+
+    def __init__(self, history, workflow):
+        self.history = history
+        self.count = len(history)
+        self.workflow = workflow
+
+    def __iter__(self):
+        """(index in history, question, answer) of every real Q/A turn"""
+        history, workflow = self.history, self.workflow
+        for i in range(self.count):
+            q, a = history[i]
+            if q != "System" and not q.startswith(workflow):
+                yield i, q, a
+
+
+@dataclass(slots=True)
+class Section:
+    key: str
+    title: str
+    blocks: list = field(default_factory=list)
+    # Starts with a blank line in the text report
+    spaced: bool = False
+
+
+@dataclass(slots=True)
+class ReportDocument:
+    title: str
+    workflow: str
+    generated: str
+    metrics: dict
+    sections: list = field(default_factory=list)
+
+    def section(self, key):
+        return next((s for s in self.sections if s.key == key), None)
+
+
+# Text
+
+def render_text(doc):
+    rule, section_rule = "=" * RULE_WIDTH, "-" * RULE_WIDTH
+    yield f"{rule}\n{doc.title.upper()} - {doc.workflow} METHODOLOGY\n{rule}\n\n"
+    yield f"Report Generated: {doc.generated}\n\n"
+    for section in doc.sections:
+        yield f"{section_rule}\n{section.title.upper()}\n{section_rule}\n" + ("\n" if section.spaced else "")
+        for i, block in enumerate(section.blocks):
+            if i:
+                yield "\n"
+            yield from _text_block(block)
+        if section.blocks:
+            yield "\n"
+    yield f"\n{rule}\nEND OF REPORT\n{rule}\n"
+
+
+def _text_block(block):
+    if isinstance(block, Turns):
+        for i, q, a in block:
+            yield f"\nQ{i}: {q}\nA{i}: {a}\n"
+    # Fields and lists are short: one chunk each
+    elif isinstance(block, Fields):
+        yield "".join(f"{label}: {value}\n" for label, value in block.items)
+    elif isinstance(block, BulletList):
+        pad = " " * block.indent
+        title = f"{block.title}\n" if block.title else ""
+        yield title + "".join(f"{pad}- {item}\n" for item in block.items)
+    else:
+        yield _fill(block.text) + "\n"
+
+
+@lru_cache(maxsize=256)
+def _fill(text):
+    # Paragraphs are mostly the static methodology text, wrapped once per process
+    return textwrap.fill(text, TEXT_WIDTH)
+
+
+# Markdown
+
+# Backslash first, so the escapes added for the others are not escaped again
+_MD_SPECIAL = "\\`*_[]<>#|"
+
+
+def md_escape(text):
+    text = str(text)
+    # str.replace per special character beats translate/re.sub on typical short answers
+    for c in _MD_SPECIAL:
+        if c in text:
+            text = text.replace(c, "\\" + c)
+    return text
+
+
+def _md_lines(text):
+    text = md_escape(text)
+    if "\n" not in text and "\r" not in text:
+        return text
+    # Hard line breaks keep multi-line answers inside their list item or paragraph
+    return "  \n".join(text.splitlines())
+
+
+def render_markdown(doc):
+    yield f"# {md_escape(doc.title)} - {md_escape(doc.workflow)} Methodology\n\n"
+    yield f"*Report generated: {doc.generated}*\n"
+    for section in doc.sections:
+        yield f"\n## {md_escape(section.title)}\n"
+        for block in section.blocks:
+            yield "\n"
+            yield from _md_block(block)
+
+
+def _md_block(block):
+    if isinstance(block, Turns):
+        first = True
+        for i, q, a in block:
+            if not first:
+                yield "\n"
+            first = False
+            yield f"**Q{i}:** {_md_lines(q)}\n\n**A{i}:** {_md_lines(a)}\n"
+    elif isinstance(block, Fields):
+        yield "".join(f"- **{md_escape(label)}:** {_md_lines(value)}\n" for label, value in block.items)
+    elif isinstance(block, BulletList):
+        title = f"**{md_escape(block.title)}**\n\n" if block.title else ""
+        yield title + "".join(f"- {_md_lines(item)}\n" for item in block.items)
+    else:
+        yield _md_lines(block.text) + "\n"
+
+
+# JSON
+
+def render_json(doc):
+    """The document as one JSON object, written block by block"""
+    dumps = json.dumps
+    yield (f'{{"title": {dumps(doc.title)}, "workflow": {dumps(doc.workflow)}, '
+           f'"generated": {dumps(doc.generated)}, "metrics": {dumps(doc.metrics)}, "sections": [')
+    for s, section in enumerate(doc.sections):
+        yield f'{", " if s else ""}{{"key": {dumps(section.key)}, "title": {dumps(section.title)}, "blocks": ['
+        for b, block in enumerate(section.blocks):
+            if b:
+                yield ", "
+            yield from _json_block(block, dumps)
+        yield "]}"
+    yield "]}\n"
+
+
+def _json_block(block, dumps):
+    if isinstance(block, Turns):
+        yield '{"type": "turns", "items": ['
+        first = True
+        for i, q, a in block:
+            yield f'{"" if first else ", "}{{"index": {i}, "question": {dumps(q)}, "answer": {dumps(a)}}}'
+            first = False
+        yield "]}"
+    elif isinstance(block, Fields):
+        yield dumps({"type": "fields", "items": [[label, value] for label, value in block.items]})
+    elif isinstance(block, BulletList):
+        yield dumps({"type": "list", "title": block.title, "items": block.items})
+    else:
+        yield dumps({"type": "paragraph", "text": block.text})
+
+
+# HTML
+
+HTML_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; max-width: 52em; margin: 2em auto; color: #222; }
+h1 { border-bottom: 2px solid #2E86AB; padding-bottom: .3em; }
+h2 { border-bottom: 1px solid #ccc; padding-bottom: .2em; margin-top: 1.8em; }
+dt { font-weight: bold; }
+.turn { margin: .8em 0; }
+.question { font-weight: bold; }
+.answer { margin-left: 1em; white-space: pre-wrap; }
+""".strip()
+
+
+def _html(text):
+    return html_escape(str(text), quote=False)
+
+
+def render_html(doc):
+    yield ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+           f"<title>{_html(doc.title)} - {_html(doc.workflow)}</title>\n<style>\n{HTML_STYLE}\n</style>\n"
+           "</head>\n<body>\n")
+    yield f"<h1>{_html(doc.title)} - {_html(doc.workflow)} Methodology</h1>\n"
+    yield f"<p><em>Report generated: {_html(doc.generated)}</em></p>\n"
+    for section in doc.sections:
+        yield f'<section id="{html_escape(section.key)}">\n<h2>{_html(section.title)}</h2>\n'
+        for block in section.blocks:
+            yield from _html_block(block)
+        yield "</section>\n"
+    yield "</body>\n</html>\n"
+
+
+def _html_block(block):
+    if isinstance(block, Turns):
+        for i, q, a in block:
+            yield (f'<div class="turn"><div class="question">Q{i}: {_html(q)}</div>'
+                   f'<div class="answer">A{i}: {_html(a)}</div></div>\n')
+    elif isinstance(block, Fields):
+        yield "<dl>\n" + "".join(f"<dt>{_html(label)}</dt><dd>{_html(value)}</dd>\n"
+                                 for label, value in block.items) + "</dl>\n"
+    elif isinstance(block, BulletList):
+        title = f"<p><strong>{_html(block.title)}</strong></p>\n" if block.title else ""
+        yield title + "<ul>\n" + "".join(f"<li>{_html(item)}</li>\n" for item in block.items) + "</ul>\n"
+    else:
+        yield f"<p>{_html(block.text)}</p>\n"
+
+
+RENDERERS = {
+    "text": render_text,
+    "markdown": render_markdown,
+    "json": render_json,
+    "html": render_html,
+}
+
+MEDIA_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "markdown": "text/markdown; charset=utf-8",
+    "json": "application/json",
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+EXTENSIONS = {"text": "txt", "markdown": "md", "json": "json", "html": "html", "pdf": "pdf"}
@@ -1,168 +1,172 @@
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.utils import ImageReader
-import matplotlib.pyplot as plt
+import threading
+from collections import OrderedDict
 import base64
 from io import BytesIO
 from datetime import datetime
+from telemetry import span, timed
+from incident_store import format_match
+from report_document import (ReportDocument, Section, Paragraph, Fields, BulletList, Turns, RENDERERS)
+
+CHART_COLORS = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D']
+
+# Rendered PNG charts keyed by (workflow, metric items); metrics rarely change between exports
+CHART_CACHE_SIZE = 32
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+# Static sections; shared by every report since documents are never modified after they are built
+METHODOLOGY_SECTIONS = {
+    "8D": Section("methodology", "8D Methodology Analysis", [Fields([
+        ("D0", "Prepare and Plan - Investigation initiated"),
+        ("D1", "Establish Team - Cross-functional investigation team"),
+        ("D2", "Problem Description - Documented in problem context"),
+        ("D3", "Interim Containment - Immediate actions to be determined"),
+        ("D4", "Root Cause Analysis - Investigation in progress"),
+        ("D5", "Corrective Actions - To be developed based on findings"),
+        ("D6", "Implementation - Pending corrective action selection"),
+        ("D7", "Prevention - Standardization and lessons learned"),
+        ("D8", "Team Recognition - Upon successful completion"),
+    ])], spaced=True),
+    "5-Why": Section("methodology", "5-Why Analysis", [
+        Paragraph('The 5-Why technique has been applied to identify root causes through iterative questioning. '
+                  'Each "why" builds upon the previous answer to dig deeper into the underlying systemic issues.'),
+        BulletList([
+            "Investigation focused on cause-and-effect relationships",
+            "Multiple potential root causes identified",
+            "Verification of root causes recommended before implementing solutions",
+        ], title="Key Findings:"),
+    ], spaced=True),
+    "A3": Section("methodology", "A3 Problem Solving Format", [Fields([
+        ("Background", "Problem context documented"),
+        ("Current Condition", "Investigation findings captured"),
+        ("Goal/Target", "Problem resolution and prevention"),
+        ("Root Cause Analysis", "Systematic investigation conducted"),
+        ("Countermeasures", "To be developed based on findings"),
+        ("Implementation Plan", "Pending countermeasure selection"),
+        ("Follow-up", "Monitoring and verification required"),
+    ])], spaced=True),
+}
+
+RECOMMENDATIONS = Section("recommendations", "Recommendations", [
+    Paragraph("Based on the investigation conducted:"),
+    BulletList([
+        "Verify identified root causes with additional data",
+        "Implement interim containment measures if not already done",
+        "Document all findings and evidence",
+    ], title="1. IMMEDIATE ACTIONS:", indent=3),
+    BulletList([
+        "Develop specific corrective actions targeting root causes",
+        "Test proposed solutions before full implementation",
+        "Establish metrics to measure effectiveness",
+    ], title="2. CORRECTIVE ACTIONS:", indent=3),
+    BulletList([
+        "Update procedures and work instructions",
+        "Implement mistake-proofing (Poka-Yoke) where applicable",
+        "Share lessons learned across organization",
+        "Establish monitoring to prevent recurrence",
+    ], title="3. PREVENTIVE MEASURES:", indent=3),
+    BulletList([
+        "Schedule regular reviews to verify effectiveness",
+        "Monitor key metrics for sustained improvement",
+        "Document lessons learned for future reference",
+    ], title="4. FOLLOW-UP:", indent=3),
+], spaced=True)
+
 
 class ReportGenerator:
-    def __init__(self, metrics, history, problem_context=None, workflow="8D", evidence_images=None):
+    THUMBNAILS_PER_ROW = 3
+    THUMBNAIL_ROW_HEIGHT = 130
+
+    def __init__(self, metrics, history, problem_context=None, workflow="8D", evidence_images=None,
+                 evidence_store=None, similar_incidents=None):
         self.metrics = metrics
         self.history = history
         self.problem_context = problem_context or {}
         self.workflow = workflow
         self.evidence_images = evidence_images or []
+        # EvidenceStore holding evidence_images; when given, the PDF embeds their cached thumbnails
+        self.evidence_store = evidence_store
+        # Incident store matches, e.g. TechnicalChatbot.similar_incidents()
+        self.similar_incidents = similar_incidents or []
+        self._document = None
 
-    def generate_text_report(self):
-        report = f"{'='*80}\n"
-        report += f"ROOT CAUSE ANALYSIS REPORT - {self.workflow} METHODOLOGY\n"
-        report += f"{'='*80}\n\n"
-        report += f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        
-        # Problem Context Section
-        report += f"{'-'*80}\n"
-        report += "PROBLEM CONTEXT\n"
-        report += f"{'-'*80}\n"
-        if self.problem_context:
-            for key, value in self.problem_context.items():
-                report += f"{key.replace('_', ' ').title()}: {value}\n"
-            report += "\n"
-        
-        # Investigation Metrics
-        report += f"{'-'*80}\n"
-        report += "INVESTIGATION METRICS\n"
-        report += f"{'-'*80}\n"
-        for metric, value in self.metrics.items():
-            report += f"{metric}: {value:.1f}\n"
-        report += "\n"
-        
-        # Methodology-specific sections
-        if self.workflow == "8D":
-            report += self._generate_8d_section()
-        elif self.workflow == "5-Why":
-            report += self._generate_5why_section()
-        elif self.workflow == "A3":
-            report += self._generate_a3_section()
-        
-        # Investigation History
-        report += f"{'-'*80}\n"
-        report += "INVESTIGATION HISTORY\n"
-        report += f"{'-'*80}\n"
-        for i, (q, a) in enumerate(self.history):
-            if q != "System" and not q.startswith(self.workflow):
-                report += f"\nQ{i}: {q}\n"
-                report += f"A{i}: {a}\n"
-        report += "\n"
-        
-        # Evidence Section
+    def build_document(self):
+        """The report as a ReportDocument, built once per generator and shared by every format"""
+        if self._document is not None:
+            return self._document
+        doc = ReportDocument(
+            title="Root Cause Analysis Report",
+            workflow=self.workflow,
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            metrics=dict(self.metrics),
+        )
+        context = [(key.replace('_', ' ').title(), value) for key, value in self.problem_context.items()]
+        doc.sections.append(Section("problem_context", "Problem Context", [Fields(context)] if context else []))
+        doc.sections.append(Section("metrics", "Investigation Metrics",
+                                    [Fields([(metric, f"{value:.1f}") for metric, value in self.metrics.items()])]))
+        methodology = METHODOLOGY_SECTIONS.get(self.workflow)
+        if methodology:
+            doc.sections.append(methodology)
+        doc.sections.append(Section("history", "Investigation History", [Turns(self.history, self.workflow)]))
         if self.evidence_images:
-            report += f"{'-'*80}\n"
-            report += "EVIDENCE IMAGES\n"
-            report += f"{'-'*80}\n"
-            for img in self.evidence_images:
-                report += f"- {img}\n"
-            report += "\n"
-        
-        # Recommendations
-        report += f"{'-'*80}\n"
-        report += "RECOMMENDATIONS\n"
-        report += f"{'-'*80}\n"
-        report += self._generate_recommendations()
-        
-        report += f"\n{'='*80}\n"
-        report += "END OF REPORT\n"
-        report += f"{'='*80}\n"
-        
-        return report
-    
-    def _generate_8d_section(self):
-        section = f"{'-'*80}\n"
-        section += "8D METHODOLOGY ANALYSIS\n"
-        section += f"{'-'*80}\n"
-        section += """
-D0: Prepare and Plan - Investigation initiated
-D1: Establish Team - Cross-functional investigation team
-D2: Problem Description - Documented in problem context
-D3: Interim Containment - Immediate actions to be determined
-D4: Root Cause Analysis - Investigation in progress
-D5: Corrective Actions - To be developed based on findings
-D6: Implementation - Pending corrective action selection
-D7: Prevention - Standardization and lessons learned
-D8: Team Recognition - Upon successful completion
-
-"""
-        return section
-    
-    def _generate_5why_section(self):
-        section = f"{'-'*80}\n"
-        section += "5-WHY ANALYSIS\n"
-        section += f"{'-'*80}\n"
-        section += """
-The 5-Why technique has been applied to identify root causes through
-iterative questioning. Each "why" builds upon the previous answer to
-dig deeper into the underlying systemic issues.
-
-Key Findings:
-- Investigation focused on cause-and-effect relationships
-- Multiple potential root causes identified
-- Verification of root causes recommended before implementing solutions
-
-"""
-        return section
-    
-    def _generate_a3_section(self):
-        section = f"{'-'*80}\n"
-        section += "A3 PROBLEM SOLVING FORMAT\n"
-        section += f"{'-'*80}\n"
-        section += """
-Background: Problem context documented
-Current Condition: Investigation findings captured
-Goal/Target: Problem resolution and prevention
-Root Cause Analysis: Systematic investigation conducted
-Countermeasures: To be developed based on findings
-Implementation Plan: Pending countermeasure selection
-Follow-up: Monitoring and verification required
-
-"""
-        return section
-    
-    def _generate_recommendations(self):
-        recommendations = """
-Based on the investigation conducted:
-
-1. IMMEDIATE ACTIONS:
-   - Verify identified root causes with additional data
-   - Implement interim containment measures if not already done
-   - Document all findings and evidence
-
-2. CORRECTIVE ACTIONS:
-   - Develop specific corrective actions targeting root causes
-   - Test proposed solutions before full implementation
-   - Establish metrics to measure effectiveness
-
-3. PREVENTIVE MEASURES:
-   - Update procedures and work instructions
-   - Implement mistake-proofing (Poka-Yoke) where applicable
-   - Share lessons learned across organization
-   - Establish monitoring to prevent recurrence
-
-4. FOLLOW-UP:
-   - Schedule regular reviews to verify effectiveness
-   - Monitor key metrics for sustained improvement
-   - Document lessons learned for future reference
-
-"""
-        return recommendations
+            doc.sections.append(Section("evidence", "Evidence Images", [BulletList(list(self.evidence_images))]))
+        if self.similar_incidents:
+            doc.sections.append(Section("similar_incidents", "Similar Past Incidents",
+                                        [BulletList([format_match(m) for m in self.similar_incidents])]))
+        doc.sections.append(RECOMMENDATIONS)
+        self._document = doc
+        return doc
+
+    def render(self, format="text"):
+        """Yield the report in format ("text", "markdown", "json" or "html") chunk by chunk"""
+        try:
+            renderer = RENDERERS[format]
+        except KeyError:
+            raise ValueError(f"Unknown report format {format!r}; expected one of {', '.join(RENDERERS)}")
+        return renderer(self.build_document())
+
+    def write(self, fp, format="text"):
+        """Stream the report to a text-mode writer"""
+        write = fp.write
+        for chunk in self.render(format):
+            write(chunk)
+        return fp
+
+    def generate_report(self, format="text"):
+        """The whole report as one string"""
+        with span(f"report.{format}"):
+            return self.write(io.StringIO(), format).getvalue()
+
+    def generate_text_report(self):
+        return self.generate_report("text")
 
     def generate_chart(self):
+        """Metrics bar chart as PNG bytes, memoized by workflow and metric values"""
+        key = (self.workflow, tuple(self.metrics.items()))
+        with _chart_cache_lock:
+            img_data = _chart_cache.get(key)
+            if img_data is not None:
+                _chart_cache.move_to_end(key)
+                return img_data
+
+        img_data = self._render_chart_png()
+        with _chart_cache_lock:
+            _chart_cache[key] = img_data
+            while len(_chart_cache) > CHART_CACHE_SIZE:
+                _chart_cache.popitem(last=False)
+        return img_data
+
+    def _render_chart_png(self):
+        # Figure without pyplot: no global figure registry, safe across sessions/threads
+        from matplotlib.figure import Figure
+
         metrics = list(self.metrics.keys())
         values = list(self.metrics.values())
 
-        fig, ax = plt.subplots(figsize=(10, 5))
-        colors = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D']
-        ax.barh(metrics, values, color=colors[:len(metrics)])
+        fig = Figure(figsize=(10, 5))
+        ax = fig.subplots()
+        ax.barh(metrics, values, color=CHART_COLORS[:len(metrics)])
         ax.set_xlabel('Score / Progress (%)')
         ax.set_title(f'RCA Investigation Metrics - {self.workflow} Methodology')
         ax.set_xlim(0, 100)
@@ -173,80 +177,150 @@ Based on the investigation conducted:
 
         buf = BytesIO()
         fig.savefig(buf, format='png', bbox_inches='tight')
-        buf.seek(0)
-        img_data = buf.read()
-        plt.close(fig)
-        return img_data
+        return buf.getvalue()
 
-    def generate_pdf_report(self, filename="rca_report.pdf"):
-        text_report = self.generate_text_report()
-        chart_img = self.generate_chart()
-
-        c = canvas.Canvas(filename, pagesize=letter)
-        width, height = letter
-
-        # Title
-        c.setFont("Helvetica-Bold", 18)
-        c.drawString(100, height - 80, f"Root Cause Analysis Report")
-        c.setFont("Helvetica", 12)
-        c.drawString(100, height - 100, f"{self.workflow} Methodology")
-        c.drawString(100, height - 115, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # Problem Context
-        y = height - 160
-        if self.problem_context:
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(100, y, "Problem Context:")
-            y -= 25
-            c.setFont("Helvetica", 11)
-            for key, value in self.problem_context.items():
-                text = f"{key.replace('_', ' ').title()}: {value}"
-                # Wrap long text
-                if len(text) > 70:
-                    text = text[:70] + "..."
-                c.drawString(120, y, text)
-                y -= 18
-
-        # Metrics
-        y -= 25
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(100, y, "Investigation Metrics:")
-        y -= 25
-        c.setFont("Helvetica", 11)
-        for metric, value in self.metrics.items():
-            c.drawString(120, y, f"{metric}: {value:.1f}")
-            y -= 18
-
-        # Embed chart image
-        y -= 30
-        if y < 250:
-            c.showPage()
-            y = height - 100
-        
-        img = ImageReader(io.BytesIO(chart_img))
-        c.drawImage(img, 80, y - 220, width=450, height=200, preserveAspectRatio=True)
-        y -= 240
-
-        # Summary
-        if y < 150:
-            c.showPage()
-            y = height - 100
-        
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(100, y, "Summary:")
-        y -= 25
-        c.setFont("Helvetica", 10)
-        c.drawString(100, y, "Detailed investigation conducted using systematic RCA methodology.")
-        y -= 15
-        c.drawString(100, y, "Root causes identified through structured questioning and analysis.")
-        y -= 15
-        c.drawString(100, y, "Recommendations provided for corrective and preventive actions.")
-        
-        # Evidence
-        if self.evidence_images:
-            y -= 30
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(100, y, f"Evidence Images: {len(self.evidence_images)} file(s) attached")
+    def draw_chart(self, c, x, y, width, height):
+        """Draw the metrics bar chart as vector graphics on a reportlab canvas.
+
+        (x, y) is the bottom-left corner. Matches the PNG chart's layout
+        without importing matplotlib.
+        """
+        from reportlab.lib import colors
+
+        metrics = list(self.metrics.items())
+        title_h, axis_h, label_w, value_w = 18, 24, 130, 30
+        plot_x = x + label_w
+        plot_w = width - label_w - value_w
+        plot_y = y + axis_h
+        plot_h = height - title_h - axis_h
+
+        c.saveState()
+        c.setFont("Helvetica-Bold", 11)
+        c.drawCentredString(plot_x + plot_w / 2, y + height - 12,
+                            f"RCA Investigation Metrics - {self.workflow} Methodology")
+
+        # Axis with ticks every 20%
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(0.5)
+        c.rect(plot_x, plot_y, plot_w, plot_h, stroke=1, fill=0)
+        c.setFont("Helvetica", 8)
+        for tick in range(0, 101, 20):
+            tx = plot_x + plot_w * tick / 100
+            c.line(tx, plot_y, tx, plot_y - 3)
+            c.drawCentredString(tx, plot_y - 12, str(tick))
+        c.setFont("Helvetica", 9)
+        c.drawCentredString(plot_x + plot_w / 2, y + 1, "Score / Progress (%)")
+
+        # Bars top to bottom in metric order, like barh with an inverted list
+        if metrics:
+            slot = plot_h / len(metrics)
+            bar_h = slot * 0.8
+            for i, (name, value) in enumerate(metrics):
+                bar_y = plot_y + plot_h - (i + 1) * slot + (slot - bar_h) / 2
+                bar_w = plot_w * max(0.0, min(float(value), 100.0)) / 100
+                c.setFillColor(colors.HexColor(CHART_COLORS[i % len(CHART_COLORS)]))
+                c.rect(plot_x, bar_y, bar_w, bar_h, stroke=0, fill=1)
+                c.setFillColor(colors.black)
+                c.drawRightString(plot_x - 4, bar_y + bar_h / 2 - 3, name)
+                c.drawString(plot_x + bar_w + 3, bar_y + bar_h / 2 - 3, f"{value:.1f}")
+        c.restoreState()
+
+    @staticmethod
+    def _pdf_has_content(block):
+        if isinstance(block, Turns):
+            return next(iter(block), None) is not None
+        return bool(block.items) if isinstance(block, (Fields, BulletList)) else True
+
+    @staticmethod
+    def _pdf_block(pdf, block):
+        if isinstance(block, Turns):
+            # Full investigation history, wrapped and paginated
+            for i, q, a in block:
+                pdf.ensure_space(30)
+                pdf.paragraph(f"Q{i}: {q}", font="Helvetica-Bold", size=10, space_after=1)
+                pdf.paragraph(f"A{i}: {a}", size=10, indent=12, space_after=6)
+        elif isinstance(block, Fields):
+            for label, value in block.items:
+                pdf.paragraph(f"{label}: {value}", size=11, indent=20, space_after=2)
+            pdf.spacer(2)
+        elif isinstance(block, BulletList):
+            if block.title:
+                pdf.paragraph(block.title, font="Helvetica-Bold", size=10, indent=20, space_after=2)
+            for item in block.items:
+                pdf.paragraph(f"- {item}", size=10, indent=20 + 4 * block.indent, space_after=1)
+            pdf.spacer(4)
+        else:
+            pdf.paragraph(block.text, size=10, indent=20)
+
+    def _pdf_chart(self, pdf, chart):
+        pdf.spacer(10)
+        if chart == "raster":
+            from reportlab.lib.utils import ImageReader
+            pdf.image(ImageReader(io.BytesIO(self.generate_chart())), width=450, height=200)
+        else:
+            pdf.drawing(450, 200, self.draw_chart)
+
+    def _pdf_evidence(self, pdf):
+        pdf.heading(f"Evidence Images: {len(self.evidence_images)} file(s) attached", size=12)
+        thumbnails = []
+        for img in self.evidence_images:
+            thumb = self.evidence_store.thumbnail(img) if self.evidence_store else None
+            if thumb:
+                thumbnails.append((len(thumbnails) + 1, thumb))
+            else:
+                pdf.paragraph(f"- {img}", indent=20, space_after=1)
+        for start in range(0, len(thumbnails), self.THUMBNAILS_PER_ROW):
+            row = thumbnails[start:start + self.THUMBNAILS_PER_ROW]
+            pdf.drawing(pdf.frame_width, self.THUMBNAIL_ROW_HEIGHT, self._thumbnail_row(row))
+            pdf.spacer(6)
+
+    def _thumbnail_row(self, row):
+        """Drawing callback placing (number, thumbnail path) pairs side by side with captions"""
+        def draw(c, x, y, width, height):
+            cell = width / self.THUMBNAILS_PER_ROW
+            c.setFont("Helvetica", 8)
+            for col, (number, thumb) in enumerate(row):
+                left = x + col * cell
+                c.drawImage(thumb, left, y + 12, width=cell - 10, height=height - 12,
+                            preserveAspectRatio=True, anchor='sw')
+                c.drawString(left, y + 2, f"Evidence {number}")
+        return draw
+
+    @timed("report.pdf")
+    def generate_pdf_report(self, output=None, chart="vector"):
+        """Render the PDF report.
+
+        output may be a file path, a writable binary stream, or None to get
+        the PDF back as bytes without touching disk. Returns the path, the
+        stream, or the bytes respectively. chart="vector" draws the metrics
+        chart directly on the canvas; chart="raster" embeds the cached
+        matplotlib PNG. The content comes from build_document(), like
+        every other format.
+        """
+        # reportlab is only loaded when a PDF is actually requested
+        from pdf_layout import PdfLayout
+
+        target = io.BytesIO() if output is None else output
+        doc = self.build_document()
+
+        pdf = PdfLayout(target, footer=f"RCA Report - {doc.workflow}")
+        pdf.paragraph(doc.title, font="Helvetica-Bold", size=18, space_after=6)
+        pdf.paragraph(f"{doc.workflow} Methodology", size=12, space_after=0)
+        pdf.paragraph(f"Generated: {doc.generated}", size=12, space_after=8)
+
+        for section in doc.sections:
+            if section.key == "evidence":
+                self._pdf_evidence(pdf)
+                continue
+            if not any(self._pdf_has_content(block) for block in section.blocks):
+                continue
+            pdf.heading(f"{section.title}:")
+            for block in section.blocks:
+                self._pdf_block(pdf, block)
+            if section.key == "metrics":
+                self._pdf_chart(pdf, chart)
 
-        c.save()
-        return filename
+        pdf.save()
+        if output is None:
+            return target.getvalue()
+        return output
@@ -0,0 +1,277 @@
+"""Headless RCA chat service.
+
+Exposes start/answer/report endpoints on top of TechnicalChatbot so
+investigations can be driven from incident tooling without the Streamlit
+UI. All sessions share one RAG index and one LLM client (and with it one
+HTTP connection pool), and their model calls queue in one LLM scheduler;
+the optional X-Tenant request header names the tenant whose concurrency
+cap a call counts against. Sessions are kept as compact InvestigationState
+records in a bounded in-memory store with idle eviction, and can be
+exported and re-imported (for example on another worker) as snapshots.
+
+    uvicorn service:app --port 8000
+    python service.py --port 8000 --mock
+"""
+import os
+import uuid
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from chatbot import TechnicalChatbot, MockLLM, create_llm
+from llm_scheduler import get_shared_scheduler
+from rag_engine import get_shared_engine
+from report_generator import ReportGenerator
+from report_document import EXTENSIONS, MEDIA_TYPES
+from session_state import InvestigationState, WORKFLOWS
+from telemetry import get_shared_telemetry, span
+
+
+class SessionStore:
+    """Bounded LRU of investigation states with idle-time eviction"""
+
+    def __init__(self, max_sessions=1000, idle_ttl=1800):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()  # id -> [InvestigationState, asyncio.Lock, last_used]
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, state):
+        self.evict_idle()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = [state, asyncio.Lock(), time.monotonic()]
+        return session_id
+
+    def get(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.idle_ttl:
+            del self._sessions[session_id]
+            self.evicted += 1
+            return None
+        entry[2] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def remove(self, session_id):
+        return self._sessions.pop(session_id, None) is not None
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        # Entries are kept in last-used order, so stop at the first fresh one
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if entry[2] >= cutoff:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+
+class StartRequest(BaseModel):
+    workflow: str = "8D"
+
+
+class AnswerRequest(BaseModel):
+    answer: str
+
+
+def _turn_payload(session_id, chatbot, message):
+    return {
+        "session_id": session_id,
+        "message": message,
+        "complete": chatbot.complete,
+        "metrics": chatbot.get_metrics(),
+    }
+
+
+def _report_generator(chatbot):
+    return ReportGenerator(
+        chatbot.get_metrics(),
+        chatbot.conversation_history,
+        chatbot.problem_context,
+        workflow=chatbot.workflow,
+        evidence_images=chatbot.evidence_images,
+        similar_incidents=chatbot.similar_incidents(),
+    )
+
+
+def create_app(llm=None, rag=None, max_sessions=None, idle_ttl=None, use_mock=None, pool_size=None, incidents=None,
+               scheduler=None, routing=None):
+    """Build the FastAPI app; shared resources are created at startup unless given"""
+    max_sessions = max_sessions or int(os.getenv("RCA_SERVICE_MAX_SESSIONS", "1000"))
+    idle_ttl = idle_ttl or float(os.getenv("RCA_SERVICE_IDLE_TTL", "1800"))
+    use_mock = use_mock if use_mock is not None else os.getenv("RCA_SERVICE_MOCK") == "1"
+    pool_size = pool_size or int(os.getenv("RCA_SERVICE_LLM_POOL", "100"))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state = app.state
+        state.sessions = SessionStore(max_sessions, idle_ttl)
+        state.rag = rag or get_shared_engine()
+        # None: the process-wide incident store; False: no archiving or similar-incident search
+        state.incidents = incidents
+        state.scheduler = scheduler or get_shared_scheduler()
+        # None: RCA_ROUTING (default "remote")
+        state.routing = routing
+        state.http_client = state.http_async_client = None
+        if llm is not None:
+            state.llm = llm
+        else:
+            # One keep-alive pool for every session's LLM calls
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            state.http_client = httpx.Client(limits=limits, timeout=60)
+            state.http_async_client = httpx.AsyncClient(limits=limits, timeout=60)
+            state.llm, _ = create_llm(use_mock, state.http_client, state.http_async_client)
+
+        async def sweep():
+            while True:
+                await asyncio.sleep(min(60, idle_ttl))
+                state.sessions.evict_idle()
+
+        sweeper = asyncio.create_task(sweep())
+        try:
+            yield
+        finally:
+            sweeper.cancel()
+            if state.http_async_client is not None:
+                await state.http_async_client.aclose()
+                state.http_client.close()
+
+    app = FastAPI(title="RCA Chatbot Service", lifespan=lifespan)
+
+    def session_or_404(session_id):
+        entry = app.state.sessions.get(session_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session")
+        return entry
+
+    def attach(state, tenant):
+        # A chatbot is only a thin view over the stored state plus shared resources
+        chatbot = TechnicalChatbot.from_state(state, llm=app.state.llm, rag=app.state.rag,
+                                              incidents=app.state.incidents, scheduler=app.state.scheduler,
+                                              routing=app.state.routing)
+        chatbot.tenant = tenant
+        return chatbot
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "sessions": len(app.state.sessions),
+            "evicted": app.state.sessions.evicted,
+            "mock_llm": isinstance(app.state.llm, MockLLM),
+            "llm_scheduler": app.state.scheduler.stats(),
+        }
+
+    @app.post("/sessions")
+    async def start_session(request: StartRequest, x_tenant: str = Header("default")):
+        if request.workflow not in WORKFLOWS:
+            raise HTTPException(status_code=422, detail=f"workflow must be one of {', '.join(WORKFLOWS)}")
+        chatbot = TechnicalChatbot(workflow=request.workflow, rag=app.state.rag, llm=app.state.llm,
+                                   incidents=app.state.incidents, scheduler=app.state.scheduler,
+                                   routing=app.state.routing)
+        chatbot.tenant = x_tenant
+        message = chatbot.chat("start")
+        session_id = app.state.sessions.add(chatbot.state)
+        return _turn_payload(session_id, chatbot, message)
+
+    @app.post("/sessions/{session_id}/answer")
+    async def answer(session_id: str, request: AnswerRequest, x_tenant: str = Header("default")):
+        state, lock, _ = session_or_404(session_id)
+        # Turns of one session are applied in order; other sessions proceed concurrently
+        async with lock:
+            chatbot = attach(state, x_tenant)
+            if chatbot.complete:
+                raise HTTPException(status_code=409, detail="Investigation already complete")
+            with span("service.turn"):
+                message = await chatbot.achat(request.answer)
+        return _turn_payload(session_id, chatbot, message)
+
+    @app.get("/sessions/{session_id}/report")
+    async def report(session_id: str, format: str = "text"):
+        if format not in MEDIA_TYPES:
+            raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(MEDIA_TYPES)}")
+        state, lock, _ = session_or_404(session_id)
+        async with lock:
+            chatbot = attach(state, "default")
+            report = _report_generator(chatbot)
+            # The document pins the history length, so later turns don't leak into a streaming export
+            report.build_document()
+            if format == "pdf":
+                body = await asyncio.to_thread(report.generate_pdf_report)
+        if format == "pdf":
+            return Response(body, media_type=MEDIA_TYPES["pdf"], headers={
+                "Content-Disposition": f'attachment; filename="rca_report_{chatbot.workflow}.pdf"'})
+        # Text formats are streamed chunk by chunk as they are rendered
+        headers = {}
+        if format != "text":
+            headers["Content-Disposition"] = f'inline; filename="rca_report_{chatbot.workflow}.{EXTENSIONS[format]}"'
+        return StreamingResponse(report.render(format), media_type=MEDIA_TYPES[format], headers=headers)
+
+    @app.get("/metrics")
+    async def metrics(format: str = "prometheus"):
+        # Per-stage latency histograms; empty unless RCA_TELEMETRY=1
+        if format not in ("prometheus", "jsonl"):
+            raise HTTPException(status_code=422, detail="format must be prometheus or jsonl")
+        telemetry = get_shared_telemetry()
+        if format == "jsonl":
+            return Response(telemetry.jsonl(), media_type="application/x-ndjson")
+        return PlainTextResponse(telemetry.prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/sessions/{session_id}/snapshot")
+    async def snapshot(session_id: str):
+        state, lock, _ = session_or_404(session_id)
+        async with lock:
+            return Response(state.dumps(), media_type="application/json")
+
+    @app.post("/sessions/restore")
+    async def restore(request: Request):
+        try:
+            state = InvestigationState.loads(await request.body())
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid snapshot: {e}")
+        session_id = app.state.sessions.add(state)
+        return {"session_id": session_id, "workflow": state.workflow, "question_count": state.question_count}
+
+    @app.delete("/sessions/{session_id}")
+    async def end_session(session_id: str):
+        if not app.state.sessions.remove(session_id):
+            raise HTTPException(status_code=404, detail="Unknown or expired session")
+        return {"session_id": session_id, "deleted": True}
+
+    return app
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the headless RCA chat service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mock", action="store_true", help="use MockLLM instead of the remote model")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="synthetic MockLLM latency, seconds")
+    args = parser.parse_args()
+
+    llm = MockLLM(latency=args.mock_latency) if args.mock else None
+    uvicorn.run(create_app(llm=llm, use_mock=args.mock), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import json
+from dataclasses import dataclass, field
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is always available
+    msgpack = None
+
+STATE_VERSION = 1
+WORKFLOWS = ("8D", "5-Why", "A3")
+# Field -> type a snapshot must carry it as
+FIELD_TYPES = {
+    "question_count": int,
+    "max_questions": int,
+    "conversation_history": list,
+    "problem_context": dict,
+    "metrics": dict,
+    "evidence_images": list,
+    "history_summaries": list,
+    "evidence_findings": list,
+}
+
+
+def default_metrics():
+    return {
+        "Problem Severity": 0,
+        "Root Cause Confidence": 0,
+        "Solution Feasibility": 0,
+        "Investigation Progress": 0
+    }
+
+
+@dataclass(slots=True)
+class InvestigationState:
+    """Everything that is specific to one investigation, and nothing else.
+
+    The LLM client, RAG index and caches are shared process resources and are
+    re-attached when a TechnicalChatbot is restored around a state, so a
+    state can be parked on disk or handed to another worker as a few KB.
+    """
+
+    workflow: str = "8D"
+    question_count: int = 0
+    max_questions: int = 10
+    conversation_history: list = field(default_factory=list)
+    problem_context: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=default_metrics)
+    evidence_images: list = field(default_factory=list)
+    # One-line digests of turns that left the prompt history window
+    history_summaries: list = field(default_factory=list)
+    # OCR text and defect features per analyzed evidence image
+    evidence_findings: list = field(default_factory=list)
+    # Id in the incident store once the finished investigation has been archived
+    incident_id: str = None
+    # Set once the last question has been answered
+    complete: bool = False
+
+    def to_dict(self):
+        return {
+            "v": STATE_VERSION,
+            "workflow": self.workflow,
+            "question_count": self.question_count,
+            "max_questions": self.max_questions,
+            "conversation_history": [list(pair) for pair in self.conversation_history],
+            "problem_context": self.problem_context,
+            "metrics": self.metrics,
+            "evidence_images": self.evidence_images,
+            "history_summaries": self.history_summaries,
+            "evidence_findings": self.evidence_findings,
+            "incident_id": self.incident_id,
+            "complete": self.complete,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ValueError(f"Investigation state must be an object, not {type(data).__name__}")
+        if data.get("v") != STATE_VERSION:
+            raise ValueError(f"Unsupported investigation state version: {data.get('v')}")
+        if data.get("workflow") not in WORKFLOWS:
+            raise ValueError(f"workflow must be one of {', '.join(WORKFLOWS)}, not {data.get('workflow')!r}")
+        for name, expected in FIELD_TYPES.items():
+            # Snapshots from before evidence analysis have no evidence_findings
+            value = data.get(name, [] if name == "evidence_findings" else None)
+            # bool is an int subclass, but never a valid count
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError(f"{name} must be {expected.__name__}, not {type(value).__name__}")
+        if not all(isinstance(pair, (list, tuple)) and len(pair) == 2 for pair in data["conversation_history"]):
+            raise ValueError("conversation_history must hold [question, answer] pairs")
+        if not isinstance(data.get("incident_id"), (str, type(None))):
+            raise ValueError("incident_id must be a string or null")
+        return cls(
+            workflow=data["workflow"],
+            question_count=data["question_count"],
+            max_questions=data["max_questions"],
+            conversation_history=[tuple(pair) for pair in data["conversation_history"]],
+            problem_context=dict(data["problem_context"]),
+            metrics=dict(data["metrics"]),
+            evidence_images=list(data["evidence_images"]),
+            history_summaries=list(data["history_summaries"]),
+            evidence_findings=list(data.get("evidence_findings", [])),
+            incident_id=data.get("incident_id"),
+            complete=bool(data.get("complete", False)),
+        )
+
+    def dumps(self, format="json"):
+        """Serialize to bytes as "json" or "msgpack" """
+        if format == "msgpack":
+            if msgpack is None:
+                raise ImportError("msgpack is not installed; use format='json' or pip install msgpack")
+            return msgpack.packb(self.to_dict(), use_bin_type=True)
+        if format == "json":
+            return json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8")
+        raise ValueError(f"Unknown state format: {format}")
+
+    @classmethod
+    def loads(cls, data, format="json"):
+        if format == "msgpack":
+            if msgpack is None:
+                raise ImportError("msgpack is not installed; use format='json' or pip install msgpack")
+            return cls.from_dict(msgpack.unpackb(data, raw=False))
+        if format == "json":
+            return cls.from_dict(json.loads(data))
+        raise ValueError(f"Unknown state format: {format}")
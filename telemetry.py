@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import itertools
+import threading
+import functools
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+# Upper bounds in seconds; a final +Inf bucket catches the rest
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = ContextVar("rca_current_span", default=None)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, Prometheus style"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+    id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Times a block, then records it in its Telemetry's histogram and recent-span log"""
+
+    __slots__ = ("telemetry", "name", "attrs", "id", "parent", "trace", "start", "_token")
+
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.id = next(self.telemetry._ids)
+        self.parent = parent.id if parent is not None else None
+        self.trace = parent.trace if parent is not None else self.id
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.telemetry._record(self.name, duration, self.id, self.parent, self.trace, self.attrs)
+        return False
+
+
+class Telemetry:
+    """In-process per-stage latency histograms with a bounded log of recent spans.
+
+    span(name) times a block; nested spans record their parent and the id
+    of the outermost span (the trace), so one chat turn can be broken down
+    by stage. While disabled, span() returns a shared no-op object and
+    nothing is recorded.
+    """
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS, max_spans=2000):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.histograms = {}
+        self.recent = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def observe(self, name, seconds, **attrs):
+        """Record a duration measured by the caller, as a child of the current span"""
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        span_id = next(self._ids)
+        self._record(name, seconds, span_id, parent.id if parent is not None else None,
+                     parent.trace if parent is not None else span_id, attrs)
+
+    def _record(self, name, duration, span_id, parent, trace, attrs):
+        record = {"name": name, "duration": duration, "id": span_id, "parent": parent, "trace": trace,
+                  "end": time.time()}
+        if attrs:
+            record.update(attrs)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(duration)
+            self.recent.append(record)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.recent.clear()
+
+    def summary(self):
+        """{stage: count/sum/mean/p50/p95/p99/max in seconds}, sorted by stage"""
+        with self._lock:
+            return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def trace(self, trace_id):
+        """Spans of one trace, in the order they finished"""
+        with self._lock:
+            return [record for record in self.recent if record["trace"] == trace_id]
+
+    def last_trace(self, root_name):
+        """Spans of the most recent trace whose outermost span is root_name"""
+        with self._lock:
+            root = next((r for r in reversed(self.recent) if r["name"] == root_name and r["parent"] is None), None)
+        return self.trace(root["id"]) if root else []
+
+    def prometheus(self, metric="rca_stage_duration_seconds"):
+        """Histograms in the Prometheus text exposition format"""
+        lines = [f"# HELP {metric} Duration of RCA chat pipeline stages.", f"# TYPE {metric} histogram"]
+        with self._lock:
+            for name in sorted(self.histograms):
+                histogram = self.histograms[name]
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, n in zip(self.buckets, histogram.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{label}"}} {histogram.sum:.9f}')
+                lines.append(f'{metric}_count{{stage="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self, spans=False):
+        """One JSON object per stage summary, followed by the recent spans if spans=True"""
+        lines = [json.dumps({"stage": name, **stats}) for name, stats in self.summary().items()]
+        if spans:
+            with self._lock:
+                records = list(self.recent)
+            lines.extend(json.dumps({"span": record.pop("name"), **record}) for record in map(dict, records))
+        return "".join(line + "\n" for line in lines)
+
+
+_shared_telemetry = None
+_shared_telemetry_lock = threading.Lock()
+
+
+def get_shared_telemetry():
+    """Process-wide Telemetry, enabled at startup when RCA_TELEMETRY=1"""
+    global _shared_telemetry
+    if _shared_telemetry is None:
+        with _shared_telemetry_lock:
+            if _shared_telemetry is None:
+                _shared_telemetry = Telemetry(enabled=os.getenv("RCA_TELEMETRY") == "1")
+    return _shared_telemetry
+
+
+def span(name, **attrs):
+    """Span on the shared Telemetry (a no-op while it is disabled)"""
+    telemetry = _shared_telemetry or get_shared_telemetry()
+    if not telemetry.enabled:
+        return _NOOP_SPAN
+    return Span(telemetry, name, attrs)
+
+
+def timed(name):
+    """Decorator: run each call of the function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            telemetry = _shared_telemetry or get_shared_telemetry()
+            if not telemetry.enabled:
+                return func(*args, **kwargs)
+            with Span(telemetry, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator